@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from .config import SETTINGS
+from .redis_client import get_redis
+from .tts.concat import concat_audio
+
+
+def _delivery_ext() -> str:
+    return (getattr(SETTINGS, "TTS_DELIVERY_FORMAT", "mp3") or "mp3").lower()
+
+
+def paragraph_audio_path(article_id: str, index: int, ext: str | None = None) -> Path:
+    """Delivered audio for paragraph `index` (1-based), as named by upload_file."""
+    return Path(SETTINGS.AUDIO_OUT_DIR) / f"{article_id}_{index}.{ext or _delivery_ext()}"
+
+
+def full_audio_paths(article_id: str, ext: str | None = None) -> tuple[Path, Path]:
+    base = Path(SETTINGS.AUDIO_OUT_DIR)
+    return base / f"{article_id}_full.{ext or _delivery_ext()}", base / f"{article_id}_full.index.json"
+
+
+def article_audio_complete(article_id: str, paragraph_count: int) -> bool:
+    """True once every paragraph is delivered in the delivery format.
+
+    A paragraph published as the WAV fallback (failed transcode) cannot be
+    frame-copied into the full file; when only such paragraphs are left the
+    skipped build is logged instead of silently never happening.
+    """
+    if paragraph_count <= 0:
+        return False
+    ext = _delivery_ext()
+    fallback = []
+    for i in range(1, paragraph_count + 1):
+        if paragraph_audio_path(article_id, i, ext).exists():
+            continue
+        if ext != "wav" and paragraph_audio_path(article_id, i, "wav").exists():
+            fallback.append(i)
+            continue
+        return False
+    if fallback:
+        print(f"[WARN] Article {article_id}: full audio not built, paragraphs {fallback[:5]} fell back to WAV")
+        return False
+    return True
+
+
+def claim_full_build(article_id: str) -> bool:
+    """Let only one of the racing last-paragraph tasks enqueue the build.
+
+    Without Redis every caller wins; the build itself is idempotent.
+    """
+    r = get_redis()
+    if r is None:
+        return True
+    try:
+        return bool(r.set(f"article:{article_id}:full_queued", "1", nx=True, ex=3600))
+    except Exception:
+        return True
+
+
+def build_full_audio(article_id: str, paragraph_count: int) -> Optional[dict]:
+    """Concatenate all paragraph files of an article into one file plus an index.
+
+    Paragraph files share encoder parameters, so this is a frame/container
+    copy with no re-encode. The index maps paragraph ids to byte and time
+    offsets so a player can seek by paragraph with range requests.
+    """
+    ext = _delivery_ext()
+    parts = [paragraph_audio_path(article_id, i, ext) for i in range(1, paragraph_count + 1)]
+    missing = [p.name for p in parts if not p.exists()]
+    if missing:
+        print(f"[WARN] Article {article_id} not complete, missing {missing[:3]}")
+        return None
+    audio_path, index_path = full_audio_paths(article_id, ext)
+    segments = concat_audio(parts, audio_path)
+    index = {
+        "article_id": article_id,
+        "format": ext,
+        "url": f"/static/{audio_path.name}",
+        "bytes": audio_path.stat().st_size,
+        "duration_sec": segments[-1].time_end if segments else 0.0,
+        "segments": [
+            {
+                "id": f"p{i + 1}",
+                "byte_start": s.byte_start,
+                "byte_end": s.byte_end,
+                "time_start": s.time_start,
+                "time_end": s.time_end,
+            }
+            for i, s in enumerate(segments)
+        ],
+    }
+    tmp = index_path.with_name(f"{index_path.name}.{os.getpid()}.part")
+    tmp.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, index_path)
+    print(f"[SUCCESS] Article audio built at {audio_path} ({len(segments)} segments)")
+    return index
+
+
+def load_full_index(article_id: str) -> Optional[dict]:
+    _, index_path = full_audio_paths(article_id)
+    if not index_path.exists():
+        return None
+    try:
+        return json.loads(index_path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import SETTINGS
+from .redis_client import get_redis
+
+_CHANNEL = "articles:invalidate"
+# Sentinel message: drop the whole cache (e.g. after a bulk change)
+_ALL = "*"
+
+
+class ArticleStore(ABC):
+    """Where article payloads (title + paragraphs) live.
+
+    `get` returns a fresh dict the caller may mutate; `list` returns
+    `{"id", "title"}` entries.
+    """
+
+    def get(self, article_id: str) -> Optional[dict]:
+        raw = self.get_raw(article_id)
+        return json.loads(raw) if raw is not None else None
+
+    @abstractmethod
+    def get_raw(self, article_id: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, article_id: str, payload: dict) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, article_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def list(self) -> List[dict]:
+        raise NotImplementedError
+
+
+class FileArticleStore(ArticleStore):
+    """`<id>.json` files in CLEANED_DIR (the original layout)."""
+
+    def __init__(self, root: str | Path) -> None:
+        self._root = Path(root)
+
+    def _path(self, article_id: str) -> Path:
+        # Ids come from URLs; never let one escape the directory
+        if not article_id or "/" in article_id or "\\" in article_id or article_id.startswith("."):
+            raise KeyError(article_id)
+        return self._root / f"{article_id}.json"
+
+    def get_raw(self, article_id: str) -> Optional[str]:
+        try:
+            return self._path(article_id).read_text(encoding="utf-8")
+        except (KeyError, OSError):
+            return None
+
+    def put(self, article_id: str, payload: dict) -> None:
+        path = self._path(article_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.part")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def delete(self, article_id: str) -> bool:
+        try:
+            self._path(article_id).unlink()
+            return True
+        except (KeyError, OSError):
+            return False
+
+    def list(self) -> List[dict]:
+        articles = []
+        for filename in os.listdir(self._root):
+            if filename.endswith(".json") and not filename.startswith("."):
+                raw = self.get_raw(filename[: -len(".json")])
+                if raw is None:
+                    continue
+                articles.append({"id": filename.replace(".json", ""), "title": json.loads(raw).get("title", "Untitled")})
+        return articles
+
+
+class RedisArticleStore(ArticleStore):
+    """Articles as JSON strings under `article:<id>`, titles in the `articles` hash.
+
+    Unlike the advisory Redis state elsewhere (router stats, egress), this is
+    the source of truth, so Redis errors propagate to the caller.
+    """
+
+    def __init__(self, prefix: str = "article") -> None:
+        self._prefix = prefix
+        self._index = f"{prefix}s"
+
+    def _r(self):
+        r = get_redis()
+        if r is None:
+            raise RuntimeError("ARTICLE_STORE=redis but the redis client is not installed")
+        return r
+
+    def get_raw(self, article_id: str) -> Optional[str]:
+        raw = self._r().get(f"{self._prefix}:{article_id}")
+        if raw is None:
+            return None
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    def put(self, article_id: str, payload: dict) -> None:
+        pipe = self._r().pipeline()
+        pipe.set(f"{self._prefix}:{article_id}", json.dumps(payload, ensure_ascii=False))
+        pipe.hset(self._index, article_id, payload.get("title", "Untitled"))
+        pipe.execute()
+
+    def delete(self, article_id: str) -> bool:
+        pipe = self._r().pipeline()
+        pipe.delete(f"{self._prefix}:{article_id}")
+        pipe.hdel(self._index, article_id)
+        removed, _ = pipe.execute()
+        return bool(removed)
+
+    def list(self) -> List[dict]:
+        entries = self._r().hgetall(self._index) or {}
+        out = []
+        for k, v in entries.items():
+            k = k.decode("utf-8") if isinstance(k, bytes) else k
+            v = v.decode("utf-8") if isinstance(v, bytes) else v
+            out.append({"id": k, "title": v})
+        # Ids start with the upload timestamp
+        out.sort(key=lambda a: a["id"])
+        return out
+
+
+class CachedArticleStore(ArticleStore):
+    """Read-through LRU in front of another store, invalidated over pub/sub.
+
+    Every replica keeps the raw JSON of recently read articles (and the
+    article list) in process. Writes and deletes evict locally and publish
+    the id on `articles:invalidate`; a daemon thread evicts the same id in
+    every other replica. Entries also expire after ARTICLE_CACHE_TTL_SEC,
+    which bounds staleness if a message is missed while Redis is down.
+    """
+
+    def __init__(self, inner: ArticleStore, *, max_items: int = 256, ttl_sec: float = 60.0) -> None:
+        self._inner = inner
+        self._max = max(1, max_items)
+        self._ttl = ttl_sec
+        self._items: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._list: Optional[Tuple[float, List[dict]]] = None
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a read racing a write can't cache the old value
+        self._gen = 0
+        self._listener: Optional[threading.Thread] = None
+        # Set once there is no Redis to listen on, so the thread isn't restarted
+        self._no_listener = False
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _ensure_listener(self) -> None:
+        if self._no_listener or (self._listener is not None and self._listener.is_alive()):
+            return
+        with self._lock:
+            if self._no_listener or (self._listener is not None and self._listener.is_alive()):
+                return
+            if get_redis() is None:
+                # No Redis client, so nothing can publish invalidations either
+                self._no_listener = True
+                return
+            self._listener = threading.Thread(target=self._listen, name="article-cache-invalidate", daemon=True)
+            self._listener.start()
+
+    def _listen(self) -> None:
+        import redis
+
+        url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        backoff = 1.0
+        connected = False
+        while True:
+            try:
+                # Own connection: the shared client's short socket timeout would break blocking reads
+                client = redis.Redis.from_url(url, socket_connect_timeout=2, health_check_interval=30)
+                ps = client.pubsub(ignore_subscribe_messages=True)
+                ps.subscribe(_CHANNEL)
+                connected = True
+                # Messages may have been missed while disconnected
+                self.invalidate(_ALL, publish=False)
+                backoff = 1.0
+                for msg in ps.listen():
+                    data = msg.get("data")
+                    self.invalidate(data.decode("utf-8") if isinstance(data, bytes) else str(data), publish=False)
+            except Exception:
+                if not connected and isinstance(self._inner, FileArticleStore):
+                    # File store without a reachable Redis: a local setup, TTL expiry is enough
+                    print("[INFO] Redis unreachable; article cache relies on TTL expiry only")
+                    self._no_listener = True
+                    return
+                time.sleep(backoff)
+                backoff = min(30.0, backoff * 2)
+
+    def invalidate(self, article_id: str, *, publish: bool = True) -> None:
+        with self._lock:
+            if article_id == _ALL:
+                self._items.clear()
+            else:
+                self._items.pop(article_id, None)
+            self._list = None
+            self._gen += 1
+            self.stats["invalidations"] += 1
+        if publish:
+            r = get_redis()
+            if r is not None:
+                try:
+                    r.publish(_CHANNEL, article_id)
+                except Exception:
+                    pass
+
+    def get_raw(self, article_id: str) -> Optional[str]:
+        self._ensure_listener()
+        now = time.monotonic()
+        with self._lock:
+            hit = self._items.get(article_id)
+            if hit is not None and now - hit[0] < self._ttl:
+                self._items.move_to_end(article_id)
+                self.stats["hits"] += 1
+                return hit[1]
+            self.stats["misses"] += 1
+            gen = self._gen
+        raw = self._inner.get_raw(article_id)
+        if raw is not None:
+            with self._lock:
+                if gen != self._gen:
+                    return raw
+                self._items[article_id] = (now, raw)
+                self._items.move_to_end(article_id)
+                while len(self._items) > self._max:
+                    self._items.popitem(last=False)
+        return raw
+
+    def put(self, article_id: str, payload: dict) -> None:
+        self._inner.put(article_id, payload)
+        self.invalidate(article_id)
+
+    def delete(self, article_id: str) -> bool:
+        removed = self._inner.delete(article_id)
+        self.invalidate(article_id)
+        return removed
+
+    def list(self) -> List[dict]:
+        self._ensure_listener()
+        now = time.monotonic()
+        with self._lock:
+            if self._list is not None and now - self._list[0] < self._ttl:
+                return [dict(a) for a in self._list[1]]
+            gen = self._gen
+        articles = self._inner.list()
+        with self._lock:
+            if gen == self._gen:
+                self._list = (now, articles)
+        return [dict(a) for a in articles]
+
+
+_store: Optional[ArticleStore] = None
+_store_lock = threading.Lock()
+
+
+def get_article_store() -> ArticleStore:
+    """Process-wide store chosen by ARTICLE_STORE (file | redis)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                kind = getattr(SETTINGS, "ARTICLE_STORE", "file")
+                inner: ArticleStore = RedisArticleStore() if kind == "redis" else FileArticleStore(SETTINGS.CLEANED_DIR)
+                size = getattr(SETTINGS, "ARTICLE_CACHE_SIZE", 256)
+                _store = (
+                    CachedArticleStore(inner, max_items=size, ttl_sec=SETTINGS.ARTICLE_CACHE_TTL_SEC)
+                    if size > 0 else inner
+                )
+    return _store
@@ -0,0 +1,248 @@
+"""
+Microbenchmarks for the strict cleaning and chunking hot path.
+
+Builds deterministic synthetic academic-style corpora (10 KB .. 50 MB) with
+section headers, hard-wrapped paragraphs, hyphenation across line breaks,
+bullet and numbered lists, abbreviations (e.g., i.e., et al., Fig.) and
+citations, then times each stage of backend.cleaning on them:
+
+  normalize_whitespace, flatten_lines_to_paragraphs, split_into_sentences,
+  chunk_paragraphs, flatten_text, heuristic_title
+
+plus extract_text_from_pdf on PDFs generated like
+tests/fixtures/make_short_pdf.py (skipped if PyMuPDF isn't installed).
+Reports throughput (MB/s) and peak Python memory (tracemalloc) per stage
+and size, and compares against a stored baseline, flagging stages whose
+throughput dropped or peak memory grew beyond --threshold. Exits 1 when a
+regression is flagged and 2 when there is no baseline to compare against,
+so it can gate CI. baselines/cleaning.json is recorded with the default
+sizes; timings depend on the machine, so re-record it (--save-baseline) on
+the hardware that runs the comparison.
+
+Usage (from repo root):
+  python -m backend.benchmarks.cleaning                      # all sizes
+  python -m backend.benchmarks.cleaning --sizes 10k,100k,1m  # quick run
+  python -m backend.benchmarks.cleaning --save-baseline      # record baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import textwrap
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from backend.cleaning import (
+    chunk_paragraphs,
+    flatten_lines_to_paragraphs,
+    flatten_text,
+    heuristic_title,
+    normalize_whitespace,
+    split_into_sentences,
+)
+
+THIS_DIR = Path(__file__).resolve().parent
+BASELINE = THIS_DIR / "baselines" / "cleaning.json"
+DEFAULT_SIZES = "10k,100k,1m,10m,50m"
+DEFAULT_PDF_SIZES = "10k,100k,1m"
+CHUNK_LIMIT = 1400
+
+_WORDS = (
+    "model data analysis protein cell response signal measurement sample effect "
+    "temperature structure network function expression pathway parameter estimate "
+    "significant observed increase decrease relative baseline cohort variance method "
+    "experimental computational distribution correlation regression interaction "
+    "mechanism hypothesis framework performance evaluation approximately consistent"
+).split()
+_ABBREVS = ("e.g.", "i.e.", "etc.", "et al.", "Fig.", "Eq.", "vs.", "approx.")
+_SECTIONS = ("Abstract", "Introduction", "Related Work", "Methods", "Results", "Discussion", "Conclusion")
+
+
+def parse_size(s: str) -> int:
+    s = s.strip().lower()
+    mult = {"k": 1024, "m": 1024 * 1024}.get(s[-1:], 1)
+    return int(float(s.rstrip("km")) * mult)
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 24))]
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), rng.choice(_ABBREVS))
+    if rng.random() < 0.25:
+        words.append(f"[{rng.randint(1, 60)}]")
+    if rng.random() < 0.15:
+        words.append(f"({rng.choice(_WORDS).capitalize()} et al., {rng.randint(1990, 2024)})")
+    words[0] = words[0].capitalize()
+    return " ".join(words) + rng.choice(".....?!")
+
+
+def _hard_wrap(text: str, rng: random.Random, width: int = 78) -> List[str]:
+    """Wrap like a PDF text layer: split some words across lines with a hyphen."""
+    lines = textwrap.wrap(text, width=width, break_long_words=False)
+    out: List[str] = []
+    for i, line in enumerate(lines):
+        if i + 1 < len(lines) and rng.random() < 0.2:
+            last = line.rsplit(" ", 1)[-1]
+            if len(last) > 6 and last.isalpha():
+                cut = rng.randint(3, len(last) - 3)
+                line = line[: len(line) - len(last) + cut] + "-"
+                lines[i + 1] = last[cut:] + " " + lines[i + 1]
+        out.append(line)
+    return out
+
+
+def make_corpus(size: int, seed: int = 0) -> str:
+    """Deterministic academic-style text of roughly `size` bytes."""
+    rng = random.Random(seed)
+    parts: List[str] = ["A Synthetic Study of Deterministic Text Cleaning", "", ""]
+    total = sum(len(p) + 1 for p in parts)
+    section = 0
+    while total < size:
+        block: List[str] = []
+        if rng.random() < 0.15:
+            block += [_SECTIONS[section % len(_SECTIONS)], ""]
+            section += 1
+        if rng.random() < 0.2:
+            numbered = rng.random() < 0.5
+            for n in range(rng.randint(2, 6)):
+                marker = f"{n + 1}." if numbered else rng.choice(("-", "*", "•"))
+                block.append(f"{marker} {_sentence(rng)}")
+        else:
+            para = " ".join(_sentence(rng) for _ in range(rng.randint(3, 9)))
+            if rng.random() < 0.1:
+                # Non-breaking and doubled spaces, as PDF text layers produce
+                para = para.replace(" ", "\u00A0", 3).replace(" ", "  ", 2)
+            block += _hard_wrap(para, rng)
+        block.append("")
+        parts.extend(block)
+        total += sum(len(b) + 1 for b in block)
+    return "\n".join(parts)[:size]
+
+
+def make_pdf(text: str) -> bytes:
+    """Lay text out on A4 pages the way make_short_pdf.py does."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    margin, fontsize = 54, 10
+    line_height = int(fontsize * 1.4)
+    page = doc.new_page(width=595, height=842)
+    y = margin
+    for line in text.splitlines():
+        if y > 842 - margin:
+            page = doc.new_page(width=595, height=842)
+            y = margin
+        if line:
+            page.insert_text((margin, y), line, fontsize=fontsize, fontname="helv")
+        y += line_height
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def stages(raw: str) -> Dict[str, Callable[[], object]]:
+    normalized = normalize_whitespace(raw)
+    paragraphs = flatten_lines_to_paragraphs(normalized)
+    return {
+        "normalize_whitespace": lambda: normalize_whitespace(raw),
+        "flatten_lines_to_paragraphs": lambda: flatten_lines_to_paragraphs(normalized),
+        "split_into_sentences": lambda: [split_into_sentences(p) for p in paragraphs],
+        "chunk_paragraphs": lambda: chunk_paragraphs(paragraphs, CHUNK_LIMIT),
+        "flatten_text": lambda: flatten_text(raw),
+        "heuristic_title": lambda: heuristic_title(raw, "paper.pdf"),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float = 0.25) -> tuple[float, int]:
+    """(best seconds, peak traced bytes). Timing runs without tracemalloc.
+
+    Runs at least `repeat` times and until `min_time` has elapsed; the
+    minimum is the least noisy estimate for a deterministic function.
+    """
+    times: List[float] = []
+    while len(times) < repeat or sum(times) < min_time:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    flagged = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if cur["mb_s"] < base["mb_s"] * (1 - threshold):
+            flagged.append(f"{key}: throughput {cur['mb_s']:.1f} MB/s vs baseline {base['mb_s']:.1f}")
+        if cur["peak_mb"] > base["peak_mb"] * (1 + threshold) and cur["peak_mb"] - base["peak_mb"] > 1:
+            flagged.append(f"{key}: peak memory {cur['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f}")
+    return flagged
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default=DEFAULT_SIZES)
+    ap.add_argument("--pdf-sizes", default=DEFAULT_PDF_SIZES)
+    ap.add_argument("--repeat", type=int, default=5, help="timed runs per stage (1 above 10 MB)")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = ap.parse_args()
+
+    results: Dict[str, dict] = {}
+    print(f"{'stage':<30}{'size':>8}{'best ms':>12}{'MB/s':>10}{'peak MB':>10}")
+
+    def record(stage: str, label: str, nbytes: int, fn: Callable[[], object], repeat: int) -> None:
+        sec, peak = measure(fn, repeat)
+        mb_s = nbytes / (1024 * 1024) / sec if sec else float("inf")
+        results[f"{stage}@{label}"] = {"mb_s": round(mb_s, 2), "peak_mb": round(peak / (1024 * 1024), 2)}
+        print(f"{stage:<30}{label:>8}{sec * 1000:>12.1f}{mb_s:>10.1f}{peak / (1024 * 1024):>10.1f}")
+
+    for label in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+        size = parse_size(label)
+        raw = make_corpus(size)
+        repeat = args.repeat if size <= 10 * 1024 * 1024 else 1
+        for stage, fn in stages(raw).items():
+            record(stage, label, len(raw.encode("utf-8")), fn, repeat)
+
+    try:
+        from backend.pdf_extract import extract_text_from_pdf
+    except ImportError:
+        print("extract_text_from_pdf: PyMuPDF not installed, skipped")
+    else:
+        for label in [s.strip() for s in args.pdf_sizes.split(",") if s.strip()]:
+            pdf = make_pdf(make_corpus(parse_size(label)))
+            record("extract_text_from_pdf", label, len(pdf), lambda: extract_text_from_pdf(pdf), args.repeat)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Wrote baseline {args.baseline}")
+        return
+    if not args.baseline.exists():
+        # Nothing to compare against must not read as a pass in CI
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        sys.exit(2)
+    flagged = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    if flagged:
+        print(f"\nREGRESSIONS (>{args.threshold:.0%} vs baseline):")
+        for line in flagged:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions vs baseline (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Encoding throughput benchmark for the delivery encoders.
+
+Synthesizes speech-like mono WAV clips (1 s, 10 s, 60 s) and times every
+available encoder backend (PyAV, lameenc, ffmpeg subprocess) transcoding
+them to the delivery format, reporting wall time per clip and the realtime
+factor (seconds of audio encoded per second of wall time).
+
+Usage (from repo root):
+  python -m backend.benchmarks.encoders
+  python -m backend.benchmarks.encoders --format ogg --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import statistics
+import tempfile
+import time
+import wave
+from array import array
+from pathlib import Path
+
+from backend.tts.audio_utils import _BACKENDS
+
+DURATIONS = (1, 10, 60)
+
+
+def write_clip(path: Path, seconds: int, sample_rate: int) -> None:
+    """Amplitude-modulated tone bursts with short pauses, roughly speech-shaped."""
+    n = seconds * sample_rate
+    samples = array("h")
+    for i in range(n):
+        t = i / sample_rate
+        syllable = 0.5 * (1 + math.sin(2 * math.pi * 4 * t))
+        pause = 0.0 if (t % 2.0) > 1.7 else 1.0
+        f0 = 140 + 30 * math.sin(2 * math.pi * 0.5 * t)
+        v = math.sin(2 * math.pi * f0 * t) + 0.3 * math.sin(2 * math.pi * 3 * f0 * t)
+        samples.append(int(9000 * syllable * pause * v))
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(samples.tobytes())
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--format", default="mp3")
+    ap.add_argument("--bitrate", default="160k")
+    ap.add_argument("--sample-rate", type=int, default=24000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        clips = {}
+        for sec in DURATIONS:
+            clips[sec] = tmp / f"clip_{sec}s.wav"
+            write_clip(clips[sec], sec, args.sample_rate)
+
+        print(f"format={args.format} bitrate={args.bitrate} sample_rate={args.sample_rate} repeat={args.repeat}")
+        print(f"{'backend':<10}{'clip':>6}{'median ms':>12}{'min ms':>10}{'x realtime':>12}")
+        for name, fn in _BACKENDS.items():
+            for sec, clip in clips.items():
+                out = tmp / f"out_{name}_{sec}.{args.format}"
+                times = []
+                for _ in range(args.repeat):
+                    out.unlink(missing_ok=True)
+                    t0 = time.perf_counter()
+                    ok = fn(clip, out, format=args.format, bitrate=args.bitrate, sample_rate=args.sample_rate)
+                    times.append(time.perf_counter() - t0)
+                    if not ok:
+                        break
+                if not ok:
+                    print(f"{name:<10}{sec:>5}s{'unavailable':>12}")
+                    break
+                med = statistics.median(times)
+                print(f"{name:<10}{sec:>5}s{med * 1000:>12.1f}{min(times) * 1000:>10.1f}{sec / med:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
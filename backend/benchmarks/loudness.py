@@ -0,0 +1,98 @@
+"""
+Loudness normalization benchmark for the WAV master DSP pass.
+
+Writes a speech-like 60 s mono clip (with 1.5 s of leading/trailing
+silence) and times each stage of backend.tts.dsp on it: load, edge trim,
+gated loudness measurement, gain + limiter, save, and the whole
+process_master pass. If ffmpeg is on PATH, a single-pass `loudnorm`
+filter run is timed for comparison (a proper two-pass loudnorm costs
+roughly twice that).
+
+Usage (from repo root):
+  python -m backend.benchmarks.loudness
+  python -m backend.benchmarks.loudness --seconds 60 --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+from backend.benchmarks.encoders import write_clip
+from backend.tts import dsp
+
+
+def pad_with_silence(path: Path, seconds: float) -> None:
+    with wave.open(str(path), "rb") as w:
+        params = w.getparams()
+        pcm = w.readframes(w.getnframes())
+    pad = b"\0\0" * int(seconds * params.framerate)
+    with wave.open(str(path), "wb") as w:
+        w.setparams(params)
+        w.writeframes(pad + pcm + pad)
+
+
+def timed(fn, repeat: int) -> tuple[float, float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), min(times)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--seconds", type=int, default=60)
+    ap.add_argument("--sample-rate", type=int, default=24000)
+    ap.add_argument("--target", type=float, default=-18.0)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--ffmpeg", default="ffmpeg")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        clip = tmp / "clip.wav"
+        out = tmp / "norm.wav"
+        write_clip(clip, args.seconds, args.sample_rate)
+        pad_with_silence(clip, 1.5)
+
+        x, rate = dsp._load(clip)
+        trimmed = dsp.trim_edges(x, rate, keep_ms=150)
+        stages = {
+            "load": lambda: dsp._load(clip),
+            "trim": lambda: dsp.trim_edges(x, rate, keep_ms=150),
+            "measure": lambda: dsp.integrated_loudness(trimmed, rate),
+            "gain+limit": lambda: dsp.apply_gain(trimmed.copy(), 6.0, ceiling_dbfs=-1.0),
+            "save": lambda: dsp._save(out, trimmed, rate),
+            "total": lambda: dsp.process_master(
+                clip, out, target_lufs=args.target, ceiling_dbfs=-1.0, edge_silence_ms=150
+            ),
+        }
+
+        print(f"clip={args.seconds}s (+3s silence) rate={rate} target={args.target} LUFS repeat={args.repeat}")
+        print(f"{'stage':<12}{'median ms':>12}{'min ms':>10}{'x realtime':>12}")
+        for name, fn in stages.items():
+            med, best = timed(fn, args.repeat)
+            print(f"{name:<12}{med * 1000:>12.1f}{best * 1000:>10.1f}{args.seconds / med:>12.0f}")
+
+        stats = dsp.process_master(clip, out, target_lufs=args.target, ceiling_dbfs=-1.0, edge_silence_ms=150)
+        after, _ = dsp._load(out)
+        print(f"result: {stats}, output loudness {dsp.integrated_loudness(after, rate):.2f} LUFS")
+
+        ref = tmp / "loudnorm.wav"
+        cmd = [args.ffmpeg, "-y", "-loglevel", "error", "-i", str(clip), "-af", f"loudnorm=I={args.target}:TP=-1", str(ref)]
+        try:
+            med, best = timed(lambda: subprocess.run(cmd, check=True, capture_output=True), args.repeat)
+            print(f"{'ffmpeg 1-pass':<12}{med * 1000:>12.1f}{best * 1000:>10.1f}{args.seconds / med:>12.0f}")
+        except (FileNotFoundError, subprocess.CalledProcessError):
+            print("ffmpeg loudnorm: unavailable")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Deterministic text cleaning and chunking used by strict mode.
+
+Kept free of app/worker imports so both the API and Celery workers can use it.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+
+
+# Final cleaning step
+
+def flatten_text(raw: str) -> str:
+    # Normalize newlines
+    txt = raw.replace("\r\n", "\n").replace("\r", "\n")
+    # Remove hyphenation across line breaks: e.g., "exam-\nple" -> "example"
+    txt = re.sub(r"(\w)-\n(\w)", r"\1\2", txt)
+    # Merge single newlines into spaces (keep double-newline as paragraph break)
+    txt = re.sub(r"(?<!\n)\n(?!\n)", " ", txt)
+    # Collapse excessive blank lines
+    txt = re.sub(r"\n{3,}", "\n\n", txt)
+    # Collapse multiple spaces
+    txt = re.sub(r"[ \t]{2,}", " ", txt)
+    return txt.strip()
+
+
+# Strict cleaner functions (deterministic, no LLM)
+def normalize_whitespace(s: str) -> str:
+    # Normalize newline types and spaces
+    s = s.replace("\r\n", "\n").replace("\r", "\n")
+    # Convert non-breaking space to normal space
+    s = s.replace("\u00A0", " ")
+    # Collapse multiple spaces within lines
+    s = re.sub(r"[ \t]{2,}", " ", s)
+    return s
+
+def _is_bullet_line(line: str) -> bool:
+    stripped = line.lstrip()
+    if not stripped:
+        return False
+    if stripped.startswith(("- ", "* ", "• ")):
+        return True
+    # Numeric bullets like '1.' or '1)'
+    return bool(re.match(r"^\s*\d+[\.)]\s+", line))
+
+def flatten_lines_to_paragraphs(raw: str) -> list[str]:
+    lines = raw.split("\n")
+    paras: list[str] = []
+    current: list[str] = []
+
+    def flush():
+        if current:
+            paras.append(" ".join(current).strip())
+            current.clear()
+
+    for i, line in enumerate(lines):
+        if not line.strip():
+            # blank line → paragraph break
+            flush()
+            continue
+
+        if _is_bullet_line(line):
+            flush()
+            paras.append(line.strip())
+            continue
+
+        if current:
+            prev = current[-1]
+            # If previous ends with hyphenated word and this starts with a letter, glue without space
+            if re.search(r"[A-Za-z]-$", prev) and re.match(r"^[A-Za-z]", line):
+                current[-1] = prev[:-1] + line.strip()
+            else:
+                current.append(line.strip())
+        else:
+            current.append(line.strip())
+
+    flush()
+    return [p for p in paras if p]
+
+# In-text citation markers (REMOVE_CITATIONS). One alternation, so each
+# paragraph is scanned once; see tests/fixtures/citations.tsv for what is and
+# isn't matched. Bracketed numbers starting with 0 ("[0, 1]") or a plain pair
+# ("[10, 20]") are left alone because they are intervals, not references, and
+# so is a bracket glued to a word ("x[12]"), which is an index.
+_NAME = r"(?:(?:van|von|de|der|den|di|da|du|le|la)\s)*[A-ZÀ-ÖØ-Þ][\w'’-]+(?:\s[A-ZÀ-ÖØ-Þ][\w'’-]+)*"
+_AUTHORS = rf"{_NAME}(?:(?:,\s?|,?\s(?:and|&)\s){_NAME})*(?:\set\sal\.?)?"
+_YEAR = r"(?:19|20)\d{2}[a-z]?"
+_YEARS = rf"{_YEAR}(?:,\s?{_YEAR})*"
+_PAGES = r"(?:,\s?pp?\.\s?\d+(?:\s?[–-]\s?\d+)?)?"
+# "(March 2020)" is a date, not an author
+_NOT_DATE = r"(?!(?:January|February|March|April|May|June|July|August|September|October|November|December|Spring|Summer|Autumn|Fall|Winter)\b)"
+_AUTHOR_YEAR = rf"(?:(?:see|e\.g\.|cf\.),?\s)?{_NOT_DATE}{_AUTHORS},?\s{_YEARS}{_PAGES}"
+_REF = r"[1-9]\d{0,2}"
+_REFS = rf"(?!\[{_REF},\s?{_REF}\])\[{_REF}(?:\s?[,–—-]\s?{_REF})*\]"
+# "in Paris (2019)" is a place and a year; the narrative form needs a surname
+# or "et al." directly before the year, which is kept via the `cited` group
+_NOT_PLACE = "".join(rf"(?<!\b{p}\s)" for p in ("[Ii]n", "[Aa]t", "[Ff]rom", "[Nn]ear", "[Aa]cross", "[Aa]round", "[Tt]hroughout"))
+_SUP = "⁰¹²³⁴⁵⁶⁷⁸⁹"
+CITATION_RE = re.compile(
+    rf"""
+      \s*\({_AUTHOR_YEAR}(?:;\s?{_AUTHOR_YEAR})*\)                   # (Nguyen, 2020), (Wu et al., 2021a; Li 2019)
+    | (?P<cited>(?=[A-ZÀ-ÖØ-Þ])\b{_NOT_PLACE}\w[\w'’-]*|\bet\sal\.)\s\({_YEARS}{_PAGES}\)   # Nguyen (2020) showed -> Nguyen showed
+    | \s*(?<![^\s.,;:!?)\]]){_REFS}(?:,?\s?{_REFS})*                # [12], [3–5], [1, 4-6], [2], [7]
+    | (?:(?<=[^\W\d_]{{3}})|(?<=[.,;:)]))[{_SUP}]+(?:[,–⁻-][{_SUP}]+)*   # word¹², cells.³⁻⁵ (not m², s⁻¹)
+    | (?<=[a-z]{{2}}\.){_REF}(?:[,–-]{_REF})*(?=\s+[A-Z]|\s*$)       # superscripts flattened by extraction: "shown.12 Next"
+    """,
+    re.VERBOSE,
+)
+
+def strip_citations(text: str) -> tuple[str, int]:
+    """Remove in-text citation markers; returns the text and how many were removed."""
+    return CITATION_RE.subn(r"\g<cited>", text)
+
+def remove_citations(paragraphs: list[str]) -> tuple[list[str], dict]:
+    """Strip citations from every paragraph and report the character reduction."""
+    out: list[str] = []
+    removed = before = after = 0
+    for p in paragraphs:
+        cleaned, n = strip_citations(p)
+        cleaned = cleaned.strip()
+        removed += n
+        before += len(p)
+        after += len(cleaned)
+        if cleaned:
+            out.append(cleaned)
+    stats = {
+        "citations_removed": removed,
+        "chars_before": before,
+        "chars_after": after,
+        "char_reduction": round(1 - after / before, 4) if before else 0.0,
+    }
+    return out, stats
+
+def split_into_sentences(p: str) -> list[str]:
+    # Protect common abbreviations to avoid splitting
+    protect = {
+        "e.g.": "__EG__",
+        "i.e.": "__IE__",
+        "etc.": "__ETC__",
+    }
+    temp = p
+    for k, v in protect.items():
+        temp = temp.replace(k, v)
+
+    # Split on punctuation followed by space and an uppercase letter/number/parenthesis
+    parts = re.split(r"(?<=[.!?])\s+(?=[A-Z(0-9])", temp)
+    # Restore abbreviations
+    def restore(s: str) -> str:
+        for k, v in protect.items():
+            s = s.replace(v, k)
+        return s
+    return [restore(x).strip() for x in parts if x and x.strip()]
+
+def chunk_paragraphs(paragraphs: list[str], limit: int) -> list[str]:
+    chunks: list[str] = []
+    current = ""
+    for p in paragraphs:
+        sentences = split_into_sentences(p)
+        for s in sentences:
+            if not current:
+                # start new
+                if len(s) > limit:
+                    # allow oversize sentence as its own chunk
+                    chunks.append(s)
+                else:
+                    current = s
+            else:
+                candidate = current + " " + s
+                if len(candidate) <= limit:
+                    current = candidate
+                else:
+                    chunks.append(current)
+                    if len(s) > limit:
+                        chunks.append(s)
+                        current = ""
+                    else:
+                        current = s
+    if current:
+        chunks.append(current)
+    return chunks
+
+def heuristic_title(raw_text: str, filename: str) -> str:
+    # take first non-empty line before first blank line
+    lines = normalize_whitespace(raw_text).split("\n")
+    block: list[str] = []
+    for line in lines:
+        if not line.strip():
+            break
+        block.append(line.strip())
+    candidate = next((l for l in block if l.strip()), "").strip()
+    def _word_count(s: str) -> int:
+        return len([w for w in s.split() if w])
+    def _is_all_capsish(s: str) -> bool:
+        letters = [ch for ch in s if ch.isalpha()]
+        return bool(letters) and sum(ch.isupper() for ch in letters) / len(letters) > 0.9
+    if candidate and _word_count(candidate) <= 16 and not _is_all_capsish(candidate):
+        return candidate
+    # fallback to filename sans extension
+    base = os.path.basename(filename or "")
+    return os.path.splitext(base)[0] or "Untitled Article"
@@ -55,12 +55,19 @@ class _Settings:
     TTS_SAMPLE_RATE: int
     # Encoding / tools
     FFMPEG_PATH: str
+    TTS_ENCODER: str
     # New TTS plumbing
     TTS_PROVIDER: str
     TTS_PROVIDER_ORDER: str
     TTS_RATE: int
     TTS_VOICE_EN: str
     TTS_VOICE_SV: str
+    # Provider routing
+    TTS_ROUTING: str
+    TTS_ROUTER_ALPHA: float
+    TTS_ROUTER_WINDOW: int
+    TTS_HEDGE: bool
+    TTS_HEDGE_PERCENTILE: float
     # Piper
     PIPER_MODE: str
     PIPER_URL: str
@@ -68,10 +75,68 @@ class _Settings:
     PIPER_DEFAULT_VOICE: str
     PIPER_TIMEOUT_SEC: int
     PIPER_BIN: str
+    PIPER_BATCH_SIZE: int
     # Delivery
     TTS_DELIVERY_FORMAT: str
     TTS_KEEP_WAV_MASTER: bool
+    TTS_STREAM_ENCODE: bool
     TTS_ENCODER_OFFSET_MS: int
+    TTS_RENDITIONS: str
+    # Audio cache budget
+    TTS_CACHE_MAX_BYTES: int
+    TTS_CACHE_EVICTION: str
+    TTS_CACHE_MIN_AGE_SEC: float
+    # Sentence-level synthesis cache
+    TTS_SENTENCE_CACHE: bool
+    TTS_SENTENCE_GAP_MS: int
+    # Loudness normalization / edge silence on the WAV master
+    TTS_LOUDNESS_NORM: bool
+    TTS_LOUDNESS_TARGET_LUFS: float
+    TTS_PEAK_DBFS: float
+    TTS_EDGE_SILENCE_MS: int
+    # Progressive HLS output
+    TTS_HLS: bool
+    TTS_HLS_SEGMENT_SEC: float
+    # Per-paragraph duration + word timings written next to the audio
+    TTS_WORD_TIMINGS: bool
+    # Prometheus metrics (API /metrics and worker exporter)
+    METRICS_ENABLED: bool
+    METRICS_WORKER_PORT: int
+    # Admin access and on-demand profiling
+    ADMIN_TOKEN: str
+    PROFILE_DIR: str
+    PROFILE_MAX_FILES: int
+    PROFILE_TASK_SAMPLE_RATE: float
+    PROFILE_INTERVAL_MS: float
+
+    # Tiered PDF extraction (PyMuPDF fast path, docling for hard pages)
+    PDF_TIERED: bool
+    PDF_DOCLING_WORKERS: int
+    PDF_DOCLING_TIMEOUT_SEC: float
+    PDF_DOCLING_MAX_PAGES: int
+    PDF_DOCLING_OCR: bool
+
+    # Article store (file | redis) and its in-process read cache
+    ARTICLE_STORE: str
+    ARTICLE_CACHE_SIZE: int
+    ARTICLE_CACHE_TTL_SEC: float
+
+    # Delivered audio storage (filesystem | s3)
+    AUDIO_STORAGE: str
+    S3_BUCKET: str
+    S3_ENDPOINT_URL: str
+    S3_REGION: str
+    S3_PREFIX: str
+    S3_PUBLIC_BASE_URL: str
+    S3_PRESIGN_TTL_SEC: int
+    S3_PART_MB: int
+
+    # Worker warm-up and pooled upstream HTTP clients
+    WORKER_WARMUP: bool
+    PIPER_PREWARM: bool
+    HTTP2: bool
+    HTTP_POOL_MAX_CONNECTIONS: int
+    HTTP_KEEPALIVE_EXPIRY_SEC: float
 
     # Strict cleaning and chunking
     STRICT_MODE: bool
@@ -99,12 +164,19 @@ def _build_settings() -> _Settings:
     tts_format = os.getenv("TTS_FORMAT", "wav")
     tts_sample_rate = int(os.getenv("TTS_SAMPLE_RATE", "22050"))
     ffmpeg_path = os.getenv("FFMPEG_PATH", "ffmpeg")
+    tts_encoder = os.getenv("TTS_ENCODER", "auto").lower()
     # New TTS plumbing defaults (use openai by default to preserve behavior)
     tts_provider = os.getenv("TTS_PROVIDER", "openai")
     tts_provider_order = os.getenv("TTS_PROVIDER_ORDER", "openai")
     tts_rate = int(os.getenv("TTS_RATE", "0"))
     tts_voice_en = os.getenv("TTS_VOICE_EN", "onyx")
     tts_voice_sv = os.getenv("TTS_VOICE_SV", "sv-SE-nst")
+    # Provider routing: "static" keeps TTS_PROVIDER_ORDER, "latency" ranks by observed speed
+    tts_routing = os.getenv("TTS_ROUTING", "static").lower()
+    tts_router_alpha = float(os.getenv("TTS_ROUTER_ALPHA", "0.2"))
+    tts_router_window = int(os.getenv("TTS_ROUTER_WINDOW", "200"))
+    tts_hedge = str(os.getenv("TTS_HEDGE", "false")).strip().lower() in {"1","true","yes","on"}
+    tts_hedge_percentile = float(os.getenv("TTS_HEDGE_PERCENTILE", "95"))
     # Piper
     piper_mode = os.getenv("PIPER_MODE", "HTTP").upper()
     piper_url = os.getenv("PIPER_URL", "http://localhost:5000")
@@ -112,10 +184,53 @@ def _build_settings() -> _Settings:
     piper_default_voice = os.getenv("PIPER_DEFAULT_VOICE", "sv-SE-nst")
     piper_timeout = int(os.getenv("PIPER_TIMEOUT_SEC", "60"))
     piper_bin = os.getenv("PIPER_BIN", "piper")
+    piper_batch_size = int(os.getenv("PIPER_BATCH_SIZE", "32"))
     # Delivery / encoding
     tts_delivery_format = os.getenv("TTS_DELIVERY_FORMAT", "mp3").lower()
     keep_wav_master = str(os.getenv("TTS_KEEP_WAV_MASTER", "false")).strip().lower() in {"1","true","yes","on"}
+    stream_encode = str(os.getenv("TTS_STREAM_ENCODE", "true")).strip().lower() in {"1","true","yes","on"}
     encoder_offset_ms = int(os.getenv("TTS_ENCODER_OFFSET_MS", "0"))
+    tts_renditions = os.getenv("TTS_RENDITIONS", "")
+    cache_max_bytes = int(float(os.getenv("TTS_CACHE_MAX_MB", "0")) * 1024 * 1024)
+    cache_eviction = os.getenv("TTS_CACHE_EVICTION", "lru").lower()
+    cache_min_age = float(os.getenv("TTS_CACHE_MIN_AGE_SEC", "600"))
+    sentence_cache = str(os.getenv("TTS_SENTENCE_CACHE", "false")).strip().lower() in {"1","true","yes","on"}
+    sentence_gap_ms = int(os.getenv("TTS_SENTENCE_GAP_MS", "120"))
+    loudness_norm = str(os.getenv("TTS_LOUDNESS_NORM", "false")).strip().lower() in {"1","true","yes","on"}
+    loudness_target = float(os.getenv("TTS_LOUDNESS_TARGET_LUFS", "-18"))
+    peak_dbfs = float(os.getenv("TTS_PEAK_DBFS", "-1"))
+    edge_silence_ms = int(os.getenv("TTS_EDGE_SILENCE_MS", "150"))
+    tts_hls = str(os.getenv("TTS_HLS", "false")).strip().lower() in {"1","true","yes","on"}
+    tts_hls_segment_sec = float(os.getenv("TTS_HLS_SEGMENT_SEC", "6"))
+    tts_word_timings = str(os.getenv("TTS_WORD_TIMINGS", "true")).strip().lower() in {"1","true","yes","on"}
+    metrics_enabled = str(os.getenv("METRICS_ENABLED", "true")).strip().lower() in {"1","true","yes","on"}
+    metrics_worker_port = int(os.getenv("METRICS_WORKER_PORT", "9101"))
+    admin_token = os.getenv("ADMIN_TOKEN", "")
+    profile_dir = _abs_under_base(os.getenv("PROFILE_DIR", "profiles"), base=BASE_DIR)
+    profile_max_files = int(os.getenv("PROFILE_MAX_FILES", "50"))
+    profile_task_sample_rate = min(1.0, max(0.0, float(os.getenv("PROFILE_TASK_SAMPLE_RATE", "0"))))
+    profile_interval_ms = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+    pdf_tiered = str(os.getenv("PDF_TIERED", "true")).strip().lower() in {"1","true","yes","on"}
+    pdf_docling_workers = int(os.getenv("PDF_DOCLING_WORKERS", "2"))
+    pdf_docling_timeout = float(os.getenv("PDF_DOCLING_TIMEOUT_SEC", "120"))
+    pdf_docling_max_pages = int(os.getenv("PDF_DOCLING_MAX_PAGES", "30"))
+    pdf_docling_ocr = str(os.getenv("PDF_DOCLING_OCR", "true")).strip().lower() in {"1","true","yes","on"}
+    article_store = os.getenv("ARTICLE_STORE", "file").lower()
+    article_cache_size = int(os.getenv("ARTICLE_CACHE_SIZE", "256"))
+    article_cache_ttl = float(os.getenv("ARTICLE_CACHE_TTL_SEC", "60"))
+    audio_storage = os.getenv("AUDIO_STORAGE", "filesystem").lower()
+    s3_bucket = os.getenv("S3_BUCKET", "")
+    s3_endpoint_url = os.getenv("S3_ENDPOINT_URL", "")
+    s3_region = os.getenv("S3_REGION", "")
+    s3_prefix = os.getenv("S3_PREFIX", "audio")
+    s3_public_base_url = os.getenv("S3_PUBLIC_BASE_URL", "")
+    s3_presign_ttl = int(os.getenv("S3_PRESIGN_TTL_SEC", "21600"))
+    s3_part_mb = int(os.getenv("S3_PART_MB", "8"))
+    worker_warmup = str(os.getenv("WORKER_WARMUP", "true")).strip().lower() in {"1","true","yes","on"}
+    piper_prewarm = str(os.getenv("PIPER_PREWARM", "false")).strip().lower() in {"1","true","yes","on"}
+    http2 = str(os.getenv("HTTP2", "true")).strip().lower() in {"1","true","yes","on"}
+    http_pool_max = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "10"))
+    http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SEC", "60"))
 
     def _get_bool(name: str, default: bool) -> bool:
         val = os.getenv(name)
@@ -142,20 +257,69 @@ def _build_settings() -> _Settings:
         TTS_FORMAT=tts_format,
         TTS_SAMPLE_RATE=tts_sample_rate,
         FFMPEG_PATH=ffmpeg_path,
+        TTS_ENCODER=tts_encoder,
         TTS_PROVIDER=tts_provider,
         TTS_PROVIDER_ORDER=tts_provider_order,
         TTS_RATE=tts_rate,
         TTS_VOICE_EN=tts_voice_en,
         TTS_VOICE_SV=tts_voice_sv,
+        TTS_ROUTING=tts_routing,
+        TTS_ROUTER_ALPHA=tts_router_alpha,
+        TTS_ROUTER_WINDOW=tts_router_window,
+        TTS_HEDGE=tts_hedge,
+        TTS_HEDGE_PERCENTILE=tts_hedge_percentile,
         PIPER_MODE=piper_mode,
         PIPER_URL=piper_url,
         PIPER_MODEL_PATH=piper_model_path,
         PIPER_DEFAULT_VOICE=piper_default_voice,
         PIPER_TIMEOUT_SEC=piper_timeout,
         PIPER_BIN=piper_bin,
+        PIPER_BATCH_SIZE=piper_batch_size,
         TTS_DELIVERY_FORMAT=tts_delivery_format,
         TTS_KEEP_WAV_MASTER=keep_wav_master,
+        TTS_STREAM_ENCODE=stream_encode,
         TTS_ENCODER_OFFSET_MS=encoder_offset_ms,
+        TTS_RENDITIONS=tts_renditions,
+        TTS_CACHE_MAX_BYTES=cache_max_bytes,
+        TTS_CACHE_EVICTION=cache_eviction,
+        TTS_CACHE_MIN_AGE_SEC=cache_min_age,
+        TTS_SENTENCE_CACHE=sentence_cache,
+        TTS_SENTENCE_GAP_MS=sentence_gap_ms,
+        TTS_LOUDNESS_NORM=loudness_norm,
+        TTS_LOUDNESS_TARGET_LUFS=loudness_target,
+        TTS_PEAK_DBFS=peak_dbfs,
+        TTS_EDGE_SILENCE_MS=edge_silence_ms,
+        TTS_HLS=tts_hls,
+        TTS_HLS_SEGMENT_SEC=tts_hls_segment_sec,
+        TTS_WORD_TIMINGS=tts_word_timings,
+        METRICS_ENABLED=metrics_enabled,
+        METRICS_WORKER_PORT=metrics_worker_port,
+        ADMIN_TOKEN=admin_token,
+        PROFILE_DIR=profile_dir,
+        PROFILE_MAX_FILES=profile_max_files,
+        PROFILE_TASK_SAMPLE_RATE=profile_task_sample_rate,
+        PROFILE_INTERVAL_MS=profile_interval_ms,
+        PDF_TIERED=pdf_tiered,
+        PDF_DOCLING_WORKERS=pdf_docling_workers,
+        PDF_DOCLING_TIMEOUT_SEC=pdf_docling_timeout,
+        PDF_DOCLING_MAX_PAGES=pdf_docling_max_pages,
+        PDF_DOCLING_OCR=pdf_docling_ocr,
+        ARTICLE_STORE=article_store,
+        ARTICLE_CACHE_SIZE=article_cache_size,
+        ARTICLE_CACHE_TTL_SEC=article_cache_ttl,
+        AUDIO_STORAGE=audio_storage,
+        S3_BUCKET=s3_bucket,
+        S3_ENDPOINT_URL=s3_endpoint_url,
+        S3_REGION=s3_region,
+        S3_PREFIX=s3_prefix,
+        S3_PUBLIC_BASE_URL=s3_public_base_url,
+        S3_PRESIGN_TTL_SEC=s3_presign_ttl,
+        S3_PART_MB=s3_part_mb,
+        WORKER_WARMUP=worker_warmup,
+        PIPER_PREWARM=piper_prewarm,
+        HTTP2=http2,
+        HTTP_POOL_MAX_CONNECTIONS=http_pool_max,
+        HTTP_KEEPALIVE_EXPIRY_SEC=http_keepalive_expiry,
         STRICT_MODE=strict_mode,
         USE_LLM_TITLE=use_llm_title,
         REMOVE_CITATIONS=remove_citations,
@@ -0,0 +1,16 @@
+"""
+ASGI entry point for load tests: the normal API, on the load-test broker.
+
+  uvicorn backend.loadtest.app:app --port 8000
+"""
+
+from backend.celery_config import celery_app
+
+from .broker import configure
+
+configure(celery_app)
+
+# After configure(): importing the API builds it on the patched broker
+from backend.main import app  # noqa: E402
+
+__all__ = ["app"]
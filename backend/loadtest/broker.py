@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+
+def configure(celery_app) -> Optional[Path]:
+    """Point Celery at a filesystem broker when LOADTEST_BROKER_DIR is set.
+
+    Kombu's filesystem transport plus the file result backend let the API and
+    several worker processes share a queue with no Redis running. Otherwise
+    the app's normal REDIS_URL configuration is left alone.
+    """
+    d = os.getenv("LOADTEST_BROKER_DIR")
+    if not d:
+        return None
+    root = Path(d)
+    queue_dir = root / "queue"
+    for sub in (queue_dir, root / "processed", root / "results"):
+        sub.mkdir(parents=True, exist_ok=True)
+    celery_app.conf.broker_url = "filesystem://"
+    celery_app.conf.broker_transport_options = {
+        "data_folder_in": str(queue_dir),
+        "data_folder_out": str(queue_dir),
+        "processed_folder": str(root / "processed"),
+        "store_processed": False,
+    }
+    celery_app.conf.result_backend = f"file://{(root / 'results').as_posix()}"
+    return queue_dir
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import random
+import time
+import uuid
+import wave
+from pathlib import Path
+from typing import Callable, Optional
+
+from ..config import SETTINGS
+from ..tts.types import TTSEngine
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency sampler from a spec string (seconds).
+
+    fixed:0.8 | uniform:0.2:1.5 | lognormal:<median>:<sigma> | normal:<mean>:<sd>
+    """
+    kind, *args = (spec or "fixed:0.5").split(":")
+    vals = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda rng: vals[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(vals[0], vals[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(vals[0]), vals[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(vals[0], vals[1]))
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+class FakeTTSProvider(TTSEngine):
+    """Load-test stand-in for a real engine: sleeps, maybe fails, writes a WAV.
+
+    Latency is `FAKE_TTS_LATENCY` (see parse_latency) plus
+    `FAKE_TTS_MS_PER_CHAR` per input character; `FAKE_TTS_FAILURE_RATE` is the
+    probability of raising instead. Audio length follows the text at
+    ~15 chars/s, like real speech, so downstream encode cost is realistic.
+    Every call synthesizes (no cache lookup) and, if `FAKE_TTS_STATS` is set,
+    appends a JSON line with its busy interval for utilization reports.
+    """
+
+    name = "fake"
+    native_formats = ("wav",)
+
+    def __init__(
+        self,
+        *,
+        latency: Optional[str] = None,
+        ms_per_char: Optional[float] = None,
+        failure_rate: Optional[float] = None,
+        sample_rate: int = 24000,
+        seed: Optional[int] = None,
+    ) -> None:
+        self._latency = parse_latency(latency or os.getenv("FAKE_TTS_LATENCY", "lognormal:0.6:0.5"))
+        self._ms_per_char = ms_per_char if ms_per_char is not None else float(os.getenv("FAKE_TTS_MS_PER_CHAR", "0.5"))
+        self._failure_rate = failure_rate if failure_rate is not None else float(os.getenv("FAKE_TTS_FAILURE_RATE", "0"))
+        self._sample_rate = sample_rate
+        self._seed = seed
+        self._rng = random.Random(seed)
+        self._pid = os.getpid()
+        self._stats_path = os.getenv("FAKE_TTS_STATS") or None
+        self._cache_dir = Path(SETTINGS.AUDIO_OUT_DIR) / "_cache" / self.name
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        # 100 ms of 220 Hz tone, tiled to the utterance length
+        self._tone = b"".join(
+            int(3000 * math.sin(2 * math.pi * 220 * i / sample_rate)).to_bytes(2, "little", signed=True)
+            for i in range(sample_rate // 10)
+        )
+
+    def _record(self, start: float, end: float, ok: bool, chars: int) -> None:
+        if not self._stats_path:
+            return
+        line = json.dumps({"pid": os.getpid(), "start": start, "end": end, "ok": ok, "chars": chars}) + "\n"
+        # O_APPEND keeps concurrent writers from interleaving short lines
+        fd = os.open(self._stats_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def synthesize(self, text: str, *, voice: str | None, rate: int | None, fmt: str = "wav") -> Path:
+        if os.getpid() != self._pid:
+            # Forked pool child: don't replay the parent's random sequence
+            self._pid = os.getpid()
+            self._rng = random.Random(None if self._seed is None else self._seed + self._pid)
+        start = time.time()
+        time.sleep(self._latency(self._rng) + self._ms_per_char * len(text) / 1000)
+        if self._rng.random() < self._failure_rate:
+            self._record(start, time.time(), False, len(text))
+            raise RuntimeError("fake TTS failure (injected)")
+        key = hashlib.sha256(f"{text}|{uuid.uuid4().hex}".encode("utf-8")).hexdigest()
+        out = self._cache_dir / f"{key}.wav"
+        frames = max(1, int(len(text) / 15 * self._sample_rate))
+        body = (self._tone * (frames // (len(self._tone) // 2) + 1))[: frames * 2]
+        tmp = out.with_name(f"{out.stem}.{os.getpid()}.part.wav")
+        with wave.open(str(tmp), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self._sample_rate)
+            w.writeframes(body)
+        os.replace(tmp, out)
+        self._record(start, time.time(), True, len(text))
+        return out
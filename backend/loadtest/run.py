@@ -0,0 +1,363 @@
+"""
+End-to-end load test: concurrent /upload calls against the API and real
+Celery workers running the fake TTS engine (backend.loadtest.fake_provider).
+
+With --spawn the harness starts everything itself in a temp directory:
+uvicorn (backend.loadtest.app) and --workers Celery workers
+(backend.loadtest.worker), on the local Redis at REDIS_URL or, with
+--broker filesystem, on a filesystem queue needing no Redis at all.
+Without --spawn it drives an already running stack at --api (start the
+workers with TTS_PROVIDER=fake, see backend/loadtest/worker.py).
+
+Reports upload latency, time-to-first-audio (first paragraph file served),
+time-to-full-article (all paragraph files served), sustained uploads per
+minute, queue depth over time and worker utilization (fake TTS busy time
+over available worker slots, from FAKE_TTS_STATS).
+
+Usage (from repo root):
+  python -m backend.loadtest.run --spawn --broker filesystem --uploads 20 --clients 4
+  python -m backend.loadtest.run --spawn --workers 2 --concurrency 4 --rate 30 --uploads 60 \\
+      --latency lognormal:0.8:0.6 --failure-rate 0.02 --out loadtest.json
+  python -m backend.loadtest.run --api http://localhost:8000 --uploads 10 --slots 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from backend.benchmarks.cleaning import make_corpus, parse_size
+
+QUEUE = "audio"
+
+
+def pct(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))]
+
+
+def summarize(values: List[float]) -> dict:
+    return {
+        "n": len(values),
+        "p50": pct(values, 50),
+        "p95": pct(values, 95),
+        "p99": pct(values, 99),
+        "max": max(values) if values else None,
+        "mean": statistics.fmean(values) if values else None,
+    }
+
+
+def http(method: str, url: str, data: bytes | None = None, headers: Optional[dict] = None, timeout: float = 30):
+    req = urllib.request.Request(url, data=data, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            return r.status, r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def upload(api: str, text: str, name: str) -> tuple[int, dict, float]:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{name}\"\r\n"
+        "Content-Type: text/plain\r\n\r\n"
+    ).encode() + text.encode("utf-8") + f"\r\n--{boundary}--\r\n".encode()
+    t0 = time.perf_counter()
+    status, raw = http(
+        "POST", f"{api}/upload?tts=fake", body,
+        {"Content-Type": f"multipart/form-data; boundary={boundary}"}, timeout=120,
+    )
+    elapsed = time.perf_counter() - t0
+    try:
+        payload = json.loads(raw)
+    except Exception:
+        payload = {}
+    return status, payload, elapsed
+
+
+class Article:
+    def __init__(self, article_id: str, urls: List[str], t_upload: float) -> None:
+        self.id = article_id
+        self.pending = {i: u for i, u in enumerate(urls)}
+        self.t_upload = t_upload
+        self.t_first: Optional[float] = None
+        self.t_full: Optional[float] = None
+
+
+def audio_ready(api: str, url: str) -> bool:
+    # The worker serves WAV when no encoder is available; get_article does the same fallback
+    for candidate in (url, url.rsplit(".", 1)[0] + ".wav"):
+        status, _ = http("HEAD", f"{api}{candidate}", timeout=5)
+        if status == 200:
+            return True
+    return False
+
+
+def poll_articles(api: str, articles: List[Article], lock: threading.Lock, stop: threading.Event, interval: float) -> None:
+    while not stop.is_set():
+        with lock:
+            active = [a for a in articles if a.pending]
+        for a in active:
+            for i, url in list(a.pending.items()):
+                if audio_ready(api, url):
+                    now = time.perf_counter()
+                    del a.pending[i]
+                    if a.t_first is None:
+                        a.t_first = now
+                    if not a.pending:
+                        a.t_full = now
+        stop.wait(interval)
+
+
+def queue_depth_sampler(broker_dir: Optional[Path]):
+    if broker_dir is not None:
+        return lambda: sum(1 for p in broker_dir.iterdir() if p.suffix == ".msg")
+    try:
+        import redis
+    except ImportError:
+        return lambda: None
+    r = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), socket_timeout=1)
+    return lambda: int(r.llen(QUEUE))
+
+
+def utilization(stats_path: Path, t0: float, t1: float, slots: int, window: float) -> tuple[Optional[float], list]:
+    """Overall and per-window busy fraction of the fake TTS over `slots` workers."""
+    if not stats_path.exists() or slots <= 0:
+        return None, []
+    spans = []
+    for line in stats_path.read_text(encoding="utf-8").splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        spans.append((rec["start"], rec["end"]))
+    series = []
+    t = t0
+    while t < t1:
+        w_end = min(t + window, t1)
+        busy = sum(max(0.0, min(e, w_end) - max(s, t)) for s, e in spans)
+        series.append((round(t - t0, 1), round(busy / (slots * (w_end - t)), 3)))
+        t = w_end
+    total = sum(max(0.0, min(e, t1) - max(s, t0)) for s, e in spans)
+    return total / (slots * (t1 - t0)), series
+
+
+def spawn_stack(args, workdir: Path) -> tuple[list, dict]:
+    env = dict(os.environ)
+    env.update({
+        "AUDIO_OUT_DIR": str(workdir / "static"),
+        "CLEANED_DIR": str(workdir / "cleaned"),
+        "UPLOAD_TMP_DIR": str(workdir / "tmp"),
+        "TTS_PROVIDER": "fake",
+        "TTS_PROVIDER_ORDER": "fake",
+        "FAKE_TTS_LATENCY": args.latency,
+        "FAKE_TTS_FAILURE_RATE": str(args.failure_rate),
+        "FAKE_TTS_MS_PER_CHAR": str(args.ms_per_char),
+        "FAKE_TTS_STATS": str(workdir / "fake_stats.jsonl"),
+    })
+    if args.broker == "filesystem":
+        env["LOADTEST_BROKER_DIR"] = str(workdir / "broker")
+    procs = [subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.loadtest.app:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )]
+    worker_cmd = [sys.executable, "-m", "celery", "-A", "backend.loadtest.worker", "worker", "-Q", QUEUE,
+                  "-c", str(args.concurrency), "--loglevel", "warning"]
+    if args.broker == "filesystem":
+        # No fanout exchanges on the filesystem transport
+        worker_cmd += ["--without-gossip", "--without-mingle", "--without-heartbeat"]
+    for i in range(args.workers):
+        procs.append(subprocess.Popen(worker_cmd + ["-n", f"loadtest{i}@%h"], env=env))
+    return procs, env
+
+
+def wait_for_api(api: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if http("GET", f"{api}/api/articles", timeout=2)[0] == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"API at {api} did not come up within {timeout}s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--api", default=None, help="base URL of a running API (default: spawned one)")
+    ap.add_argument("--spawn", action="store_true", help="start API + workers in a temp dir")
+    ap.add_argument("--broker", choices=("redis", "filesystem"), default="redis")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--concurrency", type=int, default=4, help="pool size per worker")
+    ap.add_argument("--slots", type=int, default=None, help="worker slots for utilization (external stack)")
+    ap.add_argument("--stats", type=Path, default=None, help="FAKE_TTS_STATS file of an external stack")
+    ap.add_argument("--uploads", type=int, default=20)
+    ap.add_argument("--clients", type=int, default=4, help="concurrent uploaders (closed loop)")
+    ap.add_argument("--rate", type=float, default=None, help="uploads per minute (open loop)")
+    ap.add_argument("--size", default="6k", help="text bytes per upload, e.g. 6k")
+    ap.add_argument("--latency", default="lognormal:0.6:0.5")
+    ap.add_argument("--ms-per-char", type=float, default=0.5)
+    ap.add_argument("--failure-rate", type=float, default=0.0)
+    ap.add_argument("--timeout", type=float, default=300, help="max wait for all audio after the last upload")
+    ap.add_argument("--sample-interval", type=float, default=1.0)
+    ap.add_argument("--out", type=Path, default=None, help="write the full report as JSON")
+    args = ap.parse_args()
+
+    procs: list = []
+    tmp = tempfile.TemporaryDirectory(prefix="loadtest_") if args.spawn else None
+    broker_dir: Optional[Path] = None
+    stats_path = args.stats
+    slots = args.slots
+    try:
+        if args.spawn:
+            workdir = Path(tmp.name)
+            procs, _ = spawn_stack(args, workdir)
+            api = args.api or f"http://127.0.0.1:{args.port}"
+            stats_path = workdir / "fake_stats.jsonl"
+            slots = slots or args.workers * args.concurrency
+            if args.broker == "filesystem":
+                broker_dir = workdir / "broker" / "queue"
+        else:
+            api = args.api or "http://127.0.0.1:8000"
+        wait_for_api(api)
+
+        size = parse_size(args.size)
+        articles: List[Article] = []
+        upload_latency: List[float] = []
+        failures = 0
+        lock = threading.Lock()
+        stop = threading.Event()
+        depth_fn = queue_depth_sampler(broker_dir)
+        depth_series: List[tuple] = []
+        t0 = time.perf_counter()
+        wall0 = time.time()
+
+        def sample_depth() -> None:
+            while not stop.is_set():
+                try:
+                    d = depth_fn()
+                except Exception:
+                    d = None
+                depth_series.append((round(time.perf_counter() - t0, 1), d))
+                stop.wait(args.sample_interval)
+
+        def one(i: int) -> None:
+            nonlocal failures
+            # Distinct text per upload so no paragraph is served from cache
+            text = make_corpus(size, seed=i + 1)
+            status, payload, elapsed = upload(api, text, f"loadtest_{i}.txt")
+            now = time.perf_counter()
+            with lock:
+                upload_latency.append(elapsed)
+                if status != 200 or "id" not in payload:
+                    failures += 1
+                    return
+                urls = [p["audio_url"] for p in payload.get("paragraphs", [])]
+                articles.append(Article(payload["id"], urls, now - elapsed))
+
+        threads = [
+            threading.Thread(target=sample_depth, daemon=True),
+            threading.Thread(target=poll_articles, args=(api, articles, lock, stop, 0.2), daemon=True),
+        ]
+        for t in threads:
+            t.start()
+
+        with ThreadPoolExecutor(max_workers=args.clients if args.rate is None else max(args.clients, 32)) as pool:
+            if args.rate is None:
+                list(pool.map(one, range(args.uploads)))
+            else:
+                gap = 60.0 / args.rate
+                futures = []
+                for i in range(args.uploads):
+                    delay = t0 + i * gap - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    futures.append(pool.submit(one, i))
+                for f in futures:
+                    f.result()
+        t_uploads_done = time.perf_counter()
+
+        deadline = t_uploads_done + args.timeout
+        while time.perf_counter() < deadline:
+            with lock:
+                if all(not a.pending for a in articles):
+                    break
+            time.sleep(0.5)
+        stop.set()
+        t_end = time.perf_counter()
+        for t in threads:
+            t.join(timeout=5)
+
+        ttfa = [a.t_first - a.t_upload for a in articles if a.t_first is not None]
+        ttfull = [a.t_full - a.t_upload for a in articles if a.t_full is not None]
+        complete = len(ttfull)
+        util, util_series = (
+            utilization(stats_path, wall0, wall0 + (t_end - t0), slots or 0, max(5.0, args.sample_interval * 5))
+            if stats_path else (None, [])
+        )
+        depths = [d for _, d in depth_series if d is not None]
+        report = {
+            "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+            "wall_sec": round(t_end - t0, 2),
+            "uploads": len(upload_latency),
+            "upload_failures": failures,
+            "articles_complete": complete,
+            "articles_incomplete": len(articles) - complete,
+            "sustained_uploads_per_min": round(complete / (t_end - t0) * 60, 2) if complete else 0.0,
+            "upload_latency_sec": summarize(upload_latency),
+            "time_to_first_audio_sec": summarize(ttfa),
+            "time_to_full_article_sec": summarize(ttfull),
+            "queue_depth": {"max": max(depths) if depths else None, "series": depth_series},
+            "worker_utilization": {"overall": round(util, 3) if util is not None else None, "slots": slots, "series": util_series},
+        }
+
+        def fmt(s: dict) -> str:
+            if not s["n"]:
+                return "n=0"
+            return f"n={s['n']} p50={s['p50']:.2f}s p95={s['p95']:.2f}s p99={s['p99']:.2f}s max={s['max']:.2f}s"
+
+        print(f"\nwall {report['wall_sec']}s, uploads {report['uploads']} ({failures} failed), "
+              f"articles complete {complete}/{len(articles)}")
+        print(f"sustained throughput   {report['sustained_uploads_per_min']} uploads/min")
+        print(f"upload latency         {fmt(report['upload_latency_sec'])}")
+        print(f"time to first audio    {fmt(report['time_to_first_audio_sec'])}")
+        print(f"time to full article   {fmt(report['time_to_full_article_sec'])}")
+        print(f"queue depth            max={report['queue_depth']['max']} "
+              f"(samples: {' '.join(str(d) for _, d in depth_series[:: max(1, len(depth_series) // 20)])})")
+        if util is not None:
+            print(f"worker utilization     {util:.0%} of {slots} slots "
+                  f"(per window: {' '.join(f'{u:.0%}' for _, u in util_series)})")
+        if args.out:
+            args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+            print(f"report written to {args.out}")
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
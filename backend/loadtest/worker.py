@@ -0,0 +1,23 @@
+"""
+Celery worker entry point for load tests.
+
+Same tasks as backend.celery_worker, with the fake TTS engine registered
+(and the filesystem broker applied when LOADTEST_BROKER_DIR is set).
+Run with TTS_PROVIDER=fake so the task's provider order starts with it:
+
+  TTS_PROVIDER=fake TTS_PROVIDER_ORDER=fake \\
+    celery -A backend.loadtest.worker worker -Q audio -c 4 --loglevel warning
+"""
+
+from importlib import import_module
+
+from backend.celery_config import celery_app
+from backend.tts.registry import register_provider
+
+from .broker import configure
+from .fake_provider import FakeTTSProvider
+
+# Imported for its side effect: defining the tasks on celery_app
+import_module("backend.tasks")
+configure(celery_app)
+register_provider("fake", FakeTTSProvider())
@@ -6,16 +6,29 @@ ENV_PATH = BASE_DIR / ".env"                      # .../backend/.env
 load_dotenv(ENV_PATH, override=False)
 
 import os
-import re
 import sys
-import json
-import fitz
+import glob
+import shutil
 import tiktoken
 import time
 import uuid
+import mimetypes
 from openai import OpenAI
 
 from .config import SETTINGS, ensure_dirs
+from . import metrics
+from .article_store import get_article_store
+from .storage import get_audio_storage
+from .pdf_extract import extract_pdf
+from .timeline import Timeline, new_trace_id, summarize as summarize_timeline
+from .cleaning import (
+    chunk_paragraphs,
+    flatten_lines_to_paragraphs,
+    flatten_text,
+    heuristic_title,
+    normalize_whitespace,
+    remove_citations,
+)
 
 # Create OpenAI client only if we might use LLMs here (strict mode disables cleaning/title LLMs)
 client: OpenAI | None = None
@@ -27,9 +40,11 @@ if (not SETTINGS.STRICT_MODE) or SETTINGS.USE_LLM_TITLE:
 
 
 from fastapi import UploadFile, File, FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
 from pydantic import BaseModel
 from celery.result import AsyncResult
 from backend.celery_config import celery_app
@@ -49,6 +64,10 @@ ensure_dirs()
 # Upload size limit in bytes (converted from MB)
 MAX_BYTES = SETTINGS.MAX_UPLOAD_MB * 1024 * 1024
 
+# Types StaticFiles can't guess on every platform (renditions, HLS)
+mimetypes.add_type("audio/ogg", ".opus")
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+
 app.mount(
     "/static",
     StaticFiles(directory=SETTINGS.AUDIO_OUT_DIR),
@@ -63,6 +82,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class StaticEgressMiddleware:
+    """Per-article, per-rendition byte counts for audio served from /static.
+
+    Plain ASGI so only GETs under /static pay for it; HEAD sends a
+    content-length but no body and is not counted.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith("/static/"):
+            await self.app(scope, receive, send)
+            return
+        sent = {"status": 0, "length": 0}
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                sent["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-length":
+                        sent["length"] = int(value)
+            await send(message)
+
+        await self.app(scope, receive, counting_send)
+        if sent["status"] in (200, 206):
+            from .renditions import record_egress
+            try:
+                await run_in_threadpool(record_egress, scope["path"][len("/static/"):], sent["length"])
+            except Exception:
+                pass
+
+app.add_middleware(StaticEgressMiddleware)
+
+def _admin_token(request: Request) -> str | None:
+    return request.headers.get("x-admin-token") or request.query_params.get("admin_token")
+
+def require_admin(request: Request) -> None:
+    from .profiling import is_admin
+    if not getattr(SETTINGS, "ADMIN_TOKEN", ""):
+        raise HTTPException(status_code=404, detail="Not found")
+    if not is_admin(_admin_token(request)):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+async def profile_request(request: Request, call_next):
+    """Profile one request when an admin asks for it (X-Profile: 1 or ?profile=1)."""
+    if not (request.headers.get("x-profile") or request.query_params.get("profile")):
+        return await call_next(request)
+    from .profiling import Profile, is_admin
+    if not is_admin(_admin_token(request)):
+        return await call_next(request)
+    prof = Profile("api", f"{request.method}_{request.url.path}")
+    try:
+        return await call_next(request)
+    finally:
+        out = prof.stop()
+        if out is not None:
+            print(f"[INFO] Request profile: /admin/profiles/{out.name}")
+
+# Only installed when profiling can be enabled, so other deployments skip the
+# per-request BaseHTTPMiddleware hop
+if SETTINGS.ADMIN_TOKEN:
+    app.add_middleware(BaseHTTPMiddleware, dispatch=profile_request)
+
 class ArticleInput(BaseModel):
     text: str
 
@@ -74,21 +157,6 @@ class AudioRequest(BaseModel):
 
 tokenizer = tiktoken.encoding_for_model("gpt-3.5-turbo")
 
-# Final cleaning step
-
-def flatten_text(raw: str) -> str:
-    # Normalize newlines
-    txt = raw.replace("\r\n", "\n").replace("\r", "\n")
-    # Remove hyphenation across line breaks: e.g., "exam-\nple" -> "example"
-    txt = re.sub(r"(\w)-\n(\w)", r"\1\2", txt)
-    # Merge single newlines into spaces (keep double-newline as paragraph break)
-    txt = re.sub(r"(?<!\n)\n(?!\n)", " ", txt)
-    # Collapse excessive blank lines
-    txt = re.sub(r"\n{3,}", "\n\n", txt)
-    # Collapse multiple spaces
-    txt = re.sub(r"[ \t]{2,}", " ", txt)
-    return txt.strip()
-
 def query_openai(text: str, extract_title=False):
     try:
         if extract_title:
@@ -147,132 +215,16 @@ def query_openai(text: str, extract_title=False):
         print("OpenAI error:", e)
         return "Error cleaning text"
 
-# Strict cleaner functions (deterministic, no LLM)
-def normalize_whitespace(s: str) -> str:
-    # Normalize newline types and spaces
-    s = s.replace("\r\n", "\n").replace("\r", "\n")
-    # Convert non-breaking space to normal space
-    s = s.replace("\u00A0", " ")
-    # Collapse multiple spaces within lines
-    s = re.sub(r"[ \t]{2,}", " ", s)
-    return s
-
-def _is_bullet_line(line: str) -> bool:
-    stripped = line.lstrip()
-    if not stripped:
-        return False
-    if stripped.startswith(("- ", "* ", "• ")):
-        return True
-    # Numeric bullets like '1.' or '1)'
-    return bool(re.match(r"^\s*\d+[\.)]\s+", line))
-
-def flatten_lines_to_paragraphs(raw: str) -> list[str]:
-    lines = raw.split("\n")
-    paras: list[str] = []
-    current: list[str] = []
-
-    def flush():
-        if current:
-            paras.append(" ".join(current).strip())
-            current.clear()
-
-    for i, line in enumerate(lines):
-        if not line.strip():
-            # blank line → paragraph break
-            flush()
-            continue
-
-        if _is_bullet_line(line):
-            flush()
-            paras.append(line.strip())
-            continue
-
-        if current:
-            prev = current[-1]
-            # If previous ends with hyphenated word and this starts with a letter, glue without space
-            if re.search(r"[A-Za-z]-$", prev) and re.match(r"^[A-Za-z]", line):
-                current[-1] = prev[:-1] + line.strip()
-            else:
-                current.append(line.strip())
-        else:
-            current.append(line.strip())
-
-    flush()
-    return [p for p in paras if p]
-
-def split_into_sentences(p: str) -> list[str]:
-    # Protect common abbreviations to avoid splitting
-    protect = {
-        "e.g.": "__EG__",
-        "i.e.": "__IE__",
-        "etc.": "__ETC__",
-    }
-    temp = p
-    for k, v in protect.items():
-        temp = temp.replace(k, v)
-
-    # Split on punctuation followed by space and an uppercase letter/number/parenthesis
-    parts = re.split(r"(?<=[.!?])\s+(?=[A-Z(0-9])", temp)
-    # Restore abbreviations
-    def restore(s: str) -> str:
-        for k, v in protect.items():
-            s = s.replace(v, k)
-        return s
-    return [restore(x).strip() for x in parts if x and x.strip()]
-
-def chunk_paragraphs(paragraphs: list[str], limit: int) -> list[str]:
-    chunks: list[str] = []
-    current = ""
-    for p in paragraphs:
-        sentences = split_into_sentences(p)
-        for s in sentences:
-            if not current:
-                # start new
-                if len(s) > limit:
-                    # allow oversize sentence as its own chunk
-                    chunks.append(s)
-                else:
-                    current = s
-            else:
-                candidate = current + " " + s
-                if len(candidate) <= limit:
-                    current = candidate
-                else:
-                    chunks.append(current)
-                    if len(s) > limit:
-                        chunks.append(s)
-                        current = ""
-                    else:
-                        current = s
-    if current:
-        chunks.append(current)
-    return chunks
-
-def heuristic_title(raw_text: str, filename: str) -> str:
-    # take first non-empty line before first blank line
-    lines = normalize_whitespace(raw_text).split("\n")
-    block: list[str] = []
-    for line in lines:
-        if not line.strip():
-            break
-        block.append(line.strip())
-    candidate = next((l for l in block if l.strip()), "").strip()
-    def _word_count(s: str) -> int:
-        return len([w for w in s.split() if w])
-    def _is_all_capsish(s: str) -> bool:
-        letters = [ch for ch in s if ch.isalpha()]
-        return bool(letters) and sum(ch.isupper() for ch in letters) / len(letters) > 0.9
-    if candidate and _word_count(candidate) <= 16 and not _is_all_capsish(candidate):
-        return candidate
-    # fallback to filename sans extension
-    base = os.path.basename(filename or "")
-    return os.path.splitext(base)[0] or "Untitled Article"
-
 # Upload and process the article
 @app.post("/upload")
 async def upload_file(request: Request, file: UploadFile = File(...)):
+    # One trace id follows the article from here into every paragraph task
+    trace_id = request.headers.get("x-trace-id") or new_trace_id()
+    timeline = Timeline(None, trace_id=trace_id)
+    t0 = time.time()
     # Read once with a hard cap
     blob = await file.read(MAX_BYTES + 1)
+    timeline.add("read", t0)
     if len(blob) > MAX_BYTES:
         raise HTTPException(status_code=413, detail=f"File too large. Max {SETTINGS.MAX_UPLOAD_MB} MB.")
 
@@ -285,16 +237,40 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
         except UnicodeDecodeError:
             raw_text = blob.decode("utf-8", errors="ignore")
     elif lower_name.endswith(".pdf"):
-        raw_text = extract_text_from_pdf(blob)
+        t0 = time.time()
+        try:
+            # docling pages can block for PDF_DOCLING_TIMEOUT_SEC; keep the event loop free
+            extraction = await run_in_threadpool(extract_pdf, blob)
+        except Exception as e:
+            print("[ERROR] PDF extraction failed:", e)
+            raise HTTPException(status_code=400, detail="Could not extract text from PDF.")
+        t1 = time.time()
+        raw_text = extraction.text
+        tiers = {k: round(v, 4) for k, v in extraction.timings.items() if v}
+        print(f"[INFO] PDF extracted: pages by tier {extraction.tier_counts()}, seconds by tier {tiers}")
+        metrics.PDF_EXTRACT_SECONDS.observe(t1 - t0)
+        for tier, sec in tiers.items():
+            metrics.PDF_TIER_SECONDS.labels(tier).observe(sec)
+        for page in extraction.pages:
+            metrics.PDF_PAGES.labels(page.tier, page.reason or "plain").inc()
+        timeline.add("extract", t0, t1, pages=extraction.tier_counts(), tiers=tiers)
         if not raw_text or not raw_text.strip():
             raise HTTPException(status_code=400, detail="Could not extract text from PDF.")
     else:
         raise HTTPException(status_code=400, detail="Only .txt and .pdf files are supported.")
 
+    t0 = time.time()
+    citation_stats = None
     if SETTINGS.STRICT_MODE:
         print("[INFO] Strict mode: deterministic cleaning and chunking")
         text_norm = normalize_whitespace(raw_text)
         paragraphs_list = flatten_lines_to_paragraphs(text_norm)
+        if SETTINGS.REMOVE_CITATIONS:
+            paragraphs_list, citation_stats = remove_citations(paragraphs_list)
+            print(
+                f"[INFO] Removed {citation_stats['citations_removed']} citations "
+                f"({citation_stats['char_reduction']:.1%} fewer characters for TTS)"
+            )
         chunks = chunk_paragraphs(paragraphs_list, SETTINGS.CHUNK_CHAR_LIMIT)
         display_title = heuristic_title(raw_text, file.filename or "") if not SETTINGS.USE_LLM_TITLE else ""
         if SETTINGS.USE_LLM_TITLE and client is not None:
@@ -312,13 +288,21 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
         if display_title.startswith("Error") or len(display_title) > 200:
             display_title = heuristic_title(raw_text, file.filename or "")
         chunks = [p.strip() for p in cleaned_text.split("\n") if p.strip()]
+    t1 = time.time()
+    metrics.CLEANING_SECONDS.labels("strict" if SETTINGS.STRICT_MODE else "llm").observe(t1 - t0)
+    metrics.ARTICLE_CHUNKS.observe(len(chunks))
+    timeline.add("clean", t0, t1, mode="strict" if SETTINGS.STRICT_MODE else "llm", chunks=len(chunks))
     article_code = f"article_{int(time.time())}_{uuid.uuid4().hex[:6]}"
+    timeline.article_id = article_code
 
     final_payload = {
         "id": article_code,
         "title": display_title,
+        "trace_id": trace_id,
         "paragraphs": []
     }
+    if citation_stats:
+        final_payload["citations"] = citation_stats
 
     # Optional per-request provider override via query param ?tts=
     tts_override = request.query_params.get("tts")
@@ -326,10 +310,15 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
 
     # Choose delivery extension
     delivery_ext = (getattr(SETTINGS, "TTS_DELIVERY_FORMAT", "mp3") or "mp3").lower()
+    t0 = time.time()
     for i, p in enumerate(chunks):
         filename = f"{article_code}_{i+1}.{delivery_ext}"
         task = generate_audio_task.apply_async(
             args=[p, filename, article_code, "Male", tts_override, voice_override],
+            kwargs={
+                "article_id": article_code, "paragraph_index": i + 1, "paragraph_count": len(chunks),
+                "enqueued_at": time.time(), "trace_id": trace_id,
+            },
             queue="audio"
         )
         # Store API-friendly fields; keep task_id for internal use if needed
@@ -340,39 +329,46 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
             "task_id": task.id,
             "audio": filename,
         })
+    t1 = time.time()
+    metrics.ENQUEUE_SECONDS.observe(t1 - t0)
+    timeline.add("enqueue", t0, t1, trace=trace_id)
+    timeline.flush()
 
-    with open(os.path.join(SETTINGS.CLEANED_DIR, f"{article_code}.json"), "w", encoding="utf-8") as f:
-        json.dump(final_payload, f, ensure_ascii=False, indent=2)
+    get_article_store().put(article_code, final_payload)
 
     return final_payload
 
 @app.get("/api/articles")
 def list_articles():
-    articles = []
-    for filename in os.listdir(SETTINGS.CLEANED_DIR):
-        if filename.endswith(".json"):
-            with open(os.path.join(SETTINGS.CLEANED_DIR, filename), "r", encoding="utf-8") as f:
-                content = json.load(f)
-                articles.append({
-                    "id": filename.replace(".json", ""),
-                    "title": content.get("title", "Untitled")
-                })
-    return articles
+    return get_article_store().list()
 
 @app.get("/api/article/{article_id}")
 def get_article(article_id: str):
-    path = os.path.join(SETTINGS.CLEANED_DIR, f"{article_id}.json")
-    if not os.path.exists(path):
+    content = get_article_store().get(article_id)
+    if content is None:
         raise HTTPException(status_code=404, detail="Article not found")
-    with open(path, "r", encoding="utf-8") as f:
-        content = json.load(f)
     # Backward compatibility: ensure each paragraph has id and audio_url
     paragraphs = content.get("paragraphs", [])
     fixed: list[dict] = []
+    storage = get_audio_storage()
     for idx, p in enumerate(paragraphs):
         q = dict(p)
         if "id" not in q:
             q["id"] = f"p{idx+1}"
+        if not storage.local:
+            # Object storage: clients fetch audio and timings straight from the bucket
+            delivery_ext = (getattr(SETTINGS, "TTS_DELIVERY_FORMAT", "mp3") or "mp3").lower()
+            rel = q.get("audio") or f"{article_id}_{idx+1}.{delivery_ext}"
+            from .renditions import configured_renditions, remote_renditions
+            from .tts.timing import timing_path
+            q["audio_url"] = storage.url(rel)
+            q["timing_url"] = storage.url(timing_path(Path(rel)).as_posix())
+            if configured_renditions():
+                q["renditions"] = remote_renditions(rel, storage.url)
+            if "text" not in q:
+                q["text"] = p.get("text", "")
+            fixed.append(q)
+            continue
         # Build/repair audio_url so it matches an existing file on disk
         delivery_ext = (getattr(SETTINGS, "TTS_DELIVERY_FORMAT", "mp3") or "mp3").lower()
         # Prefer existing field, else construct
@@ -399,21 +395,70 @@ def get_article(article_id: str):
         except Exception:
             pass
         q["audio_url"] = audio_url
+        if audio_url.startswith("/static/"):
+            from .renditions import configured_renditions, list_renditions
+            from .tts.timing import load_timing
+            audio_file = Path(SETTINGS.AUDIO_OUT_DIR) / audio_url[len("/static/"):]
+            # Worker-computed duration and delta-encoded word timings, when present
+            timing = load_timing(audio_file)
+            if timing:
+                q["timing"] = timing
+            # Smallest first, so clients take the first one they can play
+            if configured_renditions():
+                q["renditions"] = list_renditions(audio_file)
         # Ensure text is present and unmodified from stored value
         if "text" not in q:
             q["text"] = p.get("text", "")
         fixed.append(q)
     content["paragraphs"] = fixed
+    # Whole-article file with per-paragraph byte/time offsets, once built
+    from .article_audio import load_full_index
+    full = load_full_index(article_id)
+    if full:
+        content["full_audio"] = full
+    # Progressive playlist, playable while later paragraphs are still synthesizing
+    from .tts.hls import hls_dir, playlist_url
+    if (hls_dir(article_id) / "index.m3u8").exists():
+        content["hls_url"] = playlist_url(article_id)
     return JSONResponse(content=content)
 
+@app.get("/api/article/{article_id}/timeline")
+def get_article_timeline(article_id: str):
+    """Stage timings for an article: API stages, queue wait vs work per paragraph, critical path."""
+    content = get_article_store().get(article_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return {"article_id": article_id, "trace_id": content.get("trace_id"), **summarize_timeline(article_id)}
+
 @app.delete("/api/article/{article_id}")
 def delete_article(article_id: str):
-    path = os.path.join(SETTINGS.CLEANED_DIR, f"{article_id}.json")
-    if os.path.exists(path):
-        os.remove(path)
+    if get_article_store().delete(article_id):
+        _delete_article_audio(article_id)
         return {"status": "deleted"}
     return {"error": "File not found"}
 
+def _delete_article_audio(article_id: str) -> None:
+    """Unlink the article's audio locally and in storage, then collect blobs nothing links to."""
+    from .publish import prune_blobs
+    from .tts.hls import hls_dir
+    if not article_id or "/" in article_id or "\\" in article_id or article_id.startswith("."):
+        return
+    out_dir = Path(SETTINGS.AUDIO_OUT_DIR)
+    for path in out_dir.glob(f"{glob.escape(article_id)}_*"):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    shutil.rmtree(hls_dir(article_id), ignore_errors=True)
+    prune_blobs()
+    storage = get_audio_storage()
+    if not storage.local:
+        try:
+            for prefix in (f"{article_id}_", f"hls/{article_id}/"):
+                storage.delete(prefix)
+        except Exception as e:
+            print(f"[WARN] Could not delete stored audio for {article_id}: {e}")
+
 @app.post("/generate_audio/")
 def generate_audio(req: AudioRequest, request: Request):
     tts_override = request.query_params.get("tts")
@@ -476,7 +521,61 @@ def health_tts():
 @app.get("/admin/tts/providers")
 def admin_list_providers():
     from .tts.registry import list_providers
-    return {"providers": list_providers()}
+    from .tts.router import get_router
+    names = list_providers()
+    return {"providers": names, "routing": getattr(SETTINGS, "TTS_ROUTING", "static"), "stats": get_router().snapshot(names)}
+
+@app.get("/admin/tts/cache")
+def admin_cache_stats():
+    """Audio cache hit rate, size and evictions per provider."""
+    from .tts.cache_index import get_cache_index
+    return {
+        "max_bytes": SETTINGS.TTS_CACHE_MAX_BYTES,
+        "eviction": SETTINGS.TTS_CACHE_EVICTION,
+        "providers": get_cache_index().stats(),
+    }
+
+@app.get("/admin/articles/cache")
+def admin_article_cache():
+    """Hit/miss/invalidation counts of this replica's article cache."""
+    store = get_article_store()
+    return {"backend": SETTINGS.ARTICLE_STORE, "cache": getattr(store, "stats", None)}
+
+@app.get("/admin/tts/sentence_cache/{article_id}")
+def admin_sentence_cache(article_id: str):
+    """Sentence-cache hit ratio accumulated while synthesizing an article."""
+    from .tts.sentence_cache import article_stats
+    return {"article_id": article_id, **article_stats(article_id)}
+
+@app.get("/admin/tts/egress/{article_id}")
+def admin_egress(article_id: str, hours: int = 24):
+    """Bytes served per rendition (and per hour of audio) for an article."""
+    from .renditions import egress_report
+    return egress_report(article_id, max(1, min(hours, 24 * 30)))
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint (stage histograms, cache counters, queue depth)."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/admin/profiles")
+def admin_list_profiles(request: Request):
+    """Captured request/task profiles, newest first."""
+    from .profiling import list_profiles
+    require_admin(request)
+    return {"dir": SETTINGS.PROFILE_DIR, "max_files": SETTINGS.PROFILE_MAX_FILES, "profiles": list_profiles()}
+
+@app.get("/admin/profiles/{name}")
+def admin_download_profile(name: str, request: Request):
+    """Download one profile (speedscope JSON or folded stacks for flamegraph.pl / speedscope)."""
+    from .profiling import PROFILE_NAME, profile_dir
+    require_admin(request)
+    path = profile_dir() / name
+    if not PROFILE_NAME.match(name) or not path.is_file():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media = "application/json" if name.endswith(".json") else "text/plain"
+    return FileResponse(path, media_type=media, filename=name)
 
 @app.get("/ping_celery")
 def ping_test():
@@ -485,23 +584,3 @@ def ping_test():
         queue="audio"
     )
     return {"status": "sent", "task_id": task.id}
-
-
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
-    try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        texts: list[str] = []
-        for i in range(doc.page_count):
-            p = doc.load_page(i)
-            t = p.get_text() or ""
-            if not isinstance(t, str):
-                t = ""
-            if len(t.strip()) < 5:
-                t2 = p.get_text("text")
-                if isinstance(t2, str) and t2:
-                    t = t2
-            texts.append(t)
-        return "\n".join(texts)
-    except Exception as e:
-        print("[ERROR] PDF extraction failed:", e)
-        return ""
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+from typing import Iterable, Tuple
+
+from .config import SETTINGS
+from .redis_client import get_redis
+
+# An empty value (e.g. `PROMETHEUS_MULTIPROC_DIR=` in .env) would put the
+# client in multiprocess mode with nowhere to write
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR") == "":
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR")
+
+_prom = None
+if SETTINGS.METRICS_ENABLED:
+    try:
+        import prometheus_client as _prom
+    except Exception:
+        _prom = None
+
+CONTENT_TYPE = _prom.CONTENT_TYPE_LATEST if _prom is not None else "text/plain; version=0.0.4; charset=utf-8"
+
+_STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_SYNTH_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+_PARAGRAPH_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+_CHUNK_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500)
+
+
+class _Noop:
+    """Stands in for every metric when prometheus_client is missing or disabled."""
+
+    def labels(self, *args, **kwargs) -> "_Noop":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+_NOOP = _Noop()
+
+
+def _histogram(name: str, doc: str, labels: Tuple[str, ...] = (), buckets=_STAGE_BUCKETS):
+    if _prom is None:
+        return _NOOP
+    return _prom.Histogram(name, doc, labels, buckets=buckets)
+
+
+def _counter(name: str, doc: str, labels: Tuple[str, ...] = ()):
+    if _prom is None:
+        return _NOOP
+    return _prom.Counter(name, doc, labels)
+
+
+# API stages
+PDF_EXTRACT_SECONDS = _histogram("pdf_extract_seconds", "Time to extract text from an uploaded PDF")
+PDF_TIER_SECONDS = _histogram("pdf_extract_tier_seconds", "PDF extraction time per tier and document", ("tier",))
+PDF_PAGES = _counter("pdf_pages_total", "PDF pages extracted, by tier and classifier reason", ("tier", "reason"))
+CLEANING_SECONDS = _histogram("cleaning_seconds", "Time to clean and chunk an uploaded article", ("mode",))
+ARTICLE_CHUNKS = _histogram("article_chunks", "Paragraph chunks per uploaded article", buckets=_CHUNK_BUCKETS)
+ENQUEUE_SECONDS = _histogram("enqueue_seconds", "Time to enqueue all paragraph tasks of an article")
+
+# Worker stages
+SYNTHESIS_SECONDS = _histogram(
+    "tts_synthesis_seconds", "Provider synthesis time per paragraph (cache hits excluded)",
+    ("provider", "model"), buckets=_SYNTH_BUCKETS,
+)
+TRANSCODE_SECONDS = _histogram("audio_transcode_seconds", "WAV to delivery-format encode time", ("format", "encoder"))
+PARAGRAPH_SECONDS = _histogram(
+    "paragraph_latency_seconds", "Enqueue to published audio, per paragraph",
+    ("path",), buckets=_PARAGRAPH_BUCKETS,
+)
+CACHE_REQUESTS = _counter("tts_cache_requests_total", "Audio cache lookups by outcome", ("provider", "result"))
+CIRCUIT_TRIPS = _counter("tts_circuit_breaker_trips_total", "Times a provider's circuit breaker opened", ("provider",))
+FALLBACKS = _counter("tts_fallbacks_total", "Synthesis attempts handed to the next provider after a failure", ("provider",))
+WORKER_WARMUP_SECONDS = _histogram("worker_warmup_seconds", "Worker child warm-up time at process init")
+FIRST_TASK_SECONDS = _histogram(
+    "worker_first_task_seconds", "Run time of the first audio task in each worker child",
+    ("warmed",), buckets=_SYNTH_BUCKETS,
+)
+HTTP_REQUESTS = _counter("http_client_requests_total", "Requests sent by pooled upstream HTTP clients", ("client",))
+HTTP_CONNECTIONS = _counter(
+    "http_client_connections_total", "New TCP connections opened by pooled upstream HTTP clients (reuse = 1 - connections/requests)",
+    ("client",),
+)
+
+
+class _QueueDepthCollector:
+    """`celery_queue_length` gauge, read from the Redis broker at scrape time."""
+
+    def __init__(self, queues: Iterable[str]) -> None:
+        self._queues = tuple(queues)
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        fam = GaugeMetricFamily("celery_queue_length", "Messages waiting in a Celery queue", labels=["queue"])
+        r = get_redis()
+        if r is not None:
+            for q in self._queues:
+                try:
+                    fam.add_metric([q], float(r.llen(q)))
+                except Exception:
+                    continue
+        yield fam
+
+
+_queue_registry = None
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition text for the API's /metrics endpoint."""
+    global _queue_registry
+    if _prom is None:
+        return b"# prometheus_client not installed or METRICS_ENABLED=false\n", CONTENT_TYPE
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = _prom.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = _prom.REGISTRY
+    if _queue_registry is None:
+        # Kept out of the default registry so workers never poll Redis for it
+        _queue_registry = _prom.CollectorRegistry(auto_describe=False)
+        _queue_registry.register(_QueueDepthCollector(["audio"]))
+    return _prom.generate_latest(registry) + _prom.generate_latest(_queue_registry), CONTENT_TYPE
+
+
+def start_worker_exporter(**_kwargs) -> None:
+    """Serve worker metrics on METRICS_WORKER_PORT (Celery `worker_init` handler).
+
+    With the prefork pool each child records into PROMETHEUS_MULTIPROC_DIR
+    and this exporter, started in the parent, aggregates them. Without that
+    directory only the parent's own metrics are visible, which is only
+    complete for the solo and threads pools.
+    """
+    port = int(getattr(SETTINGS, "METRICS_WORKER_PORT", 0) or 0)
+    if _prom is None or port <= 0:
+        return
+    try:
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+
+            registry = _prom.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            print("[WARN] PROMETHEUS_MULTIPROC_DIR unset; worker exporter only sees the main process")
+            registry = _prom.REGISTRY
+        _prom.start_http_server(port, registry=registry)
+        print(f"[INFO] Worker metrics exporter listening on :{port}")
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] Could not start worker metrics exporter: {e}")
+
+
+def mark_process_dead(pid: int | None = None, **_kwargs) -> None:
+    """Drop a finished pool child's live-gauge files (Celery `worker_process_shutdown` handler)."""
+    if _prom is None or not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    try:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid or os.getpid())
+    except Exception:
+        pass
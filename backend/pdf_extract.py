@@ -0,0 +1,248 @@
+"""PDF text extraction: PyMuPDF for plain pages, docling for hard ones.
+
+Every page is classified from cheap PyMuPDF signals (text block count and
+size, column layout, text density vs images). Plain single-column pages keep
+the fast `get_text()` path; multi-column, fragmented (tables/figures) and
+scanned pages go to a docling process pool, one page per job. Without
+docling, or when a docling job fails or times out, hard pages fall back to
+column-ordered PyMuPDF blocks.
+
+Kept out of main.py so benchmarks and workers can import it without FastAPI.
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib.util
+import io
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import fitz
+
+from .config import SETTINGS
+
+# Classifier thresholds (PDF points / characters)
+_MIN_BLOCK_CHARS = 40        # blocks shorter than this don't vote on columns
+_GUTTER_FRAC = 0.02          # slack around the page midline for column edges
+_FRAGMENTED_BLOCKS = 40      # this many text blocks suggests tables/figure labels
+_SHORT_BLOCK_CHARS = 25      # ...as does a low median block length
+_SCANNED_MAX_CHARS = 50      # less text than this plus an image => scanned page
+
+
+@dataclass
+class PageInfo:
+    index: int
+    tier: str                # "fast" | "docling" | "fallback" (hard page kept on PyMuPDF)
+    reason: str = ""
+    blocks: int = 0
+    columns: int = 1
+    chars: int = 0
+
+
+@dataclass
+class PdfExtraction:
+    text: str
+    pages: List[PageInfo] = field(default_factory=list)
+    # Seconds spent per tier: classify, fast, docling, fallback
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def tier_counts(self) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        for p in self.pages:
+            out[p.tier] = out.get(p.tier, 0) + 1
+        return out
+
+
+def _columns(text_blocks: list, width: float) -> int:
+    """2 when substantial blocks sit on both sides of the midline and few span it."""
+    big = [b for b in text_blocks if len(b[4].strip()) >= _MIN_BLOCK_CHARS]
+    if len(big) < 4:
+        return 1
+    mid, slack = width / 2, width * _GUTTER_FRAC
+    left = sum(1 for b in big if b[2] <= mid + slack)
+    right = sum(1 for b in big if b[0] >= mid - slack)
+    spanning = len(big) - left - right
+    return 2 if left >= 2 and right >= 2 and spanning <= len(big) // 4 else 1
+
+
+def classify_page(page: "fitz.Page", blocks: Optional[list] = None) -> PageInfo:
+    if blocks is None:
+        blocks = page.get_text("blocks")
+    text_blocks = [b for b in blocks if b[6] == 0 and b[4].strip()]
+    images = len(blocks) - len([b for b in blocks if b[6] == 0])
+    chars = sum(len(b[4].strip()) for b in text_blocks)
+    info = PageInfo(index=page.number, tier="fast", blocks=len(text_blocks), chars=chars)
+    if chars < _SCANNED_MAX_CHARS and (images or page.get_images()):
+        info.tier, info.reason = "docling", "scanned"
+        return info
+    info.columns = _columns(text_blocks, page.rect.width)
+    if info.columns > 1:
+        info.tier, info.reason = "docling", "columns"
+        return info
+    if len(text_blocks) >= _FRAGMENTED_BLOCKS or (
+        len(text_blocks) > 15 and sorted(len(b[4].strip()) for b in text_blocks)[len(text_blocks) // 2] < _SHORT_BLOCK_CHARS
+    ):
+        info.tier, info.reason = "docling", "fragmented"
+    return info
+
+
+def _column_text(blocks: list, width: float) -> str:
+    """Reading order for a two-column page: headers, left column, right column, footers."""
+    text_blocks = [b for b in blocks if b[6] == 0 and b[4].strip()]
+    mid, slack = width / 2, width * _GUTTER_FRAC
+    cols = [b for b in text_blocks if b[2] <= mid + slack or b[0] >= mid - slack]
+    top = min((b[1] for b in cols), default=0.0)
+
+    def key(b):
+        if b[2] <= mid + slack:
+            group = 1
+        elif b[0] >= mid - slack:
+            group = 2
+        else:
+            group = 0 if b[1] < top else 3
+        return (group, b[1], b[0])
+
+    return "\n".join(b[4].rstrip() for b in sorted(text_blocks, key=key)) + "\n"
+
+
+def _fast_text(page: "fitz.Page", textpage) -> str:
+    t = page.get_text("text", textpage=textpage) or ""
+    return t if isinstance(t, str) else ""
+
+
+# docling runs in separate processes: it loads layout models once per worker
+# and is not safe to fork from a threaded server, hence the spawn context.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_converter = None
+
+
+@functools.lru_cache(maxsize=1)
+def docling_available() -> bool:
+    return importlib.util.find_spec("docling") is not None
+
+
+def _docling_init() -> None:
+    global _converter
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    opts = PdfPipelineOptions()
+    opts.do_ocr = SETTINGS.PDF_DOCLING_OCR
+    # Tables are read as text anyway; structure recognition is the slowest model
+    opts.do_table_structure = False
+    _converter = DocumentConverter(format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=opts)})
+
+
+def _docling_page(pdf_bytes: bytes, name: str) -> str:
+    from docling.datamodel.base_models import DocumentStream
+
+    result = _converter.convert(DocumentStream(name=name, stream=io.BytesIO(pdf_bytes)))
+    doc = result.document
+    export = getattr(doc, "export_to_text", None) or doc.export_to_markdown
+    return export()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, SETTINGS.PDF_DOCLING_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_docling_init,
+            )
+        return _pool
+
+
+def _recycle_pool() -> None:
+    """Swap in a fresh pool after a timeout; a running docling job can't be cancelled.
+
+    Later uploads would otherwise queue behind the stuck worker until they
+    too hit the deadline. The old pool is only shut down: jobs already
+    running on it (other uploads' pages included) finish there and its
+    workers exit afterwards; jobs still queued on it are cancelled and those
+    pages fall back to PyMuPDF.
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _single_page_pdf(doc: "fitz.Document", index: int) -> bytes:
+    one = fitz.open()
+    one.insert_pdf(doc, from_page=index, to_page=index)
+    try:
+        return one.tobytes()
+    finally:
+        one.close()
+
+
+def extract_pdf(pdf_bytes: bytes) -> PdfExtraction:
+    """Tiered extraction with the tier and reason per page and time per tier."""
+    timings = {"classify": 0.0, "fast": 0.0, "docling": 0.0, "fallback": 0.0}
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    texts: List[str] = [""] * doc.page_count
+    pages: List[PageInfo] = []
+    hard: List[tuple] = []
+    use_docling = SETTINGS.PDF_TIERED and docling_available()
+    for i in range(doc.page_count):
+        p = doc.load_page(i)
+        t0 = time.perf_counter()
+        tp = p.get_textpage()
+        if SETTINGS.PDF_TIERED:
+            blocks = p.get_text("blocks", textpage=tp)
+            info = classify_page(p, blocks)
+        else:
+            blocks, info = [], PageInfo(index=i, tier="fast")
+        t1 = time.perf_counter()
+        timings["classify"] += t1 - t0
+        if info.tier == "docling" and use_docling and len(hard) < SETTINGS.PDF_DOCLING_MAX_PAGES:
+            hard.append((info, blocks, p.rect.width))
+        elif info.tier == "docling":
+            # No docling (or over the per-document budget): best effort on the fast path
+            info.tier = "fallback"
+            texts[i] = _column_text(blocks, p.rect.width) if info.columns > 1 else _fast_text(p, tp)
+            timings["fallback"] += time.perf_counter() - t1
+        else:
+            texts[i] = _fast_text(p, tp)
+            timings["fast"] += time.perf_counter() - t1
+        pages.append(info)
+
+    if hard:
+        t0 = time.perf_counter()
+        pool = _get_pool()
+        jobs = [(info, blocks, width, pool.submit(_docling_page, _single_page_pdf(doc, info.index), f"page{info.index + 1}.pdf"))
+                for info, blocks, width in hard]
+        deadline = time.monotonic() + SETTINGS.PDF_DOCLING_TIMEOUT_SEC
+        timed_out = False
+        for info, blocks, width, fut in jobs:
+            try:
+                texts[info.index] = fut.result(timeout=max(0.0, deadline - time.monotonic())).rstrip() + "\n"
+            except Exception as e:  # noqa: BLE001
+                print(f"[WARN] docling failed on page {info.index + 1} ({info.reason}), using PyMuPDF: {e!r}")
+                timed_out = timed_out or isinstance(e, FutureTimeout)
+                fut.cancel()
+                info.tier = "fallback"
+                texts[info.index] = _column_text(blocks, width) if info.columns > 1 else "".join(b[4] for b in blocks if b[6] == 0)
+        if timed_out:
+            _recycle_pool()
+        timings["docling"] = time.perf_counter() - t0
+    doc.close()
+    return PdfExtraction(text="\n".join(texts), pages=pages, timings=timings)
+
+
+def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+    try:
+        return extract_pdf(pdf_bytes).text
+    except Exception as e:
+        print("[ERROR] PDF extraction failed:", e)
+        return ""
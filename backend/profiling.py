@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config import SETTINGS
+
+_SAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+# Profiles are only ever served from this pattern, never an arbitrary path
+PROFILE_NAME = re.compile(r"^[A-Za-z0-9_.-]+\.(speedscope\.json|folded)$")
+
+
+def profile_dir() -> Path:
+    return Path(SETTINGS.PROFILE_DIR)
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """True when ADMIN_TOKEN is set and `token` matches it."""
+    expected = getattr(SETTINGS, "ADMIN_TOKEN", "")
+    return bool(expected and token) and hmac.compare_digest(str(token), expected)
+
+
+def should_profile_task() -> bool:
+    rate = getattr(SETTINGS, "PROFILE_TASK_SAMPLE_RATE", 0.0)
+    return rate > 0 and random.random() < rate
+
+
+class _StackSampler:
+    """Fallback statistical profiler when pyinstrument isn't installed.
+
+    A daemon thread snapshots every other thread's stack each interval and
+    counts identical stacks, which is exactly the collapsed ("folded") format
+    flamegraph.pl and speedscope read. It sees all threads, so a sync
+    endpoint running in the threadpool is captured along with the event loop.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self._interval = interval
+        self._counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self._interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        return "".join(f"{stack} {n}\n" for stack, n in self._counts.most_common())
+
+
+class Profile:
+    """One profiling session; `stop()` writes it under PROFILE_DIR and returns the path.
+
+    Uses pyinstrument (speedscope JSON) when installed, else `_StackSampler`
+    (folded stacks). pyinstrument only samples the thread that started it,
+    so for API requests it covers async endpoints, not threadpool ones.
+    """
+
+    def __init__(self, kind: str, label: str) -> None:
+        self.kind = kind
+        self.label = label
+        self._started = time.time()
+        interval = max(0.0005, getattr(SETTINGS, "PROFILE_INTERVAL_MS", 1.0) / 1000.0)
+        self._pyi = None
+        self._sampler: Optional[_StackSampler] = None
+        try:
+            from pyinstrument import Profiler
+
+            # Whole-thread mode: under BaseHTTPMiddleware the endpoint runs in
+            # another task on the same loop, which context tracking would drop
+            self._pyi = Profiler(interval=interval, async_mode="disabled")
+            self._pyi.start()
+        except Exception:
+            self._pyi = None
+            self._sampler = _StackSampler(max(interval, 0.005))
+            self._sampler.start()
+
+    def stop(self) -> Optional[Path]:
+        try:
+            if self._pyi is not None:
+                from pyinstrument.renderers import SpeedscopeRenderer
+
+                session = self._pyi.stop()
+                body, ext = SpeedscopeRenderer().render(session), "speedscope.json"
+            else:
+                body, ext = self._sampler.stop(), "folded"
+        except Exception as e:  # noqa: BLE001
+            print(f"[WARN] Profiling {self.kind} '{self.label}' failed: {e}")
+            return None
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self._started))
+        name = f"{stamp}_{self.kind}_{_SAFE.sub('_', self.label).strip('_')[:60]}_{os.getpid()}_{uuid.uuid4().hex[:4]}.{ext}"
+        out = profile_dir() / name
+        try:
+            out.parent.mkdir(parents=True, exist_ok=True)
+            tmp = out.with_name(f".{out.name}.{os.getpid()}.part")
+            tmp.write_text(body, encoding="utf-8")
+            os.replace(tmp, out)
+            _prune()
+        except OSError as e:
+            print(f"[WARN] Could not write profile {name}: {e}")
+            return None
+        print(f"[INFO] Profile written: {out}")
+        return out
+
+
+def _prune() -> None:
+    """Keep PROFILE_DIR to the newest PROFILE_MAX_FILES profiles."""
+    keep = max(1, int(getattr(SETTINGS, "PROFILE_MAX_FILES", 50)))
+    files = list_profiles()
+    for entry in files[keep:]:
+        try:
+            (profile_dir() / entry["name"]).unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[dict]:
+    """Profiles on disk, newest first."""
+    out = []
+    try:
+        entries = list(os.scandir(profile_dir()))
+    except OSError:
+        return []
+    for e in entries:
+        if not PROFILE_NAME.match(e.name):
+            continue
+        try:
+            st = e.stat()
+        except OSError:
+            continue
+        out.append({"name": e.name, "bytes": st.st_size, "created": st.st_mtime})
+    out.sort(key=lambda x: x["created"], reverse=True)
+    return out
+
+
+# Celery hooks: profile a sample of generate_audio_task runs
+_task_profiles: Dict[str, Profile] = {}
+
+
+def start_task_profile(task_id=None, task=None, kwargs=None, **_extra) -> None:
+    """`task_prerun` handler; a no-op unless the run is sampled."""
+    if task is None or task.name != "tasks.generate_audio_task" or not should_profile_task():
+        return
+    kw = kwargs or {}
+    label = f"{kw['article_id']}_p{kw.get('paragraph_index')}" if kw.get("article_id") else (task_id or "unknown")
+    _task_profiles[task_id] = Profile("task", label)
+
+
+def stop_task_profile(task_id=None, **_extra) -> None:
+    """`task_postrun` handler."""
+    prof = _task_profiles.pop(task_id, None)
+    if prof is not None:
+        prof.stop()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+
+from .config import SETTINGS
+
+# Linux FICLONE ioctl (btrfs, XFS with reflink=1, ...)
+_FICLONE = 0x40049409
+# Provider cache names are already a sha256 key (cache_key), optionally with a
+# variant tag (normalized masters): `<key>.wav`, `norm/<key>_<tag>.wav`, ...
+_CACHE_NAME = re.compile(r"^[0-9a-f]{64}(?:_[A-Za-z0-9.+-]+)?$")
+
+
+def blob_dir() -> Path:
+    return Path(SETTINGS.AUDIO_OUT_DIR) / "_blobs"
+
+
+def _address(path: Path) -> str:
+    """Blob name for `path`: its cache key when it has one, else a content hash."""
+    if _CACHE_NAME.match(path.stem):
+        return path.stem
+    return _digest(path)
+
+
+def _digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+
+
+def _place(src: Path, dst: Path) -> str:
+    """Make `dst` hold the bytes of `src` as cheaply as the filesystem allows.
+
+    Hardlink, then reflink, then a plain copy (e.g. across devices). The
+    result appears atomically via a temp name + rename. Returns the method.
+    """
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.part")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+        method = "hardlink"
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+            raise
+        if _reflink(src, tmp):
+            method = "reflink"
+        else:
+            shutil.copyfile(src, tmp)
+            method = "copy"
+    os.replace(tmp, dst)
+    return method
+
+
+def publish(src: Path, dest: Path) -> Path:
+    """Publish `src` (usually a file in the provider cache) at `dest`.
+
+    Files are addressed under AUDIO_OUT_DIR/_blobs/ by their cache key (the
+    hash of text, voice and settings), so identical paragraphs across
+    articles share one inode without reading the file. Only files outside
+    the provider cache are hashed. `dest` is a hardlink to the blob:
+    publishing is a metadata operation, and the bytes stay referenced even if
+    the cache later evicts `src`.
+    """
+    address = _address(src)
+    blob = blob_dir() / address[:2] / f"{address}{src.suffix.lower()}"
+    if not blob.exists():
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        _place(src, blob)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists() and os.path.samefile(dest, blob):
+        return dest
+    method = _place(blob, dest)
+    if method == "copy":
+        print(f"[WARN] Published {dest.name} by copy; static dir and blob store on different devices?")
+    return dest
+
+
+def prune_blobs(min_age_sec: float = 600.0) -> int:
+    """Delete blobs no published file links to any more; returns how many.
+
+    A blob with one link is only referenced by the store itself. Recently
+    changed inodes are skipped: between `_place(src, blob)` and the link at
+    `dest`, a fresh blob briefly has a single link too.
+    """
+    cutoff = time.time() - min_age_sec
+    removed = 0
+    try:
+        shards = list(os.scandir(blob_dir()))
+    except OSError:
+        return 0
+    for shard in shards:
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            try:
+                st = entry.stat(follow_symlinks=False)
+                if st.st_nlink == 1 and st.st_ctime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+    if removed:
+        print(f"[INFO] Pruned {removed} unreferenced audio blobs")
+    return removed
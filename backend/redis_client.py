@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Optional
+
+_client: Optional[Any] = None
+
+
+def get_redis() -> Any | None:
+    """Return a shared Redis client for cross-process state, or None.
+
+    Uses the same REDIS_URL as Celery. Short socket timeouts keep callers on
+    hot paths from stalling when Redis is slow; callers must still treat every
+    command as fallible and degrade to process-local state.
+    """
+    global _client
+    if _client is None:
+        try:
+            import redis
+        except Exception:
+            return None
+        url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        _client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _client
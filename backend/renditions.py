@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .config import SETTINGS
+from .redis_client import get_redis
+from .tts.audio_utils import transcode_wav_to
+
+_MIME = {
+    "mp3": "audio/mpeg",
+    "ogg": "audio/ogg; codecs=vorbis",
+    "opus": "audio/ogg; codecs=opus",
+    "wav": "audio/wav",
+}
+# Served file names: <article>_<n|full>[.<rendition>].<ext>, plus HLS segments
+_STATIC_NAME = re.compile(r"^(?P<article>.+)_(?P<part>\d+|full)(?:\.(?P<tag>[a-z0-9-]+))?\.(?P<ext>[a-z0-9]+)$")
+_EGRESS_TTL_SEC = 30 * 24 * 3600
+
+
+@dataclass(frozen=True)
+class Rendition:
+    format: str
+    bitrate: str
+
+    @property
+    def tag(self) -> str:
+        return f"{self.format}-{self.bitrate}"
+
+    @property
+    def ext(self) -> str:
+        return self.format
+
+    @property
+    def mime(self) -> str:
+        return _MIME.get(self.format, "application/octet-stream")
+
+
+def configured_renditions() -> List[Rendition]:
+    """Extra renditions from TTS_RENDITIONS, e.g. "opus:24k,mp3:64k"."""
+    out: List[Rendition] = []
+    for item in (getattr(SETTINGS, "TTS_RENDITIONS", "") or "").split(","):
+        fmt, _, bitrate = item.strip().lower().partition(":")
+        if fmt in _MIME and fmt != "wav":
+            out.append(Rendition(fmt, bitrate or "32k"))
+    return out
+
+
+def rendition_path(dest: Path, r: Rendition) -> Path:
+    return dest.with_name(f"{dest.stem}.{r.tag}.{r.ext}")
+
+
+def encode_renditions(source: Path, dest: Path) -> List[Path]:
+    """Encode each configured rendition of a paragraph next to its primary file.
+
+    `source` is the WAV master when there is one; otherwise the delivered
+    file is decoded again (PyAV/ffmpeg accept any input).
+    """
+    written: List[Path] = []
+    for r in configured_renditions():
+        out = rendition_path(dest, r)
+        if out.exists():
+            written.append(out)
+            continue
+        if transcode_wav_to(source, out, format=r.format, bitrate=r.bitrate):
+            written.append(out)
+        else:
+            print(f"[WARN] Could not encode {r.tag} rendition of {dest.name}")
+    return written
+
+
+def list_renditions(primary: Path) -> List[dict]:
+    """Available renditions of a delivered file, smallest first."""
+    found = []
+    if primary.exists():
+        ext = primary.suffix.lstrip(".").lower()
+        found.append((primary, ext, None, _MIME.get(ext, "application/octet-stream")))
+    for r in configured_renditions():
+        p = rendition_path(primary, r)
+        if p.exists():
+            found.append((p, r.format, r.bitrate, r.mime))
+    items = [
+        {"format": fmt, "bitrate": bitrate, "mime": mime, "url": f"/static/{p.name}", "bytes": p.stat().st_size}
+        for p, fmt, bitrate, mime in found
+    ]
+    return sorted(items, key=lambda i: i["bytes"])
+
+
+def remote_renditions(rel: str, url_for: Callable[[str], str]) -> List[dict]:
+    """Renditions of a paragraph held in object storage, lowest bitrate first.
+
+    Sizes aren't known without a request per file, so entries are ordered by
+    configured bitrate, with the primary file (the highest bitrate) last.
+    """
+    primary = Path(rel)
+    ext = primary.suffix.lstrip(".").lower()
+    items = [
+        {"format": r.format, "bitrate": r.bitrate, "mime": r.mime, "url": url_for(rendition_path(primary, r).as_posix())}
+        for r in sorted(configured_renditions(), key=lambda r: _kbps(r.bitrate))
+    ]
+    items.append({"format": ext, "bitrate": None, "mime": _MIME.get(ext, "application/octet-stream"), "url": url_for(rel)})
+    return items
+
+
+def _kbps(bitrate: str) -> float:
+    try:
+        return float(bitrate.lower().rstrip("k"))
+    except ValueError:
+        return 0.0
+
+
+# LRU of paragraph durations; egress is recorded from threadpool threads
+_DURATIONS_MAX = 4096
+_durations: "OrderedDict[str, float]" = OrderedDict()
+_durations_lock = threading.Lock()
+
+
+def _duration_sec(article_id: str, part: str) -> Optional[float]:
+    """Paragraph duration from the worker's timing file (shared by all renditions)."""
+    key = f"{article_id}_{part}"
+    with _durations_lock:
+        if key in _durations:
+            _durations.move_to_end(key)
+            return _durations[key]
+    base = Path(SETTINGS.AUDIO_OUT_DIR)
+    p = base / (f"{key}.index.json" if part == "full" else f"{key}.timing.json")
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    sec = data.get("duration_sec") or (data.get("duration_ms") or 0) / 1000
+    if not sec:
+        return None
+    with _durations_lock:
+        _durations[key] = float(sec)
+        _durations.move_to_end(key)
+        while len(_durations) > _DURATIONS_MAX:
+            _durations.popitem(last=False)
+    return float(sec)
+
+
+def record_egress(rel_path: str, nbytes: int) -> None:
+    """Count bytes served from /static per article, clock hour and rendition.
+
+    Alongside the bytes, the amount of audio those bytes carry (bytes / file
+    size * duration) is summed, so the report can compare renditions as
+    bytes per hour of audio.
+    """
+    r = get_redis()
+    if r is None or nbytes <= 0:
+        return
+    parts = rel_path.split("/")
+    if parts[0] == "hls" and len(parts) == 3:
+        article_id, label, audio_sec = parts[1], "hls", None
+    else:
+        m = _STATIC_NAME.match(parts[-1])
+        if m is None or m.group("ext") == "json":
+            return
+        article_id = m.group("article")
+        label = m.group("tag") or m.group("ext")
+        audio_sec = None
+        dur = _duration_sec(article_id, m.group("part"))
+        try:
+            size = (Path(SETTINGS.AUDIO_OUT_DIR) / rel_path).stat().st_size
+            if dur and size:
+                audio_sec = nbytes / size * dur
+        except OSError:
+            pass
+    key = f"egress:{article_id}:{time.strftime('%Y%m%d%H', time.gmtime())}"
+    try:
+        pipe = r.pipeline()
+        pipe.hincrby(key, f"{label}:bytes", nbytes)
+        if audio_sec:
+            pipe.hincrbyfloat(key, f"{label}:audio_sec", audio_sec)
+        pipe.expire(key, _EGRESS_TTL_SEC)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def egress_report(article_id: str, hours: int = 24) -> dict:
+    """Bytes served per rendition for the last `hours` clock hours."""
+    r = get_redis()
+    if r is None:
+        return {"available": False}
+    now = time.time()
+    hour_keys = [time.strftime("%Y%m%d%H", time.gmtime(now - h * 3600)) for h in range(hours - 1, -1, -1)]
+    try:
+        pipe = r.pipeline()
+        for h in hour_keys:
+            pipe.hgetall(f"egress:{article_id}:{h}")
+        rows = pipe.execute()
+    except Exception as e:  # noqa: BLE001
+        return {"available": False, "error": str(e)}
+    hourly: Dict[str, Dict[str, int]] = {}
+    totals: Dict[str, Dict[str, float]] = {}
+    for h, row in zip(hour_keys, rows):
+        for field, value in (row or {}).items():
+            field = field.decode() if isinstance(field, bytes) else field
+            label, _, metric = field.rpartition(":")
+            t = totals.setdefault(label, {"bytes": 0, "audio_sec": 0.0})
+            if metric == "bytes":
+                t["bytes"] += int(value)
+                hourly.setdefault(h, {})[label] = int(value)
+            else:
+                t["audio_sec"] += float(value)
+    renditions = {
+        label: {
+            "bytes": int(t["bytes"]),
+            "audio_sec": round(t["audio_sec"], 1),
+            "bytes_per_audio_hour": int(t["bytes"] / t["audio_sec"] * 3600) if t["audio_sec"] else None,
+        }
+        for label, t in totals.items()
+    }
+    return {"available": True, "article_id": article_id, "hours": hours, "renditions": renditions, "hourly": hourly}
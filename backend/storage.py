@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import mimetypes
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+from .config import SETTINGS
+
+mimetypes.add_type("audio/ogg", ".opus")
+
+# Delivered names never change content (a new synthesis gets a new article id)
+_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class AudioStorage(ABC):
+    """Where delivered audio (and its sidecar JSON) is served from.
+
+    Workers always produce files under AUDIO_OUT_DIR first (the encoders,
+    timing, renditions and HLS steps work on local paths); `save` then makes
+    a file available under its path relative to AUDIO_OUT_DIR, and `url`
+    returns what clients should fetch.
+    """
+
+    name = "base"
+    # True when the API serves the files itself from AUDIO_OUT_DIR (/static)
+    local = True
+
+    @abstractmethod
+    def save(self, path: Path) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def url(self, rel: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, rel: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, prefix: str) -> int:
+        """Remove every stored file whose relative path starts with `prefix`."""
+        raise NotImplementedError
+
+    def rel(self, path: Path) -> str:
+        return Path(path).resolve().relative_to(Path(SETTINGS.AUDIO_OUT_DIR).resolve()).as_posix()
+
+
+class FilesystemStorage(AudioStorage):
+    """The original setup: API and workers share AUDIO_OUT_DIR, served by StaticFiles."""
+
+    name = "filesystem"
+    local = True
+
+    def save(self, path: Path) -> None:
+        pass
+
+    def url(self, rel: str) -> str:
+        return f"/static/{rel}"
+
+    def exists(self, rel: str) -> bool:
+        return (Path(SETTINGS.AUDIO_OUT_DIR) / rel).exists()
+
+    def delete(self, prefix: str) -> int:
+        # The store is AUDIO_OUT_DIR itself; callers already clean that up
+        return 0
+
+
+class S3Storage(AudioStorage):
+    """S3-compatible bucket (AWS, MinIO, ...); clients get public or presigned URLs.
+
+    Uploads stream the file in S3_PART_MB parts (multipart above one part),
+    so a worker never holds a whole file in memory. Presigning is a local
+    signature, so building URLs for an article costs no requests. The audio
+    bytes never pass through the API process.
+    """
+
+    name = "s3"
+    local = False
+
+    def __init__(self) -> None:
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        self._bucket = SETTINGS.S3_BUCKET
+        if not self._bucket:
+            raise RuntimeError("AUDIO_STORAGE=s3 requires S3_BUCKET")
+        self._prefix = SETTINGS.S3_PREFIX.strip("/")
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=SETTINGS.S3_ENDPOINT_URL or None,
+            region_name=SETTINGS.S3_REGION or None,
+            # MinIO and most self-hosted endpoints need path-style addressing
+            config=Config(s3={"addressing_style": "path" if SETTINGS.S3_ENDPOINT_URL else "auto"}, signature_version="s3v4"),
+        )
+        part = max(5, SETTINGS.S3_PART_MB) * 1024 * 1024
+        self._transfer = TransferConfig(multipart_threshold=part, multipart_chunksize=part, use_threads=False)
+
+    def key(self, rel: str) -> str:
+        return f"{self._prefix}/{rel}" if self._prefix else rel
+
+    def save(self, path: Path) -> None:
+        ctype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        with open(path, "rb") as f:
+            self._client.upload_fileobj(
+                f, self._bucket, self.key(self.rel(path)),
+                ExtraArgs={"ContentType": ctype, "CacheControl": _CACHE_CONTROL},
+                Config=self._transfer,
+            )
+
+    def exists(self, rel: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self._bucket, Key=self.key(rel))
+            return True
+        except Exception:
+            return False
+
+    def delete(self, prefix: str) -> int:
+        deleted = 0
+        pages = self._client.get_paginator("list_objects_v2").paginate(Bucket=self._bucket, Prefix=self.key(prefix))
+        for page in pages:
+            # One listing page is at most 1000 keys, the delete_objects limit
+            keys = [{"Key": o["Key"]} for o in page.get("Contents", [])]
+            if keys:
+                self._client.delete_objects(Bucket=self._bucket, Delete={"Objects": keys, "Quiet": True})
+                deleted += len(keys)
+        return deleted
+
+    def url(self, rel: str) -> str:
+        if SETTINGS.S3_PUBLIC_BASE_URL:
+            return f"{SETTINGS.S3_PUBLIC_BASE_URL.rstrip('/')}/{self.key(rel)}"
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self._bucket, "Key": self.key(rel)},
+            ExpiresIn=SETTINGS.S3_PRESIGN_TTL_SEC,
+        )
+
+
+_storage: Optional[AudioStorage] = None
+_lock = threading.Lock()
+
+
+def get_audio_storage() -> AudioStorage:
+    """Process-wide storage chosen by AUDIO_STORAGE (filesystem | s3)."""
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                kind = getattr(SETTINGS, "AUDIO_STORAGE", "filesystem")
+                _storage = S3Storage() if kind == "s3" else FilesystemStorage()
+    return _storage
@@ -1,36 +1,56 @@
-import os
-import shutil
+import threading
+import time
 from pathlib import Path
+from celery.signals import task_postrun, task_prerun, worker_init, worker_process_init, worker_process_shutdown
 from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError
 from .celery_config import celery_app
 from .config import SETTINGS
-from .tts.registry import get_provider, register_provider, list_providers
-from .tts.openai_provider import OpenAITTSProvider
-from .tts.piper_provider import PiperTTSProvider
+from .metrics import CIRCUIT_TRIPS, FALLBACKS, PARAGRAPH_SECONDS, mark_process_dead, start_worker_exporter
+from .article_audio import article_audio_complete, build_full_audio, claim_full_build
+from .profiling import start_task_profile, stop_task_profile
+from .publish import publish
+from .renditions import configured_renditions, encode_renditions, rendition_path
+from .storage import get_audio_storage
+from .timeline import Timeline
+from .warmup import ensure_providers, record_task, report as report_warmup, warm_worker
+from .tts.registry import get_provider, list_providers
 from .tts.audio_utils import transcode_wav_to
-from pathlib import Path
-import shutil
+from .tts.http_client import close_http_clients
+from .tts.dsp import normalize_master
+from .tts.hls import HlsParagraphWriter, paragraph_complete, segment_existing
+from .tts.router import HedgeFailed, get_router, hedged_synthesize, timed_synthesize
+from .tts.sentence_cache import record_article_stats, synthesize_by_sentence
+from .tts.cache_index import get_cache_index
+from .tts.streaming import can_stream, delivery_cache_path, synthesize_streaming
+from .tts.timing import compute_timing, timing_path, write_timing
 
 BASE_DIR = Path(__file__).resolve().parent
 ENV_PATH = BASE_DIR / ".env"
 load_dotenv(ENV_PATH, override=False)
 
-_client: OpenAI | None = None
+_provider_failures: dict[str, int] = {}
+_CIRCUIT_THRESHOLD = 3
+
+worker_init.connect(start_worker_exporter)
+worker_process_init.connect(warm_worker)
+worker_process_shutdown.connect(report_warmup)
+worker_process_shutdown.connect(close_http_clients)
+worker_process_shutdown.connect(mark_process_dead)
+task_prerun.connect(start_task_profile)
+task_postrun.connect(stop_task_profile)
 
 
-def get_openai_client() -> OpenAI:
-    """Create the OpenAI client on first use, then reuse it."""
-    global _client
-    if _client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY is not set in the environment")
-        _client = OpenAI(api_key=api_key)
-    return _client
+def _record_failure(name: str) -> None:
+    _provider_failures[name] = _provider_failures.get(name, 0) + 1
+    if _provider_failures[name] == _CIRCUIT_THRESHOLD:
+        CIRCUIT_TRIPS.labels(name).inc()
 
-_provider_failures: dict[str, int] = {}
-_CIRCUIT_THRESHOLD = 3
+
+def _model_label(name: str, voice: str | None) -> str:
+    # OpenAI picks a model per call; Piper and the rest load one model per voice
+    if name == "openai":
+        return SETTINGS.TTS_MODEL or ""
+    return voice or ""
 
 
 @celery_app.task(name="tasks.generate_audio_task")
@@ -41,22 +61,28 @@ def generate_audio_task(
     gender: str = "Male",
     provider_override: str | None = None,
     voice_override: str | None = None,
+    article_id: str | None = None,
+    paragraph_index: int | None = None,
+    paragraph_count: int | None = None,
+    enqueued_at: float | None = None,
+    trace_id: str | None = None,
 ):
     """Generate audio using configured TTS provider stack.
 
     Keeps the externally visible file name and path identical to the previous
     implementation to avoid frontend changes. Applies internal caching per
-    provider to avoid redundant synthesis.
+    provider to avoid redundant synthesis. When the article id and paragraph
+    count are given, the task that completes the article queues the
+    whole-article build. Stage timings go to the article's timeline under
+    the caller's trace id.
     """
+    t_start = time.time()
+    tl = Timeline(article_id, trace_id=trace_id, paragraph=paragraph_index or 0)
+    if enqueued_at:
+        tl.add("queued", enqueued_at, t_start)
     try:
-        # Ensure providers are registered (idempotent)
-        if get_provider("openai") is None:
-            register_provider("openai", OpenAITTSProvider())
-        if get_provider("piper") is None:
-            try:
-                register_provider("piper", PiperTTSProvider())
-            except Exception as e:
-                print(f"[WARN] Could not register Piper provider: {e}")
+        # Registered at worker_process_init; lazily under the solo/threads pools
+        ensure_providers()
 
         # Resolve provider order (override short-circuits)
         if provider_override:
@@ -76,6 +102,17 @@ def generate_audio_task(
         # Fast path: if destination already exists, reuse
         if dest_path.exists():
             print(f"[INFO] Reusing existing audio file: {dest_path}")
+            _maybe_publish_hls(article_id, paragraph_index, paragraph_count, dest_path)
+            if not timing_path(dest_path).exists():
+                _maybe_write_timing(text, dest_path)
+            _maybe_encode_renditions(dest_path, dest_path)
+            _maybe_upload_delivery(dest_path, only_missing=True)
+            _maybe_queue_full_audio(article_id, paragraph_count)
+            if enqueued_at:
+                PARAGRAPH_SECONDS.labels("reused").observe(time.time() - enqueued_at)
+            tl.add("task", t_start, trace=trace_id, reused=True)
+            tl.flush()
+            record_task(time.time() - t_start)
             return
 
         # Choose a voice hint
@@ -85,49 +122,245 @@ def generate_audio_task(
         elif (article_title or "").lower().startswith("en"):
             voice_hint = SETTINGS.TTS_VOICE_EN or voice_hint
 
-        last_error: Exception | None = None
-        provider_used: str | None = None
+        chars = len(text or "")
+        sentence_mode = bool(getattr(SETTINGS, "TTS_SENTENCE_CACHE", False))
+        loudness_norm = bool(getattr(SETTINGS, "TTS_LOUDNESS_NORM", False))
+        # Normalization needs the whole master before encoding, so it disables streaming
+        stream_mode = bool(getattr(SETTINGS, "TTS_STREAM_ENCODE", False)) and delivery_ext != "wav" and not loudness_norm
+        sentence_stats: dict = {}
+        hls_mode = bool(getattr(SETTINGS, "TTS_HLS", False)) and bool(article_id and paragraph_index and paragraph_count)
+        # Only one in-flight attempt (hedge/retry) may feed the paragraph's segments
+        hls_claim = threading.Lock()
+
+        def _attempt(name: str, provider) -> Path:
+            # Retry once for transient errors. Ask for the delivery format when the
+            # provider produces it natively, else a WAV master to transcode after.
+            native = delivery_ext in getattr(provider, "native_formats", ("wav",))
+            fmt = delivery_ext if native and not loudness_norm else "wav"
+
+            def call() -> Path:
+                if sentence_mode:
+                    # Sentence assembly works on PCM, so it always yields a WAV master
+                    path, stats = synthesize_by_sentence(
+                        provider, text, voice=voice_hint, rate=SETTINGS.TTS_RATE,
+                        gap_ms=SETTINGS.TTS_SENTENCE_GAP_MS,
+                    )
+                    sentence_stats[name] = stats
+                    return path
+                if stream_mode and fmt == "wav" and can_stream(provider):
+                    # No cached master: stream provider PCM straight into the encoder
+                    if not provider.master_path(text, voice=voice_hint, rate=SETTINGS.TTS_RATE).exists():
+                        tap = None
+                        if hls_mode and hls_claim.acquire(blocking=False):
+                            tap = HlsParagraphWriter(
+                                article_id, paragraph_index, paragraph_count,
+                                segment_sec=SETTINGS.TTS_HLS_SEGMENT_SEC,
+                            )
+                        try:
+                            path = synthesize_streaming(
+                                provider, text, voice=voice_hint, rate=SETTINGS.TTS_RATE,
+                                delivery_ext=delivery_ext, keep_master=SETTINGS.TTS_KEEP_WAV_MASTER,
+                                tap=tap,
+                            )
+                        except NotImplementedError:
+                            path = None
+                        finally:
+                            if tap is not None and not paragraph_complete(article_id, paragraph_index):
+                                hls_claim.release()
+                        if path is not None:
+                            return path
+                return provider.synthesize(text, voice=voice_hint, rate=SETTINGS.TTS_RATE, fmt=fmt)
+            try:
+                return timed_synthesize(name, call, chars, model=_model_label(name, voice_hint))
+            except Exception as e1:  # noqa: BLE001
+                print(f"[WARN] Provider '{name}' first attempt failed, retrying once: {e1}")
+                return timed_synthesize(name, call, chars, model=_model_label(name, voice_hint))
+
+        t_synth = time.time()
+        # Drop unknown providers and those held open by the circuit breaker
+        candidates: list[str] = []
         for name in order:
-            provider = get_provider(name)
-            if not provider:
+            if not get_provider(name):
                 continue
-            # Circuit breaker: skip provider if too many consecutive failures
             if _provider_failures.get(name, 0) >= _CIRCUIT_THRESHOLD:
                 print(f"[WARN] Skipping provider '{name}' due to circuit breaker")
                 continue
-            try:
-                print(f"[INFO] TTS provider '{name}' synthesizing...")
-                # Retry once for transient errors
+            candidates.append(name)
+
+        if not provider_override and getattr(SETTINGS, "TTS_ROUTING", "static") == "latency":
+            candidates = get_router().rank(candidates, chars)
+
+        last_error: Exception | None = None
+        provider_used: str | None = None
+        tmp_path: Path | None = None
+
+        # Hedged request: race the two best-ranked providers once the first is slow
+        if getattr(SETTINGS, "TTS_HEDGE", False) and not provider_override and len(candidates) >= 2:
+            first, second = candidates[0], candidates[1]
+            delay = get_router().hedge_delay(first, chars, getattr(SETTINGS, "TTS_HEDGE_PERCENTILE", 95.0))
+            if delay is not None:
+                calls = {n: (lambda n=n: _attempt(n, get_provider(n))) for n in (first, second)}
                 try:
-                    # Always request WAV master from providers; transcode after
-                    tmp_path = provider.synthesize(text, voice=voice_hint, rate=SETTINGS.TTS_RATE, fmt="wav")
-                except Exception as e1:  # noqa: BLE001
-                    print(f"[WARN] Provider '{name}' first attempt failed, retrying once: {e1}")
-                    tmp_path = provider.synthesize(text, voice=voice_hint, rate=SETTINGS.TTS_RATE, fmt="wav")
-
-                # Transcode to delivery format if needed
-                if delivery_ext != "wav":
-                    ok = transcode_wav_to(tmp_path, dest_path, format=delivery_ext)
-                    if not ok:
-                        print("[WARN] Transcode failed or ffmpeg missing; serving WAV")
-                        shutil.copyfile(tmp_path, dest_path.with_suffix(".wav"))
-                        dest_path = dest_path.with_suffix(".wav")
-                else:
-                    shutil.copyfile(tmp_path, dest_path)
-                print(f"[SUCCESS] Audio saved at {dest_path}")
-                _provider_failures[name] = 0
-                provider_used = name
-                break
-            except Exception as e:  # noqa: BLE001
-                print(f"[WARN] Provider '{name}' failed: {e}")
-                last_error = e
-                _provider_failures[name] = _provider_failures.get(name, 0) + 1
-                continue
+                    provider_used, tmp_path = hedged_synthesize(first, second, calls, delay_s=delay)
+                except HedgeFailed as e:
+                    print(f"[WARN] {e}")
+                    last_error = e.__cause__ or e
+                    # Don't call a provider the hedge already tried again
+                    for name in e.failed:
+                        _record_failure(name)
+                        FALLBACKS.labels(name).inc()
+                    candidates = [c for c in candidates if c not in e.failed]
+
+        if tmp_path is None:
+            for i, name in enumerate(candidates):
+                try:
+                    print(f"[INFO] TTS provider '{name}' synthesizing...")
+                    tmp_path = _attempt(name, get_provider(name))
+                    provider_used = name
+                    break
+                except Exception as e:  # noqa: BLE001
+                    print(f"[WARN] Provider '{name}' failed: {e}")
+                    last_error = e
+                    _record_failure(name)
+                    if i + 1 < len(candidates):
+                        FALLBACKS.labels(name).inc()
+                    continue
+            else:
+                # No provider succeeded
+                raise last_error or RuntimeError("No TTS provider available")
+
+        _provider_failures[provider_used] = 0
+        tl.add("synthesize", t_synth, provider=provider_used)
+        if provider_used in sentence_stats:
+            # upload_file passes the article id as article_title
+            record_article_stats(article_title, sentence_stats[provider_used])
+
+        if loudness_norm and tmp_path.suffix.lower() == ".wav":
+            with tl.stage("normalize"):
+                tmp_path = normalize_master(provider_used, tmp_path) or tmp_path
+
+        # Transcode to delivery format only if the provider didn't produce it natively.
+        # The encoded file is cached too, so every copy of a paragraph is one blob.
+        t_pub = time.time()
+        if tmp_path.suffix.lower() != f".{delivery_ext}":
+            encoded = delivery_cache_path(tmp_path, delivery_ext)
+            if encoded.exists():
+                get_cache_index().hit(provider_used, encoded)
+                ok = True
+            else:
+                ok = transcode_wav_to(tmp_path, encoded, format=delivery_ext)
+                if ok:
+                    get_cache_index().put(provider_used, encoded)
+                tl.add("transcode", t_pub, ok=ok)
+                t_pub = time.time()
+            if ok:
+                publish(encoded, dest_path)
+            else:
+                print("[WARN] Transcode failed or ffmpeg missing; serving WAV")
+                dest_path = publish(tmp_path, dest_path.with_suffix(tmp_path.suffix))
         else:
-            # No provider succeeded
-            raise last_error or RuntimeError("No TTS provider available")
-        return {"provider_used": provider_used or "", "path": str(dest_path)}
+            publish(tmp_path, dest_path)
+        tl.add("publish", t_pub)
+        print(f"[SUCCESS] Audio saved at {dest_path}")
+        with tl.stage("postprocess"):
+            _maybe_write_timing(text, dest_path, tmp_path)
+            _maybe_encode_renditions(tmp_path, dest_path)
+            _maybe_publish_hls(article_id, paragraph_index, paragraph_count, dest_path)
+            _maybe_upload_delivery(dest_path)
+            _maybe_queue_full_audio(article_id, paragraph_count)
+        if enqueued_at:
+            PARAGRAPH_SECONDS.labels("synthesized").observe(time.time() - enqueued_at)
+        tl.add("task", t_start, trace=trace_id)
+        tl.flush()
+        record_task(time.time() - t_start)
+        result = {"provider_used": provider_used or "", "path": str(dest_path)}
+        storage = get_audio_storage()
+        if not storage.local:
+            result["url"] = storage.url(storage.rel(dest_path))
+        if provider_used in sentence_stats:
+            result["sentence_cache"] = sentence_stats[provider_used]
+        return result
 
     except Exception as e:
         print("[ERROR] TTS generation failed:", e)
+        tl.add("task", t_start, trace=trace_id, error=str(e)[:200])
+        tl.flush()
+        record_task(time.time() - t_start)
         raise e
+
+
+def _maybe_write_timing(text: str, audio: Path, source: Path | None = None) -> None:
+    """Store exact duration and word timings so the client needn't probe the audio."""
+    if not getattr(SETTINGS, "TTS_WORD_TIMINGS", False):
+        return
+    try:
+        timing = compute_timing(text, audio, source=source)
+        if timing is not None:
+            write_timing(audio, timing)
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] Word timing failed for {audio.name}: {e}")
+
+
+def _maybe_encode_renditions(source: Path, dest: Path) -> None:
+    if not configured_renditions():
+        return
+    try:
+        encode_renditions(source, dest)
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] Rendition encode failed for {dest.name}: {e}")
+
+
+def _maybe_upload_delivery(dest: Path, *, only_missing: bool = False) -> None:
+    """Stream a delivered paragraph, its timing file and renditions to object storage."""
+    storage = get_audio_storage()
+    if storage.local:
+        return
+    if only_missing and storage.exists(storage.rel(dest)):
+        return
+    # Sidecars first, so a client that can fetch the audio also finds its timing
+    files = [timing_path(dest)] + [rendition_path(dest, r) for r in configured_renditions()] + [dest]
+    for f in files:
+        if not f.exists():
+            continue
+        try:
+            storage.save(f)
+        except Exception as e:  # noqa: BLE001
+            print(f"[WARN] Upload of {f.name} to {storage.name} failed: {e}")
+            if f == dest:
+                raise
+
+
+def _maybe_publish_hls(
+    article_id: str | None, paragraph_index: int | None, paragraph_count: int | None, audio: Path
+) -> None:
+    """Segment a finished paragraph for the HLS playlist unless streaming already did."""
+    if not getattr(SETTINGS, "TTS_HLS", False) or not (article_id and paragraph_index and paragraph_count):
+        return
+    try:
+        if not paragraph_complete(article_id, paragraph_index):
+            segment_existing(
+                article_id, paragraph_index, paragraph_count, audio,
+                segment_sec=SETTINGS.TTS_HLS_SEGMENT_SEC,
+            )
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] HLS segmenting failed for {audio.name}: {e}")
+
+
+def _maybe_queue_full_audio(article_id: str | None, paragraph_count: int | None) -> None:
+    if not article_id or not paragraph_count:
+        return
+    try:
+        if article_audio_complete(article_id, paragraph_count) and claim_full_build(article_id):
+            build_article_audio_task.apply_async(args=[article_id, paragraph_count], queue="audio")
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] Could not queue article audio build for {article_id}: {e}")
+
+
+@celery_app.task(name="tasks.build_article_audio_task")
+def build_article_audio_task(article_id: str, paragraph_count: int):
+    """Concatenate an article's paragraph files into one seekable file + index."""
+    tl = Timeline(article_id)
+    with tl.stage("full_audio"):
+        index = build_full_audio(article_id, paragraph_count)
+    tl.flush()
+    return {"built": index is not None, "url": (index or {}).get("url")}
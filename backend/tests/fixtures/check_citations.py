@@ -0,0 +1,70 @@
+"""
+Check the strict-mode citation stripper against the labelled corpus
+in citations.tsv and report how many characters it removes.
+
+Usage (from repo root):
+  python backend/tests/fixtures/check_citations.py
+
+Each corpus line is: input, expected output, label. Rows labelled
+"keep" must come through unchanged. Exits non-zero on any mismatch.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+THIS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(THIS_DIR.parents[2]))
+
+from backend.cleaning import remove_citations, strip_citations  # noqa: E402
+
+CORPUS = THIS_DIR / "citations.tsv"
+
+
+def load_corpus() -> list[tuple[str, str, str]]:
+    rows = []
+    for line in CORPUS.read_text(encoding="utf-8").splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        text, expected, label = line.split("\t")
+        rows.append((text, expected, label))
+    return rows
+
+
+def main() -> int:
+    rows = load_corpus()
+    passed: Counter = Counter()
+    total: Counter = Counter()
+    failures = 0
+    for text, expected, label in rows:
+        total[label] += 1
+        got = strip_citations(text)[0].strip()
+        if got == expected:
+            passed[label] += 1
+        else:
+            failures += 1
+            print(f"[FAIL] {label}: {text!r}\n       expected {expected!r}\n       got      {got!r}")
+
+    for label in sorted(total):
+        print(f"{label:12} {passed[label]}/{total[label]}")
+
+    inputs = [text for text, _, _ in rows]
+    _, stats = remove_citations(inputs)
+    # Throughput on a larger document made of the corpus rows
+    doc = inputs * 500
+    t0 = time.perf_counter()
+    remove_citations(doc)
+    elapsed = time.perf_counter() - t0
+    chars = sum(len(p) for p in doc)
+    print(
+        f"Removed {stats['citations_removed']} citations, {stats['chars_before'] - stats['chars_after']} of "
+        f"{stats['chars_before']} chars ({stats['char_reduction']:.1%}); {chars / elapsed / 1e6:.1f} M chars/s"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from .config import SETTINGS
+from .redis_client import get_redis
+
+_TIMELINE_TTL_SEC = 7 * 24 * 3600
+# Paragraph stages in pipeline order; "task" spans all of them
+_PARAGRAPH_STAGES = ("queued", "synthesize", "normalize", "transcode", "publish", "postprocess")
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def _key(article_id: str) -> str:
+    return f"timeline:{article_id}"
+
+
+def _file(article_id: str) -> Path:
+    return Path(SETTINGS.CLEANED_DIR) / f"{article_id}.timeline.jsonl"
+
+
+class Timeline:
+    """Stage start/end timestamps for one article (paragraph 0) or one paragraph task.
+
+    Events are buffered and written in one go by `flush()`: an RPUSH onto
+    `timeline:<article>` in Redis, or, if Redis is unreachable, an append to
+    `<article>.timeline.jsonl` beside the article JSON. Timestamps are wall
+    clock seconds, so API and worker hosts need roughly synced clocks.
+    """
+
+    def __init__(self, article_id: str | None, *, trace_id: str | None = None, paragraph: int = 0) -> None:
+        self.article_id = article_id
+        self.trace_id = trace_id
+        self.paragraph = paragraph
+        # Tells a re-run of the same paragraph apart from the first run
+        self.run = uuid.uuid4().hex[:6]
+        self._events: List[dict] = []
+
+    def add(self, stage: str, start: float, end: float | None = None, **attrs) -> None:
+        ev = {
+            "stage": stage,
+            "p": self.paragraph,
+            "run": self.run,
+            "t0": round(start, 4),
+            "t1": round(time.time() if end is None else end, 4),
+        }
+        if attrs:
+            ev.update(attrs)
+        self._events.append(ev)
+
+    @contextmanager
+    def stage(self, name: str, **attrs) -> Iterator[None]:
+        t0 = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, t0, **attrs)
+
+    def flush(self) -> None:
+        if not self.article_id or not self._events:
+            return
+        lines = [json.dumps(ev, separators=(",", ":")) for ev in self._events]
+        self._events = []
+        r = get_redis()
+        if r is not None:
+            try:
+                pipe = r.pipeline()
+                pipe.rpush(_key(self.article_id), *lines)
+                pipe.expire(_key(self.article_id), _TIMELINE_TTL_SEC)
+                pipe.execute()
+                return
+            except Exception:
+                pass
+        try:
+            path = _file(self.article_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # O_APPEND keeps concurrent workers from interleaving lines
+            fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, ("\n".join(lines) + "\n").encode("utf-8"))
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"[WARN] Could not record timeline for {self.article_id}: {e}")
+
+
+def load_events(article_id: str) -> List[dict]:
+    raw: List[bytes | str] = []
+    r = get_redis()
+    if r is not None:
+        try:
+            raw.extend(r.lrange(_key(article_id), 0, -1))
+        except Exception:
+            pass
+    try:
+        raw.extend(_file(article_id).read_text(encoding="utf-8").splitlines())
+    except OSError:
+        pass
+    events = []
+    for line in raw:
+        try:
+            events.append(json.loads(line))
+        except (TypeError, ValueError):
+            continue
+    events.sort(key=lambda e: e.get("t0", 0))
+    return events
+
+
+def _ms(seconds: float) -> int:
+    return int(round(seconds * 1000))
+
+
+def summarize(article_id: str) -> dict:
+    """Per-paragraph queue wait vs work, plus the critical path of the article.
+
+    The critical path is the chain that decided when the article finished:
+    the API stages up to the enqueue of the paragraph that finished last,
+    that paragraph's queue wait and stages, then the whole-article build.
+    Offsets are milliseconds from the first recorded event.
+    """
+    events = load_events(article_id)
+    if not events:
+        return {"events": 0, "paragraphs": [], "critical_path": []}
+    origin = min(e["t0"] for e in events)
+
+    def span(e: dict) -> dict:
+        return {
+            "stage": e["stage"],
+            "paragraph": e.get("p", 0),
+            "start_ms": _ms(e["t0"] - origin),
+            "duration_ms": _ms(e["t1"] - e["t0"]),
+        }
+
+    api = [e for e in events if e.get("p", 0) == 0 and e["stage"] != "full_audio"]
+    full = [e for e in events if e["stage"] == "full_audio"]
+
+    # Latest run per paragraph (a redelivered task records a second run)
+    runs: Dict[int, Dict[str, List[dict]]] = {}
+    for e in events:
+        p = e.get("p", 0)
+        if p:
+            runs.setdefault(p, {}).setdefault(e.get("run", ""), []).append(e)
+    paragraphs = []
+    latest: Dict[int, List[dict]] = {}
+    for p in sorted(runs):
+        evs = max(runs[p].values(), key=lambda es: max(x["t1"] for x in es))
+        latest[p] = evs
+        task = next((x for x in evs if x["stage"] == "task"), None)
+        queued = next((x for x in evs if x["stage"] == "queued"), None)
+        stages = {x["stage"]: _ms(x["t1"] - x["t0"]) for x in evs if x["stage"] in _PARAGRAPH_STAGES}
+        paragraphs.append({
+            "index": p,
+            "queue_wait_ms": stages.get("queued"),
+            "work_ms": _ms(task["t1"] - task["t0"]) if task else None,
+            "stages": stages,
+            "start_ms": _ms((queued or evs[0])["t0"] - origin),
+            "end_ms": _ms(max(x["t1"] for x in evs) - origin),
+            "provider": next((x.get("provider") for x in evs if x["stage"] == "synthesize"), None),
+            "reused": bool(task and task.get("reused")),
+            "error": task.get("error") if task else None,
+        })
+
+    critical: List[dict] = []
+    last_p = max(latest, key=lambda p: max(x["t1"] for x in latest[p])) if latest else None
+    if last_p is not None:
+        chain = sorted((x for x in latest[last_p] if x["stage"] in _PARAGRAPH_STAGES), key=lambda x: x["t0"])
+        entry = chain[0]["t0"] if chain else origin
+        for e in api:
+            if e["t0"] < entry:
+                # Only the part of the enqueue loop before this paragraph counts
+                s = span(e)
+                s["duration_ms"] = _ms(min(e["t1"], entry) - e["t0"])
+                critical.append(s)
+        critical.extend(span(e) for e in chain)
+    else:
+        critical.extend(span(e) for e in api)
+    if full:
+        critical.append(span(full[-1]))
+
+    ends = [p["end_ms"] for p in paragraphs if not p["error"]]
+    waits = [p["queue_wait_ms"] or 0 for p in paragraphs]
+    works = [p["work_ms"] or 0 for p in paragraphs]
+    return {
+        "events": len(events),
+        "total_ms": _ms(max(e["t1"] for e in events) - origin),
+        "time_to_first_audio_ms": min(ends) if ends else None,
+        "queue_wait_ms": sum(waits),
+        "work_ms": sum(works),
+        "api": [span(e) for e in api],
+        "paragraphs": paragraphs,
+        "critical_path": critical,
+    }
@@ -1,10 +1,152 @@
 from __future__ import annotations
 
+import importlib.util
+import os
+import shutil
 import subprocess
+import time
+import wave
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 
 from ..config import SETTINGS
+from ..metrics import TRANSCODE_SECONDS
+
+# Container + codec per delivery format for the in-process PyAV encoder
+_PYAV_TARGETS = {
+    "mp3": ("mp3", "libmp3lame"),
+    "ogg": ("ogg", "libvorbis"),
+    "opus": ("ogg", "libopus"),
+}
+# Formats encoded at a fixed bitrate; vorbis keeps the encoder's default
+# quality on every backend so all of them produce the same stream
+_BITRATE_FORMATS = ("mp3", "opus")
+# Output muxer per delivery format for the ffmpeg backends
+_FFMPEG_MUXERS = {"mp3": "mp3", "ogg": "ogg", "opus": "ogg"}
+
+
+def _bitrate_bps(bitrate: str) -> int:
+    b = (bitrate or "").strip().lower()
+    if b.endswith("k"):
+        return int(float(b[:-1]) * 1000)
+    return int(b or 0)
+
+
+def _tmp_for(out_path: Path) -> Path:
+    return out_path.with_name(f"{out_path.stem}.{os.getpid()}.part{out_path.suffix}")
+
+
+def _finish(tmp: Path, out_path: Path) -> bool:
+    if tmp.exists() and tmp.stat().st_size > 0:
+        os.replace(tmp, out_path)
+        return True
+    tmp.unlink(missing_ok=True)
+    return False
+
+
+def _transcode_pyav(wav_path: Path, out_path: Path, *, format: str, bitrate: str, sample_rate: int) -> bool:
+    """Encode inside the worker via PyAV (libav bindings): no fork/exec per paragraph."""
+    try:
+        import av
+    except Exception:
+        return False
+    target = _PYAV_TARGETS.get(format)
+    if target is None:
+        return False
+    container, codec = target
+    tmp = _tmp_for(out_path)
+    try:
+        with av.open(str(wav_path)) as inp, av.open(str(tmp), "w", format=container) as out:
+            stream = out.add_stream(codec, rate=sample_rate, layout="mono")
+            if format in _BITRATE_FORMATS:
+                stream.bit_rate = _bitrate_bps(bitrate)
+            resampler = av.AudioResampler(format=stream.codec_context.format, layout="mono", rate=sample_rate)
+            for frame in inp.decode(audio=0):
+                for rf in resampler.resample(frame):
+                    for packet in stream.encode(rf):
+                        out.mux(packet)
+            for rf in resampler.resample(None):
+                for packet in stream.encode(rf):
+                    out.mux(packet)
+            for packet in stream.encode(None):
+                out.mux(packet)
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] PyAV encode failed, falling back: {e}")
+        tmp.unlink(missing_ok=True)
+        return False
+    return _finish(tmp, out_path)
+
+
+def _transcode_lameenc(wav_path: Path, out_path: Path, *, format: str, bitrate: str, sample_rate: int) -> bool:
+    """Encode MP3 in-process with lameenc.
+
+    LAME here neither resamples nor downmixes, so this backend only accepts
+    mono 16-bit input already at `sample_rate`; otherwise the next backend is
+    used, keeping output parameters identical whichever encoder ran.
+    """
+    if format != "mp3":
+        return False
+    try:
+        import lameenc
+    except Exception:
+        return False
+    try:
+        with wave.open(str(wav_path), "rb") as w:
+            if w.getnchannels() != 1 or w.getsampwidth() != 2 or w.getframerate() != sample_rate:
+                return False
+            pcm = w.readframes(w.getnframes())
+        enc = lameenc.Encoder()
+        enc.set_bit_rate(max(8, _bitrate_bps(bitrate) // 1000))
+        enc.set_in_sample_rate(sample_rate)
+        enc.set_channels(1)
+        enc.set_quality(2)
+        tmp = _tmp_for(out_path)
+        with open(tmp, "wb") as f:
+            f.write(enc.encode(pcm))
+            f.write(enc.flush())
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] lameenc encode failed, falling back: {e}")
+        return False
+    return _finish(tmp, out_path)
+
+
+def _transcode_ffmpeg(wav_path: Path, out_path: Path, *, format: str, bitrate: str, sample_rate: int) -> bool:
+    if format not in _FFMPEG_MUXERS:
+        return False
+    ffmpeg = getattr(SETTINGS, "FFMPEG_PATH", "ffmpeg")
+    cmd = [ffmpeg, "-y", "-i", str(wav_path), "-ac", "1", "-ar", str(sample_rate)]
+    if format == "mp3":
+        cmd += ["-b:a", bitrate]
+    elif format == "opus":
+        cmd += ["-c:a", "libopus", "-b:a", bitrate]
+    # Never encode in place: out_path is the shared cache file (and may be
+    # hardlinked into the blob store), so a failed run must not truncate it
+    tmp = _tmp_for(out_path)
+    cmd += ["-f", _FFMPEG_MUXERS[format], str(tmp)]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, check=False)
+    except FileNotFoundError:
+        return False
+    if proc.returncode != 0:
+        tmp.unlink(missing_ok=True)
+        return False
+    return _finish(tmp, out_path)
+
+
+_BACKENDS: Dict[str, Callable[..., bool]] = {
+    "pyav": _transcode_pyav,
+    "lameenc": _transcode_lameenc,
+    "ffmpeg": _transcode_ffmpeg,
+}
+
+
+def encoder_chain(preferred: Optional[str] = None) -> List[str]:
+    """Backends to try in order. ffmpeg subprocess is always the last resort."""
+    choice = (preferred or getattr(SETTINGS, "TTS_ENCODER", "auto") or "auto").lower()
+    if choice == "auto" or choice not in _BACKENDS:
+        return ["pyav", "lameenc", "ffmpeg"]
+    return list(dict.fromkeys([choice, "ffmpeg"]))
 
 
 def transcode_wav_to(
@@ -14,41 +156,196 @@ def transcode_wav_to(
     format: str = "mp3",
     bitrate: str = "160k",
     sample_rate: int = 24000,
+    encoder: Optional[str] = None,
 ) -> bool:
-    """Transcode WAV to delivery format using ffmpeg. Returns True on success."""
-    ffmpeg = getattr(SETTINGS, "FFMPEG_PATH", "ffmpeg")
+    """Transcode WAV to delivery format. Returns True on success.
+
+    Tries in-process encoders (PyAV, lameenc) before forking ffmpeg; pick one
+    with TTS_ENCODER or `encoder`.
+    """
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    if format == "mp3":
-        cmd = [
-            ffmpeg,
-            "-y",
-            "-i",
-            str(wav_path),
-            "-ac",
-            "1",
-            "-ar",
-            str(sample_rate),
-            "-b:a",
-            bitrate,
-            str(out_path),
-        ]
-    elif format == "ogg":
+    for name in encoder_chain(encoder):
+        t0 = time.perf_counter()
+        if _BACKENDS[name](wav_path, out_path, format=format, bitrate=bitrate, sample_rate=sample_rate):
+            TRANSCODE_SECONDS.labels(format, name).observe(time.perf_counter() - t0)
+            return True
+    return False
+
+
+class _PcmSink(ABC):
+    """Incremental encoder fed with interleaved s16le PCM.
+
+    Writes to a temp file next to `out_path`; `close()` renames it into place
+    on success, `abort()` discards it.
+    """
+
+    def __init__(self, out_path: Path) -> None:
+        self.out_path = out_path
+        self.tmp = _tmp_for(out_path)
+
+    @abstractmethod
+    def write(self, pcm: bytes) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _finalize(self) -> None:
+        raise NotImplementedError
+
+    def close(self) -> bool:
+        try:
+            self._finalize()
+        except Exception as e:  # noqa: BLE001
+            print(f"[WARN] Streaming encode failed: {e}")
+            self.tmp.unlink(missing_ok=True)
+            return False
+        return _finish(self.tmp, self.out_path)
+
+    def abort(self) -> None:
+        try:
+            self._finalize()
+        except Exception:
+            pass
+        self.tmp.unlink(missing_ok=True)
+
+
+class _WavSink(_PcmSink):
+    def __init__(self, out_path: Path, *, in_rate: int, channels: int) -> None:
+        super().__init__(out_path)
+        self._w = wave.open(str(self.tmp), "wb")
+        self._w.setnchannels(channels)
+        self._w.setsampwidth(2)
+        self._w.setframerate(in_rate)
+
+    def write(self, pcm: bytes) -> None:
+        self._w.writeframes(pcm)
+
+    def _finalize(self) -> None:
+        self._w.close()
+
+
+class _PyAVSink(_PcmSink):
+    def __init__(self, out_path: Path, *, format: str, in_rate: int, channels: int, bitrate: str, sample_rate: int) -> None:
+        import av
+        import numpy as np
+
+        super().__init__(out_path)
+        container, codec = _PYAV_TARGETS[format]
+        self._av = av
+        self._np = np
+        # Our own unbuffered handle: with a path, PyAV holds the output until
+        # close, and readers tailing the temp file (HLS segments) see nothing
+        self._fh = open(self.tmp, "wb", buffering=0)
+        self._out = av.open(self._fh, "w", format=container)
+        self._stream = self._out.add_stream(codec, rate=sample_rate, layout="mono")
+        if format in _BITRATE_FORMATS:
+            self._stream.bit_rate = _bitrate_bps(bitrate)
+        self._resampler = av.AudioResampler(format=self._stream.codec_context.format, layout="mono", rate=sample_rate)
+        self._layout = "mono" if channels == 1 else "stereo"
+        self._frame_bytes = 2 * channels
+        self._in_rate = in_rate
+        self._pending = b""
+        self._pts = 0
+        self._closed = False
+
+    def _encode(self, frame) -> None:
+        for rf in self._resampler.resample(frame):
+            for packet in self._stream.encode(rf):
+                self._out.mux(packet)
+
+    def write(self, pcm: bytes) -> None:
+        data = self._pending + pcm
+        usable = len(data) - len(data) % self._frame_bytes
+        self._pending = data[usable:]
+        if not usable:
+            return
+        samples = self._np.frombuffer(data[:usable], dtype="<i2").reshape(1, -1)
+        frame = self._av.AudioFrame.from_ndarray(samples, format="s16", layout=self._layout)
+        frame.sample_rate = self._in_rate
+        frame.pts = self._pts
+        self._pts += usable // self._frame_bytes
+        self._encode(frame)
+
+    def _finalize(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._encode(None)
+            for packet in self._stream.encode(None):
+                self._out.mux(packet)
+        finally:
+            self._out.close()
+            self._fh.close()
+
+
+class _FfmpegPipeSink(_PcmSink):
+    def __init__(self, out_path: Path, *, format: str, in_rate: int, channels: int, bitrate: str, sample_rate: int) -> None:
+        super().__init__(out_path)
+        ffmpeg = getattr(SETTINGS, "FFMPEG_PATH", "ffmpeg")
         cmd = [
-            ffmpeg,
-            "-y",
-            "-i",
-            str(wav_path),
-            "-ac",
-            "1",
-            "-ar",
-            str(sample_rate),
-            str(out_path),
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(in_rate), "-ac", str(channels), "-i", "pipe:0",
+            "-ac", "1", "-ar", str(sample_rate),
         ]
-    else:
-        return False
-    try:
-        proc = subprocess.run(cmd, capture_output=True, check=False)
-        return proc.returncode == 0 and out_path.exists() and out_path.stat().st_size > 0
-    except FileNotFoundError:
-        return False
+        if format == "mp3":
+            cmd += ["-b:a", bitrate]
+        elif format == "opus":
+            cmd += ["-c:a", "libopus", "-b:a", bitrate]
+        cmd += ["-f", _FFMPEG_MUXERS[format], str(self.tmp)]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def write(self, pcm: bytes) -> None:
+        self._proc.stdin.write(pcm)
+
+    def _finalize(self) -> None:
+        if self._proc.stdin and not self._proc.stdin.closed:
+            self._proc.stdin.close()
+        _, err = self._proc.communicate()
+        if self._proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited {self._proc.returncode}: {err.decode(errors='ignore')[-300:]}")
+
 
+def can_stream_encode(format: str, encoder: Optional[str] = None) -> bool:
+    """Whether `open_pcm_encoder` has a backend for `format`, without opening one.
+
+    Lets callers skip a (billed) provider stream that no encoder could take.
+    """
+    if format == "wav":
+        return True
+    for name in encoder_chain(encoder):
+        if name == "pyav" and format in _PYAV_TARGETS:
+            if importlib.util.find_spec("av") and importlib.util.find_spec("numpy"):
+                return True
+        if name == "ffmpeg" and format in _FFMPEG_MUXERS:
+            if shutil.which(getattr(SETTINGS, "FFMPEG_PATH", "ffmpeg")):
+                return True
+    return False
+
+
+def open_pcm_encoder(
+    out_path: Path,
+    *,
+    format: str,
+    in_rate: int,
+    channels: int = 1,
+    bitrate: str = "160k",
+    sample_rate: int = 24000,
+    encoder: Optional[str] = None,
+) -> Optional[_PcmSink]:
+    """Open a streaming encoder for raw PCM, or None if no backend can do it.
+
+    Output parameters match `transcode_wav_to`, so streamed and transcoded
+    paragraphs are interchangeable (and concatenable).
+    """
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if format == "wav":
+        return _WavSink(out_path, in_rate=in_rate, channels=channels)
+    for name in encoder_chain(encoder):
+        try:
+            if name == "pyav" and format in _PYAV_TARGETS:
+                return _PyAVSink(out_path, format=format, in_rate=in_rate, channels=channels, bitrate=bitrate, sample_rate=sample_rate)
+            if name == "ffmpeg" and format in _FFMPEG_MUXERS:
+                return _FfmpegPipeSink(out_path, format=format, in_rate=in_rate, channels=channels, bitrate=bitrate, sample_rate=sample_rate)
+        except Exception:
+            continue
+    return None
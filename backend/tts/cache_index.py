@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from ..config import SETTINGS
+from ..metrics import CACHE_REQUESTS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key       TEXT PRIMARY KEY,
+    provider  TEXT NOT NULL,
+    path      TEXT NOT NULL,
+    bytes     INTEGER NOT NULL,
+    created   REAL NOT NULL,
+    last_hit  REAL,
+    hits      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (coalesce(last_hit, created));
+CREATE TABLE IF NOT EXISTS counters (
+    provider       TEXT PRIMARY KEY,
+    hits           INTEGER NOT NULL DEFAULT 0,
+    misses         INTEGER NOT NULL DEFAULT 0,
+    evictions      INTEGER NOT NULL DEFAULT 0,
+    evicted_bytes  INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class CacheIndex:
+    """SQLite index over the on-disk audio cache (`_cache/<provider>`).
+
+    Tracks size, creation and last-hit time per file plus hit/miss/eviction
+    counters per provider, and keeps the cache under a byte budget by
+    evicting least-recently (or least-frequently) used files. WAL mode lets
+    all workers share one index file. The index is advisory: every method
+    swallows database errors so synthesis never fails because of it.
+    """
+
+    def __init__(self, db_path: Path, *, max_bytes: int = 0, policy: str = "lru", min_age_sec: float = 600.0) -> None:
+        self._db_path = Path(db_path)
+        self._max_bytes = max(0, int(max_bytes))
+        self._policy = "lfu" if policy == "lfu" else "lru"
+        # Other workers may still be reading a recent file (sentence WAVs
+        # awaiting concat, a master awaiting transcode, a hedged loser's
+        # output), so nothing written or hit within this window is evicted
+        self._min_age = max(0.0, float(min_age_sec))
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and per process (connections don't survive fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._db_path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return f"{path.parent.name}/{path.name}"
+
+    def _bump(self, conn: sqlite3.Connection, provider: str, column: str, n: int = 1) -> None:
+        conn.execute("INSERT OR IGNORE INTO counters (provider) VALUES (?)", (provider,))
+        conn.execute(f"UPDATE counters SET {column} = {column} + ? WHERE provider = ?", (n, provider))
+
+    def hit(self, provider: str, path: Path) -> None:
+        """Record a cache hit; files that predate the index are adopted."""
+        CACHE_REQUESTS.labels(provider, "hit").inc()
+        try:
+            conn = self._conn()
+            now = time.time()
+            cur = conn.execute(
+                "UPDATE entries SET last_hit = ?, hits = hits + 1 WHERE key = ?", (now, self._key(path))
+            )
+            if cur.rowcount == 0:
+                size = path.stat().st_size
+                conn.execute(
+                    "INSERT OR IGNORE INTO entries (key, provider, path, bytes, created, last_hit, hits) VALUES (?, ?, ?, ?, ?, ?, 1)",
+                    (self._key(path), provider, str(path), size, now, now),
+                )
+            self._bump(conn, provider, "hits")
+        except Exception:
+            pass
+
+    def put(self, provider: str, path: Path) -> None:
+        """Record a freshly written file (a cache miss) and enforce the byte budget."""
+        CACHE_REQUESTS.labels(provider, "miss").inc()
+        try:
+            conn = self._conn()
+            size = path.stat().st_size
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, provider, path, bytes, created, last_hit, hits) VALUES (?, ?, ?, ?, ?, NULL, 0)",
+                (self._key(path), provider, str(path), size, time.time()),
+            )
+            self._bump(conn, provider, "misses")
+            if self._max_bytes:
+                self._evict(conn, keep=self._key(path))
+        except Exception:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection, *, keep: str) -> None:
+        total = conn.execute("SELECT coalesce(sum(bytes), 0) FROM entries").fetchone()[0]
+        if total <= self._max_bytes:
+            return
+        order = "hits ASC, coalesce(last_hit, created) ASC" if self._policy == "lfu" else "coalesce(last_hit, created) ASC"
+        rows = conn.execute(
+            f"SELECT key, provider, path, bytes FROM entries WHERE key != ? AND coalesce(last_hit, created) < ? ORDER BY {order}",
+            (keep, time.time() - self._min_age),
+        )
+        victims = []
+        for key, provider, path, size in rows:
+            if total <= self._max_bytes:
+                break
+            victims.append((key, provider, path, size))
+            total -= size
+        for key, provider, path, size in victims:
+            try:
+                Path(path).unlink(missing_ok=True)
+            except OSError:
+                continue
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._bump(conn, provider, "evictions")
+            self._bump(conn, provider, "evicted_bytes", size)
+
+    def stats(self) -> Dict[str, dict]:
+        out: Dict[str, dict] = {}
+        try:
+            conn = self._conn()
+            sizes = {
+                p: (n, b)
+                for p, n, b in conn.execute("SELECT provider, count(*), coalesce(sum(bytes), 0) FROM entries GROUP BY provider")
+            }
+            for provider, hits, misses, evictions, evicted_bytes in conn.execute(
+                "SELECT provider, hits, misses, evictions, evicted_bytes FROM counters"
+            ):
+                lookups = hits + misses
+                entries, size = sizes.get(provider, (0, 0))
+                out[provider] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / lookups, 4) if lookups else None,
+                    "entries": entries,
+                    "bytes": size,
+                    "evictions": evictions,
+                    "evicted_bytes": evicted_bytes,
+                }
+        except Exception:
+            pass
+        return out
+
+
+_INDEX: Optional[CacheIndex] = None
+
+
+def get_cache_index() -> CacheIndex:
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = CacheIndex(
+            Path(SETTINGS.AUDIO_OUT_DIR) / "_cache" / "index.sqlite3",
+            max_bytes=getattr(SETTINGS, "TTS_CACHE_MAX_BYTES", 0),
+            policy=getattr(SETTINGS, "TTS_CACHE_EVICTION", "lru"),
+            min_age_sec=getattr(SETTINGS, "TTS_CACHE_MIN_AGE_SEC", 600.0),
+        )
+    return _INDEX
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from ..config import SETTINGS
+
+# MPEG audio Layer III tables
+_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+@dataclass
+class Segment:
+    """Where one input file landed inside the concatenated output."""
+
+    byte_start: int | None
+    byte_end: int | None
+    time_start: float
+    time_end: float
+
+
+def _frame_info(buf: bytes, pos: int) -> Tuple[int, int, int, bool] | None:
+    """(length, samples, sample_rate, mono) of the Layer III frame at pos, or None."""
+    if pos + 4 > len(buf) or buf[pos] != 0xFF or (buf[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = buf[pos + 1], buf[pos + 2], buf[pos + 3]
+    version = (b1 >> 3) & 3
+    layer = (b1 >> 1) & 3
+    br_idx = (b2 >> 4) & 0xF
+    sr_idx = (b2 >> 2) & 3
+    if version == 1 or layer != 1 or br_idx in (0, 15) or sr_idx == 3:
+        return None
+    padding = (b2 >> 1) & 1
+    rate = _RATES[version][sr_idx]
+    if version == 3:
+        length = 144 * _BITRATES_V1[br_idx] * 1000 // rate + padding
+        samples = 1152
+    else:
+        length = 72 * _BITRATES_V2[br_idx] * 1000 // rate + padding
+        samples = 576
+    return length, samples, rate, ((b3 >> 6) & 3) == 3
+
+
+def _is_info_frame(buf: bytes, pos: int, version_mpeg1: bool, mono: bool) -> bool:
+    side = (17 if mono else 32) if version_mpeg1 else (9 if mono else 17)
+    tag = buf[pos + 4 + side: pos + 8 + side]
+    return tag in (b"Xing", b"Info") or buf[pos + 36: pos + 40] == b"VBRI"
+
+
+def mp3_audio_frames(data: bytes) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield (offset, length, samples, sample_rate) for each audio frame.
+
+    Skips an ID3v2 header, a trailing ID3v1 tag and the Xing/Info/VBRI
+    header frame encoders put first, none of which may appear mid-stream
+    in a concatenated file.
+    """
+    pos = 0
+    end = len(data)
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+    if end >= 128 and data[end - 128: end - 125] == b"TAG":
+        end -= 128
+    first = True
+    while pos + 4 <= end:
+        info = _frame_info(data, pos)
+        if info is None or pos + info[0] > end:
+            pos += 1  # resync on junk
+            continue
+        length, samples, rate, mono = info
+        if first and _is_info_frame(data, pos, samples == 1152, mono):
+            first = False
+            pos += length
+            continue
+        first = False
+        yield pos, length, samples, rate
+        pos += length
+
+
+class Mp3FrameReader:
+    """`mp3_audio_frames` for a stream that is still being written.
+
+    `feed` takes the bytes that arrived since the last call and returns the
+    complete audio frames as (frame_bytes, seconds); a partial frame at the
+    end is kept until the rest arrives.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._started = False
+        self._first = True
+
+    def feed(self, data: bytes) -> List[Tuple[bytes, float]]:
+        self._buf += data
+        buf = self._buf
+        pos = 0
+        if not self._started:
+            if len(buf) < 10:
+                return []
+            if buf[:3] == b"ID3":
+                size = (buf[6] << 21) | (buf[7] << 14) | (buf[8] << 7) | buf[9]
+                pos = 10 + size + (10 if buf[5] & 0x10 else 0)
+                if pos > len(buf):
+                    return []
+            self._started = True
+        frames: List[Tuple[bytes, float]] = []
+        while pos + 4 <= len(buf):
+            info = _frame_info(buf, pos)
+            if info is None:
+                pos += 1  # resync on junk
+                continue
+            length, samples, rate, mono = info
+            if pos + length > len(buf):
+                break
+            if self._first:
+                self._first = False
+                if _is_info_frame(buf, pos, samples == 1152, mono):
+                    pos += length
+                    continue
+            frames.append((bytes(buf[pos: pos + length]), samples / rate))
+            pos += length
+        del buf[:pos]
+        return frames
+
+
+def concat_mp3(parts: List[Path], out: Path) -> List[Segment]:
+    """Frame-level MP3 concatenation: copy audio frames only, no re-encode."""
+    segments: List[Segment] = []
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.part")
+    written = 0
+    t = 0.0
+    rate0 = None
+    try:
+        with open(tmp, "wb") as f:
+            for p in parts:
+                data = p.read_bytes()
+                start_b, start_t = written, t
+                for offset, length, samples, rate in mp3_audio_frames(data):
+                    if rate0 is None:
+                        rate0 = rate
+                    elif rate != rate0:
+                        raise ValueError(f"{p.name}: sample rate {rate} differs from {rate0}")
+                    f.write(data[offset: offset + length])
+                    written += length
+                    t += samples / rate
+                segments.append(Segment(start_b, written, round(start_t, 4), round(t, 4)))
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return segments
+
+
+def concat_wav(parts: List[Path], out: Path, *, gap_ms: int = 0) -> List[Segment]:
+    """PCM-level WAV concatenation with exact byte and time offsets.
+
+    `gap_ms` of silence goes between parts (not inside any segment).
+    """
+    segments: List[Segment] = []
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.part")
+    try:
+        with wave.open(str(tmp), "wb") as dst:
+            params = None
+            frames_total = 0
+            gap_frames = 0
+            for i, p in enumerate(parts):
+                with wave.open(str(p), "rb") as src:
+                    cur = (src.getnchannels(), src.getsampwidth(), src.getframerate())
+                    if params is None:
+                        params = cur
+                        dst.setnchannels(cur[0])
+                        dst.setsampwidth(cur[1])
+                        dst.setframerate(cur[2])
+                        gap_frames = int(cur[2] * gap_ms / 1000)
+                    elif cur != params:
+                        raise ValueError(f"{p.name}: WAV parameters {cur} differ from {params}")
+                    pcm = src.readframes(src.getnframes())
+                frame_bytes = cur[0] * cur[1]
+                if i and gap_frames:
+                    dst.writeframes(b"\x00" * (gap_frames * frame_bytes))
+                    frames_total += gap_frames
+                n = len(pcm) // frame_bytes
+                dst.writeframes(pcm)
+                segments.append(Segment(
+                    44 + frames_total * frame_bytes,
+                    44 + (frames_total + n) * frame_bytes,
+                    round(frames_total / cur[2], 4),
+                    round((frames_total + n) / cur[2], 4),
+                ))
+                frames_total += n
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return segments
+
+
+def _probe_duration(path: Path) -> float:
+    ffmpeg = getattr(SETTINGS, "FFMPEG_PATH", "ffmpeg")
+    ffprobe = str(Path(ffmpeg).with_name(Path(ffmpeg).name.replace("ffmpeg", "ffprobe")))
+    proc = subprocess.run(
+        [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "json", str(path)],
+        capture_output=True, check=True,
+    )
+    return float(json.loads(proc.stdout)["format"]["duration"])
+
+
+def concat_copy(parts: List[Path], out: Path) -> List[Segment]:
+    """Container-level concatenation via ffmpeg's concat demuxer (-c copy).
+
+    Used for formats we don't parse (ogg/opus). Only time offsets are known.
+    """
+    ffmpeg = getattr(SETTINGS, "FFMPEG_PATH", "ffmpeg")
+    listing = out.with_name(f"{out.name}.{os.getpid()}.txt")
+    tmp = out.with_name(f"{out.stem}.{os.getpid()}.part{out.suffix}")
+    try:
+        listing.write_text("".join(f"file '{p.resolve().as_posix()}'\n" for p in parts), encoding="utf-8")
+        proc = subprocess.run(
+            [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", str(listing), "-c", "copy", str(tmp)],
+            capture_output=True, check=False,
+        )
+        if proc.returncode != 0 or not tmp.exists():
+            raise RuntimeError(f"ffmpeg concat failed: {proc.stderr.decode(errors='ignore')[-300:]}")
+        segments: List[Segment] = []
+        t = 0.0
+        for p in parts:
+            d = _probe_duration(p)
+            segments.append(Segment(None, None, round(t, 4), round(t + d, 4)))
+            t += d
+        os.replace(tmp, out)
+    finally:
+        listing.unlink(missing_ok=True)
+        tmp.unlink(missing_ok=True)
+    return segments
+
+
+def concat_audio(parts: List[Path], out: Path) -> List[Segment]:
+    ext = out.suffix.lower()
+    if ext == ".mp3":
+        return concat_mp3(parts, out)
+    if ext == ".wav":
+        return concat_wav(parts, out)
+    return concat_copy(parts, out)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+import wave
+from pathlib import Path
+from typing import Optional
+
+from ..config import SETTINGS
+
+# BS.1770-style gating: 400 ms blocks, 75% overlap
+_BLOCK_SEC = 0.4
+_HOP_SEC = 0.1
+_ABS_GATE_LUFS = -70.0
+_REL_GATE_DB = -10.0
+# Never boost quiet masters by more than this
+_MAX_GAIN_DB = 20.0
+
+
+def _load(path: Path):
+    import numpy as np
+
+    with wave.open(str(path), "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path.name}: only 16-bit PCM masters are supported")
+        ch, rate = w.getnchannels(), w.getframerate()
+        x = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").astype(np.float32) / 32768.0
+    return x.reshape(-1, ch), rate
+
+
+def _save(path: Path, x, rate: int) -> None:
+    import numpy as np
+
+    pcm = (np.clip(x, -1.0, 1.0) * 32767.0).astype("<i2")
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.part{path.suffix}")
+    with wave.open(str(tmp), "wb") as w:
+        w.setnchannels(x.shape[1])
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    os.replace(tmp, path)
+
+
+def integrated_loudness(x, rate: int) -> float:
+    """Gated loudness in LUFS (BS.1770 gating, without the K-weighting filter).
+
+    Speech from our providers is band-limited already; the pre-filter moves
+    the absolute number by about a dB but not the relative gain between
+    paragraphs, which is what normalization needs.
+    """
+    import numpy as np
+
+    mono = x.mean(axis=1) if x.ndim == 2 else x
+    block, hop = int(_BLOCK_SEC * rate), int(_HOP_SEC * rate)
+    if len(mono) < block:
+        ms = float(np.mean(mono ** 2)) if len(mono) else 0.0
+        return -0.691 + 10 * np.log10(ms) if ms > 0 else float("-inf")
+    # Mean square per overlapping block from a cumulative sum: O(n), no Python loop
+    c = np.concatenate(([0.0], np.cumsum(mono.astype(np.float64) ** 2)))
+    starts = np.arange(0, len(mono) - block + 1, hop)
+    ms = (c[starts + block] - c[starts]) / block
+    lufs = -0.691 + 10 * np.log10(np.maximum(ms, 1e-12))
+    gated = ms[lufs > _ABS_GATE_LUFS]
+    if gated.size == 0:
+        return float("-inf")
+    rel = -0.691 + 10 * np.log10(gated.mean()) + _REL_GATE_DB
+    gated = ms[lufs > max(rel, _ABS_GATE_LUFS)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def trim_edges(x, rate: int, *, keep_ms: int, threshold_db: float = -50.0):
+    """Cap leading/trailing silence at `keep_ms`; inner pauses are untouched."""
+    import numpy as np
+
+    env = np.abs(x).max(axis=1)
+    loud = np.flatnonzero(env > 10 ** (threshold_db / 20))
+    if loud.size == 0:
+        return x
+    keep = int(rate * keep_ms / 1000)
+    return x[max(0, loud[0] - keep): min(len(x), loud[-1] + 1 + keep)]
+
+
+def apply_gain(x, gain_db: float, *, ceiling_dbfs: float):
+    """Gain plus a soft-knee limiter: peaks above the knee bend towards the ceiling."""
+    import numpy as np
+
+    y = x * (10 ** (gain_db / 20))
+    ceiling = 10 ** (ceiling_dbfs / 20)
+    knee = ceiling * 0.8
+    a = np.abs(y)
+    over = a > knee
+    if over.any():
+        span = ceiling - knee
+        y[over] = np.sign(y[over]) * (knee + span * np.tanh((a[over] - knee) / span))
+    return y
+
+
+def process_master(
+    src: Path,
+    dst: Path,
+    *,
+    target_lufs: float,
+    ceiling_dbfs: float,
+    edge_silence_ms: int,
+) -> dict:
+    """Trim edge silence and normalize loudness of a WAV master in one pass."""
+    x, rate = _load(src)
+    before = len(x)
+    x = trim_edges(x, rate, keep_ms=edge_silence_ms)
+    measured = integrated_loudness(x, rate)
+    gain = 0.0
+    if measured != float("-inf"):
+        gain = max(-_MAX_GAIN_DB, min(_MAX_GAIN_DB, target_lufs - measured))
+    x = apply_gain(x, gain, ceiling_dbfs=ceiling_dbfs)
+    _save(dst, x, rate)
+    return {
+        "measured_lufs": round(measured, 2) if measured != float("-inf") else None,
+        "gain_db": round(gain, 2),
+        "trimmed_ms": int(round((before - len(x)) * 1000 / rate)),
+    }
+
+
+def normalized_path(master: Path) -> Path:
+    """Cache location of the processed master; the settings are part of the key."""
+    tag = f"{SETTINGS.TTS_LOUDNESS_TARGET_LUFS:g}_{SETTINGS.TTS_PEAK_DBFS:g}_{SETTINGS.TTS_EDGE_SILENCE_MS}"
+    return master.parent / "norm" / f"{master.stem}_{tag}.wav"
+
+
+def normalize_master(provider_name: str, master: Path) -> Optional[Path]:
+    """Processed copy of `master`, computed once and cached beside it.
+
+    Returns None when NumPy is unavailable or the master can't be read, in
+    which case the caller delivers the unprocessed master.
+    """
+    from .cache_index import get_cache_index
+
+    out = normalized_path(master)
+    index = get_cache_index()
+    if out.exists():
+        index.hit(provider_name, out)
+        return out
+    out.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        stats = process_master(
+            master, out,
+            target_lufs=SETTINGS.TTS_LOUDNESS_TARGET_LUFS,
+            ceiling_dbfs=SETTINGS.TTS_PEAK_DBFS,
+            edge_silence_ms=SETTINGS.TTS_EDGE_SILENCE_MS,
+        )
+    except ImportError:
+        print("[WARN] NumPy not installed; skipping loudness normalization")
+        return None
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] Loudness normalization failed for {master.name}: {e}")
+        return None
+    index.put(provider_name, out)
+    print(f"[INFO] Normalized {master.name}: {stats}")
+    return out
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import wave
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from ..config import SETTINGS
+from ..redis_client import get_redis
+from .audio_utils import open_pcm_encoder
+from .concat import Mp3FrameReader, mp3_audio_frames
+
+# Segments are always MP3 (HLS packed audio) whatever the delivery format
+_SEGMENT_EXT = "mp3"
+
+
+def hls_dir(article_id: str) -> Path:
+    return Path(SETTINGS.AUDIO_OUT_DIR) / "hls" / article_id
+
+
+def playlist_url(article_id: str) -> str:
+    return f"/static/hls/{article_id}/index.m3u8"
+
+
+def _manifest_path(article_id: str, index: int) -> Path:
+    return hls_dir(article_id) / f"p{index:04d}.json"
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.part")
+    tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_manifest(article_id: str, index: int) -> Optional[dict]:
+    try:
+        return json.loads(_manifest_path(article_id, index).read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+@contextmanager
+def _article_lock(article_id: str) -> Iterator[None]:
+    """Serialize playlist rewrites across workers (best effort without Redis)."""
+    r = get_redis()
+    lock = None
+    if r is not None:
+        try:
+            lock = r.lock(f"hls:{article_id}:lock", timeout=10, blocking_timeout=5)
+            if not lock.acquire():
+                lock = None
+        except Exception:
+            lock = None
+    try:
+        yield
+    finally:
+        if lock is not None:
+            try:
+                lock.release()
+            except Exception:
+                pass
+
+
+def rebuild_playlist(article_id: str, paragraph_count: int) -> bool:
+    """Rewrite index.m3u8 from the per-paragraph manifests.
+
+    Lists paragraphs in order and stops at the first one that is not
+    complete (after including the segments it already has), so the
+    playlist only ever grows. Once every paragraph is complete it becomes
+    a static VOD playlist. Returns True when the article is complete.
+    """
+    with _article_lock(article_id):
+        entries: List[str] = []
+        target = 1
+        complete = True
+        for i in range(1, paragraph_count + 1):
+            m = _read_manifest(article_id, i)
+            segs = (m or {}).get("segments", [])
+            if segs and entries:
+                entries.append("#EXT-X-DISCONTINUITY")
+            for s in segs:
+                if s.get("discontinuity") and entries and entries[-1] != "#EXT-X-DISCONTINUITY":
+                    # A retry resumed this paragraph with different encoder state
+                    entries.append("#EXT-X-DISCONTINUITY")
+                target = max(target, math.ceil(s["duration"]))
+                entries.append(f"#EXTINF:{s['duration']:.3f},")
+                entries.append(s["file"])
+            if not (m and m.get("complete")):
+                complete = False
+                break
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{target}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            f"#EXT-X-PLAYLIST-TYPE:{'VOD' if complete else 'EVENT'}",
+            *entries,
+        ]
+        if complete:
+            lines.append("#EXT-X-ENDLIST")
+        out = hls_dir(article_id) / "index.m3u8"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(f"index.{os.getpid()}.part")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, out)
+        return complete
+
+
+class HlsParagraphWriter:
+    """Cuts one paragraph's PCM into MP3 segments of about `segment_sec` as it arrives.
+
+    One encoder runs for the whole paragraph and its output is split on
+    frame boundaries, so segments join without the priming/padding silence
+    a fresh encoder would add at every boundary. Each finished segment is
+    added to the paragraph manifest and the article playlist is rewritten,
+    so the paragraph is audible after its first segment rather than after
+    the whole synthesis and transcode.
+
+    A live EVENT playlist may only grow: a retry keeps whatever an earlier
+    attempt already published, skips that much audio and continues after an
+    EXT-X-DISCONTINUITY.
+    """
+
+    def __init__(self, article_id: str, index: int, paragraph_count: int, *, segment_sec: float) -> None:
+        self.article_id = article_id
+        self.index = index
+        self.paragraph_count = paragraph_count
+        self.segment_sec = max(1.0, segment_sec)
+        self._rate = 0
+        self._channels = 1
+        self._segments, skip_sec = _resume_state(article_id, index)
+        self._skip_sec = skip_sec
+        self._skip = 0
+        self._resumed = bool(self._segments)
+        self._sink = None
+        self._tail = None
+        self._reader = Mp3FrameReader()
+        self._cur = bytearray()
+        self._dur = 0.0
+        self._failed = False
+        hls_dir(article_id).mkdir(parents=True, exist_ok=True)
+        self._publish(complete=False)
+
+    @property
+    def failed(self) -> bool:
+        return self._failed
+
+    def start(self, sample_rate: int, channels: int = 1) -> "HlsParagraphWriter":
+        self._rate = sample_rate
+        self._channels = channels
+        self._skip = int(self._skip_sec * sample_rate) * 2 * channels
+        return self
+
+    def _publish(self, *, complete: bool) -> None:
+        _write_json(_manifest_path(self.article_id, self.index), {"segments": self._segments, "complete": complete})
+        rebuild_playlist(self.article_id, self.paragraph_count)
+
+    def _open(self) -> None:
+        out = hls_dir(self.article_id) / f".p{self.index:04d}.stream.{_SEGMENT_EXT}"
+        self._sink = open_pcm_encoder(out, format=_SEGMENT_EXT, in_rate=self._rate, channels=self._channels)
+        if self._sink is None:
+            raise RuntimeError("no encoder available for HLS segments")
+
+    def _emit(self) -> None:
+        entry = _write_segment(self.article_id, self.index, len(self._segments), bytes(self._cur), self._dur)
+        if self._resumed:
+            entry["discontinuity"] = True
+            self._resumed = False
+        self._segments.append(entry)
+        self._cur.clear()
+        self._dur = 0.0
+        self._publish(complete=False)
+
+    def _drain(self, *, final: bool) -> None:
+        """Move whatever the encoder has flushed so far into segments."""
+        if self._tail is None:
+            # The encoder creates its temp file lazily; close() renames it into place
+            path = self._sink.out_path if final else self._sink.tmp
+            try:
+                self._tail = open(path, "rb", buffering=0)
+            except FileNotFoundError:
+                return
+        while True:
+            data = self._tail.read(1 << 16)
+            if not data:
+                break
+            for frame, seconds in self._reader.feed(data):
+                self._cur += frame
+                self._dur += seconds
+                if self._dur >= self.segment_sec:
+                    self._emit()
+        if final and self._cur:
+            self._emit()
+
+    def _release(self) -> None:
+        if self._tail is not None:
+            self._tail.close()
+            self._tail = None
+        if self._sink is not None:
+            self._sink.out_path.unlink(missing_ok=True)
+
+    def write(self, pcm: bytes) -> None:
+        # A segment failure must not fail the paragraph itself: stop feeding
+        # segments and let the finished file be segmented afterwards.
+        if self._failed:
+            return
+        if self._skip:
+            # Audio an earlier attempt already published
+            drop = min(self._skip, len(pcm))
+            self._skip -= drop
+            pcm = pcm[drop:]
+            if not pcm:
+                return
+        try:
+            if self._sink is None:
+                self._open()
+            self._sink.write(pcm)
+            self._drain(final=False)
+        except Exception as e:  # noqa: BLE001
+            print(f"[WARN] HLS segment write failed for paragraph {self.index}: {e}")
+            self._fail()
+
+    def _fail(self) -> None:
+        self._failed = True
+        if self._sink is not None:
+            self._sink.abort()
+        self._release()
+
+    def close(self) -> None:
+        if self._failed:
+            return
+        try:
+            if self._sink is not None:
+                if not self._sink.close():
+                    raise RuntimeError("HLS segment encode failed")
+                self._drain(final=True)
+                self._release()
+            self._publish(complete=True)
+        except Exception as e:  # noqa: BLE001
+            print(f"[WARN] HLS segment write failed for paragraph {self.index}: {e}")
+            self._fail()
+
+    def abort(self) -> None:
+        """Stop this attempt; segments already in the playlist stay there for the retry."""
+        if self._failed:
+            return
+        if self._sink is not None:
+            self._sink.abort()
+        self._release()
+        self._sink = None
+        self._cur.clear()
+        self._dur = 0.0
+        self._publish(complete=False)
+
+
+def _resume_state(article_id: str, index: int) -> Tuple[List[dict], float]:
+    """Segments an earlier, unfinished attempt published and their total duration."""
+    m = _read_manifest(article_id, index)
+    if not m or m.get("complete"):
+        return [], 0.0
+    segs = list(m.get("segments", []))
+    return segs, sum(s["duration"] for s in segs)
+
+
+def paragraph_complete(article_id: str, index: int) -> bool:
+    return bool((_read_manifest(article_id, index) or {}).get("complete"))
+
+
+def segment_existing(article_id: str, index: int, paragraph_count: int, audio: Path, *, segment_sec: float) -> bool:
+    """Segment an already finished paragraph file (non-streaming paths).
+
+    MP3 is split on frame boundaries without re-encoding; WAV goes through
+    the PCM writer. Other formats can't be segmented here; the paragraph is
+    marked complete with no segments so later paragraphs still play.
+    """
+    ext = audio.suffix.lower()
+    segments, skip_sec = _resume_state(article_id, index)
+    resumed = bool(segments)
+    if ext == ".wav":
+        with wave.open(str(audio), "rb") as w:
+            writer = HlsParagraphWriter(article_id, index, paragraph_count, segment_sec=segment_sec)
+            writer.start(w.getframerate(), w.getnchannels())
+            block = w.getframerate()
+            while True:
+                pcm = w.readframes(block)
+                if not pcm:
+                    break
+                writer.write(pcm)
+            writer.close()
+        if not writer.failed:
+            return True
+        print(f"[WARN] HLS: paragraph {index} left without segments")
+    elif ext == ".mp3":
+        data = audio.read_bytes()
+        cur = bytearray()
+        dur = 0.0
+        skipped = 0.0
+        for offset, length, samples, rate in mp3_audio_frames(data):
+            if skipped < skip_sec:
+                # Already in the playlist from an earlier attempt
+                skipped += samples / rate
+                continue
+            cur += data[offset: offset + length]
+            dur += samples / rate
+            if dur >= segment_sec:
+                segments.append(_write_segment(article_id, index, len(segments), bytes(cur), dur, discontinuity=resumed))
+                resumed = False
+                cur.clear()
+                dur = 0.0
+        if cur:
+            segments.append(_write_segment(article_id, index, len(segments), bytes(cur), dur, discontinuity=resumed))
+    else:
+        print(f"[WARN] HLS: cannot segment {audio.name}; paragraph {index} has no segments")
+    _write_json(_manifest_path(article_id, index), {"segments": segments, "complete": True})
+    rebuild_playlist(article_id, paragraph_count)
+    return bool(segments)
+
+
+def _write_segment(article_id: str, index: int, n: int, data: bytes, duration: float, *, discontinuity: bool = False) -> dict:
+    name = f"p{index:04d}_{n:04d}.{_SEGMENT_EXT}"
+    path = hls_dir(article_id) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{name}.{os.getpid()}.part")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    entry = {"file": name, "duration": round(duration, 3)}
+    if discontinuity:
+        entry["discontinuity"] = True
+    return entry
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import importlib.util
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from ..config import SETTINGS
+from ..metrics import HTTP_CONNECTIONS, HTTP_REQUESTS
+
+_clients: Dict[str, httpx.Client] = {}
+_lock = threading.Lock()
+# Per-process counts behind the metrics, for logs and the warm-up report
+stats: Dict[str, Dict[str, int]] = {}
+
+
+def http2_enabled() -> bool:
+    # HTTP/2 needs the optional `h2` package and is only negotiated over TLS
+    return bool(getattr(SETTINGS, "HTTP2", True)) and importlib.util.find_spec("h2") is not None
+
+
+def _counting_hooks(name: str) -> dict:
+    """Event hooks that count requests and newly opened connections.
+
+    httpcore reports each TCP connect through the request's `trace`
+    extension; requests that don't connect went over a kept-alive one.
+    """
+    counts = stats.setdefault(name, {"requests": 0, "connections": 0})
+
+    def trace(event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            counts["connections"] += 1
+            HTTP_CONNECTIONS.labels(name).inc()
+
+    def on_request(request: httpx.Request) -> None:
+        counts["requests"] += 1
+        HTTP_REQUESTS.labels(name).inc()
+        request.extensions["trace"] = trace
+
+    return {"request": [on_request]}
+
+
+def make_http_client(name: str, **kwargs) -> httpx.Client:
+    """A keep-alive pooled client; pass per-request timeouts where they differ."""
+    limits = httpx.Limits(
+        max_connections=max(1, SETTINGS.HTTP_POOL_MAX_CONNECTIONS),
+        max_keepalive_connections=max(1, SETTINGS.HTTP_POOL_MAX_CONNECTIONS),
+        keepalive_expiry=SETTINGS.HTTP_KEEPALIVE_EXPIRY_SEC,
+    )
+    kwargs.setdefault("timeout", httpx.Timeout(60.0, connect=5.0))
+    return httpx.Client(http2=http2_enabled(), limits=limits, event_hooks=_counting_hooks(name), **kwargs)
+
+
+def get_http_client(name: str = "piper") -> httpx.Client:
+    """Process-wide pooled client per upstream (one connection pool each).
+
+    Created after fork (worker_process_init or first use), never shared
+    across processes.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = make_http_client(name)
+    return client
+
+
+def connection_reuse() -> Dict[str, Optional[float]]:
+    """Share of requests per client that reused a pooled connection."""
+    return {
+        name: (1.0 - c["connections"] / c["requests"]) if c["requests"] else None
+        for name, c in stats.items()
+    }
+
+
+def close_http_clients(**_kwargs) -> None:
+    """Close pooled connections (Celery `worker_process_shutdown` handler)."""
+    with _lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
@@ -1,20 +1,30 @@
 from __future__ import annotations
 
 import os
+import threading
 from typing import Optional
 
 from openai import OpenAI
 
+from .http_client import make_http_client
+
 _client: Optional[OpenAI] = None
+_lock = threading.Lock()
 
 
 def get_openai_client() -> OpenAI:
-    """Create the OpenAI client on first use, then reuse it."""
+    """Create the OpenAI client on first use, then reuse it.
+
+    It sits on a pooled keep-alive httpx client (HTTP/2 when `h2` is
+    installed), so consecutive paragraphs skip the TCP and TLS handshakes.
+    """
     global _client
     if _client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY is not set in the environment")
-        _client = OpenAI(api_key=api_key)
+        with _lock:
+            if _client is None:
+                api_key = os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    raise RuntimeError("OPENAI_API_KEY is not set in the environment")
+                # The SDK sets its own per-request timeouts
+                _client = OpenAI(api_key=api_key, http_client=make_http_client("openai", timeout=None))
     return _client
-
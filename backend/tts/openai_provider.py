@@ -1,26 +1,37 @@
 from __future__ import annotations
 
 import os
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 from ..config import SETTINGS
-from .types import TTSEngine
+from .types import PcmStream, TTSEngine
 from .utils import cache_key
+from .cache_index import get_cache_index
 from .openai_client import get_openai_client  # reuse client factory without circular import
 from openai import OpenAIError
 
 
+# Choose model and voice similar to existing behavior
+def _voice_for(model: str, g: str | None) -> str:
+    gm = (g or "").lower()
+    if model.startswith("gpt-4o-mini-tts"):
+        return "alloy" if gm == "male" else "verse"
+    return "onyx" if gm == "male" else "shimmer"
+
+
 class OpenAITTSProvider(TTSEngine):
     name = "openai"
+    # Formats the speech API returns directly (`response_format`)
+    native_formats = ("wav", "mp3", "opus", "aac", "flac")
 
     def __init__(self, cache_dir: Optional[Path] = None) -> None:
         base = Path(SETTINGS.AUDIO_OUT_DIR)
         self._cache_dir = Path(cache_dir) if cache_dir else (base / "_cache" / self.name)
         self._cache_dir.mkdir(parents=True, exist_ok=True)
 
-    def synthesize(self, text: str, *, voice: str | None, rate: int | None, fmt: str = "wav") -> Path:
-        # Compute cache path
+    def _cache_path(self, text: str, voice: str | None, rate: int | None, fmt: str) -> Path:
         key = cache_key(
             text=text,
             provider=self.name,
@@ -29,19 +40,63 @@ class OpenAITTSProvider(TTSEngine):
             delivery_format=fmt or SETTINGS.TTS_FORMAT,
             engine_version="openai-v1",
         )
-        out = self._cache_dir / f"{key}.{fmt or 'wav'}"
+        return self._cache_dir / f"{key}.{fmt}"
+
+    def _normalize_fmt(self, fmt: str | None) -> str:
+        fmt = (fmt or "wav").lower()
+        return fmt if fmt in self.native_formats else "wav"
+
+    def lookup(self, text: str, *, voice: str | None, rate: int | None, fmt: str = "wav") -> Path | None:
+        """Return the cached audio for these inputs, or None without synthesizing."""
+        out = self._cache_path(text, voice, rate, self._normalize_fmt(fmt))
+        if not out.exists():
+            return None
+        get_cache_index().hit(self.name, out)
+        return out
+
+    def master_path(self, text: str, *, voice: str | None, rate: int | None) -> Path:
+        """Where the WAV master for these inputs lives in the provider cache."""
+        return self._cache_path(text, voice, rate, "wav")
+
+    @contextmanager
+    def stream_pcm(self, text: str, *, voice: str | None, rate: int | None) -> Iterator[PcmStream]:
+        """Stream raw PCM (24 kHz s16le mono, the API's `pcm` format) without touching disk."""
+        client = get_openai_client()
+        tried: list[str] = []
+        with ExitStack() as stack:
+            response = None
+            for model in dict.fromkeys([getattr(SETTINGS, "TTS_MODEL", None), "gpt-4o-mini-tts", "tts-1"]):
+                if not model:
+                    continue
+                tried.append(model)
+                try:
+                    response = stack.enter_context(
+                        client.audio.speech.with_streaming_response.create(
+                            model=model,
+                            voice=_voice_for(model, voice or SETTINGS.TTS_VOICE),
+                            input=text,
+                            response_format="pcm",
+                        )
+                    )
+                    break
+                except OpenAIError as oe:
+                    if "invalid model" in str(oe).lower():
+                        continue
+                    raise
+            if response is None:
+                raise RuntimeError(f"No supported OpenAI TTS model available. Tried: {tried}")
+            yield PcmStream(sample_rate=24000, chunks=response.iter_bytes(16384))
+
+    def synthesize(self, text: str, *, voice: str | None, rate: int | None, fmt: str = "wav") -> Path:
+        fmt = self._normalize_fmt(fmt)
+        # Compute cache path
+        out = self._cache_path(text, voice, rate, fmt)
         if out.exists():
+            get_cache_index().hit(self.name, out)
             return out
 
         client = get_openai_client()
 
-        # Choose model and voice similar to existing behavior
-        def _voice_for(model: str, g: str | None) -> str:
-            gm = (g or "").lower()
-            if model.startswith("gpt-4o-mini-tts"):
-                return "alloy" if gm == "male" else "verse"
-            return "onyx" if gm == "male" else "shimmer"
-
         tried: list[str] = []
         model_candidates = [getattr(SETTINGS, "TTS_MODEL", None), "gpt-4o-mini-tts", "tts-1"]
         for model in dict.fromkeys(model_candidates):
@@ -55,8 +110,10 @@ class OpenAITTSProvider(TTSEngine):
                     model=model,
                     voice=v,
                     input=text,
+                    response_format=fmt,
                 ) as response:
                     response.stream_to_file(str(out))
+                get_cache_index().put(self.name, out)
                 return out
             except AttributeError:
                 # Fallback to non-streaming
@@ -65,6 +122,7 @@ class OpenAITTSProvider(TTSEngine):
                         model=model,
                         voice=v,
                         input=text,
+                        response_format=fmt,
                     )
                     data = result if isinstance(result, (bytes, bytearray)) else getattr(result, "content", None)
                     if data is None:
@@ -72,6 +130,7 @@ class OpenAITTSProvider(TTSEngine):
                     if not data:
                         raise RuntimeError("TTS API returned no audio data")
                     out.write_bytes(data)
+                    get_cache_index().put(self.name, out)
                     return out
                 except OpenAIError as oe:
                     msg = str(oe).lower()
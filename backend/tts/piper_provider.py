@@ -1,40 +1,83 @@
 from __future__ import annotations
 
+import os
 import subprocess
 import tempfile
+import wave
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, List, Optional, Union
 
 import httpx
 
 from ..config import SETTINGS
 from .voices import resolve_voice
-from .types import TTSEngine
+from .types import PcmStream, TTSEngine
 from .utils import cache_key
+from .cache_index import get_cache_index
+from .http_client import get_http_client
 
 
 class PiperTTSProvider(TTSEngine):
     name = "piper"
+    native_formats = ("wav",)
 
     def __init__(self, cache_dir: Optional[Path] = None) -> None:
         base = Path(SETTINGS.AUDIO_OUT_DIR)
         self._cache_dir = Path(cache_dir) if cache_dir else (base / "_cache" / self.name)
         self._cache_dir.mkdir(parents=True, exist_ok=True)
 
-    def synthesize(self, text: str, *, voice: str | None, rate: int | None, fmt: str = "wav") -> Path:
-        # Resolve voice id to model path (HTTP) or use model path from env (CLI)
-        v = resolve_voice(lang="en", preferred_id=voice)  # Extend for language routing as needed
+    def _cache_path(self, text: str, voice_id: str, rate: int | None) -> Path:
         out_fmt = "wav"
         key = cache_key(
             text=text,
             provider=self.name,
-            voice=v.id,
+            voice=voice_id,
             rate=rate or 0,
             delivery_format=out_fmt,
             engine_version="piper-v1",
         )
-        out = self._cache_dir / f"{key}.{out_fmt}"
+        return self._cache_dir / f"{key}.{out_fmt}"
+
+    def lookup(self, text: str, *, voice: str | None, rate: int | None, fmt: str = "wav") -> Path | None:
+        """Return the cached audio for these inputs, or None without synthesizing."""
+        v = resolve_voice(lang="en", preferred_id=voice)
+        out = self._cache_path(text, v.id, rate)
+        if not out.exists():
+            return None
+        get_cache_index().hit(self.name, out)
+        return out
+
+    def master_path(self, text: str, *, voice: str | None, rate: int | None) -> Path:
+        """Where the WAV master for these inputs lives in the provider cache."""
+        v = resolve_voice(lang="en", preferred_id=voice)
+        return self._cache_path(text, v.id, rate)
+
+    @contextmanager
+    def stream_pcm(self, text: str, *, voice: str | None, rate: int | None) -> Iterator[PcmStream]:
+        """Stream raw PCM from the sidecar (HTTP mode only)."""
+        if (SETTINGS.PIPER_MODE or "HTTP").upper() != "HTTP":
+            raise NotImplementedError("PCM streaming needs the Piper HTTP sidecar")
+        v = resolve_voice(lang="en", preferred_id=voice)
+        url = SETTINGS.PIPER_URL.rstrip("/") + "/synthesize"
+        timeout = max(5, int(getattr(SETTINGS, "PIPER_TIMEOUT_SEC", 60)))
+        payload = {"text": text, "model_path": v.model_path, "format": "pcm"}
+        with get_http_client().stream("POST", url, json=payload, timeout=timeout) as r:
+            r.raise_for_status()
+            if (r.headers.get("x-audio-format") or "").lower() != "s16le":
+                raise RuntimeError("piper sidecar does not support PCM streaming")
+            yield PcmStream(
+                sample_rate=int(r.headers.get("x-sample-rate") or 22050),
+                channels=int(r.headers.get("x-channels") or 1),
+                chunks=r.iter_bytes(),
+            )
+
+    def synthesize(self, text: str, *, voice: str | None, rate: int | None, fmt: str = "wav") -> Path:
+        # Resolve voice id to model path (HTTP) or use model path from env (CLI)
+        v = resolve_voice(lang="en", preferred_id=voice)  # Extend for language routing as needed
+        out = self._cache_path(text, v.id, rate)
         if out.exists():
+            get_cache_index().hit(self.name, out)
             return out
 
         mode = (SETTINGS.PIPER_MODE or "HTTP").upper()
@@ -42,11 +85,12 @@ class PiperTTSProvider(TTSEngine):
 
         if mode == "HTTP":
             url = SETTINGS.PIPER_URL.rstrip("/") + "/synthesize"
-            payload = {"text": text, "model_path": v.model_path}
-            with httpx.Client(timeout=timeout) as client:
-                r = client.post(url, json=payload)
+            # Ask for streamed PCM so audio goes to disk as the sidecar produces it
+            payload = {"text": text, "model_path": v.model_path, "format": "pcm"}
+            with get_http_client().stream("POST", url, json=payload, timeout=timeout) as r:
                 r.raise_for_status()
-                out.write_bytes(r.content)
+                _write_stream(r, out)
+            get_cache_index().put(self.name, out)
             return out
 
         # CLI mode
@@ -79,4 +123,166 @@ class PiperTTSProvider(TTSEngine):
             raise RuntimeError(f"piper CLI failed: {proc.stderr.decode(errors='ignore')}")
         if not out.exists() or out.stat().st_size == 0:
             raise RuntimeError("piper produced no audio")
+        get_cache_index().put(self.name, out)
         return out
+
+    def synthesize_batch(
+        self, texts: List[str], *, voice: str | None, rate: int | None, fmt: str = "wav"
+    ) -> List[Union[Path, Exception]]:
+        """Synthesize several texts with one voice; results are in input order.
+
+        Cached texts are not sent. In HTTP mode the misses go to the sidecar's
+        /synthesize_batch in one request per PIPER_BATCH_SIZE texts; each item
+        is either the cached WAV path or the exception for that item, so one
+        bad text does not fail the rest. CLI mode falls back to per-item calls.
+        """
+        v = resolve_voice(lang="en", preferred_id=voice)
+        results: List[Union[Path, Exception, None]] = [None] * len(texts)
+        misses: List[int] = []
+        for i, text in enumerate(texts):
+            out = self._cache_path(text, v.id, rate)
+            if out.exists():
+                get_cache_index().hit(self.name, out)
+                results[i] = out
+            else:
+                misses.append(i)
+
+        mode = (SETTINGS.PIPER_MODE or "HTTP").upper()
+        if mode != "HTTP":
+            for i in misses:
+                try:
+                    results[i] = self.synthesize(texts[i], voice=voice, rate=rate, fmt=fmt)
+                except Exception as e:  # noqa: BLE001
+                    results[i] = e
+            return results  # type: ignore[return-value]
+
+        url = SETTINGS.PIPER_URL.rstrip("/") + "/synthesize_batch"
+        timeout = max(5, int(getattr(SETTINGS, "PIPER_TIMEOUT_SEC", 60)))
+        size = max(1, int(getattr(SETTINGS, "PIPER_BATCH_SIZE", 32)))
+        client = get_http_client()
+        for start in range(0, len(misses), size):
+            group = misses[start:start + size]
+            payload = {"texts": [texts[i] for i in group], "model_path": v.model_path}
+            try:
+                with client.stream("POST", url, json=payload, timeout=timeout) as r:
+                    r.raise_for_status()
+                    for local_idx, ok, body in _iter_multipart(r):
+                        i = group[local_idx]
+                        if not ok:
+                            results[i] = RuntimeError(f"piper batch item failed: {b''.join(body).decode(errors='ignore')}")
+                            continue
+                        out = self._cache_path(texts[i], v.id, rate)
+                        tmp = out.with_name(f"{out.name}.{os.getpid()}.part")
+                        with open(tmp, "wb") as f:
+                            for chunk in body:
+                                f.write(chunk)
+                        os.replace(tmp, out)
+                        get_cache_index().put(self.name, out)
+                        results[i] = out
+            except Exception as e:  # noqa: BLE001
+                for i in group:
+                    if results[i] is None:
+                        results[i] = e
+        for i in misses:
+            if results[i] is None:
+                results[i] = RuntimeError("piper batch response missing item")
+        return results  # type: ignore[return-value]
+
+
+class _ByteReader:
+    """Minimal buffered reader over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self._buf = bytearray()
+
+    def _fill(self) -> bool:
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self._buf += chunk
+        return True
+
+    def readline(self) -> bytes:
+        while b"\n" not in self._buf:
+            if not self._fill():
+                break
+        idx = self._buf.find(b"\n")
+        end = len(self._buf) if idx < 0 else idx + 1
+        line = bytes(self._buf[:end])
+        del self._buf[:end]
+        return line
+
+    def iter_exact(self, n: int) -> Iterator[bytes]:
+        while n > 0:
+            if not self._buf and not self._fill():
+                raise RuntimeError("truncated multipart body")
+            take = min(n, len(self._buf))
+            yield bytes(self._buf[:take])
+            del self._buf[:take]
+            n -= take
+
+
+def _iter_multipart(r: httpx.Response) -> Iterator[tuple[int, bool, Iterator[bytes]]]:
+    """Yield (index, ok, body_chunks) for each part of a /synthesize_batch response.
+
+    Parts are length-prefixed (Content-Length), so bodies are streamed without
+    scanning for the boundary. Each body iterator must be consumed before
+    advancing to the next part.
+    """
+    ctype = r.headers.get("content-type", "")
+    boundary = ctype.split("boundary=", 1)[-1].strip().strip('"')
+    if not boundary:
+        raise RuntimeError("piper batch response has no multipart boundary")
+    reader = _ByteReader(r.iter_bytes())
+    while True:
+        line = reader.readline()
+        if not line:
+            return
+        line = line.strip()
+        if not line:
+            continue
+        if line == f"--{boundary}--".encode():
+            return
+        if line != f"--{boundary}".encode():
+            raise RuntimeError("malformed multipart response from piper sidecar")
+        headers: dict[str, str] = {}
+        while True:
+            h = reader.readline().strip()
+            if not h:
+                break
+            k, _, val = h.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = val.strip()
+        length = int(headers.get("content-length", "0"))
+        body = reader.iter_exact(length)
+        yield int(headers.get("x-item-index", "0")), headers.get("x-item-status") == "ok", body
+        for _ in body:  # drain anything the caller left unread
+            pass
+
+
+def _write_stream(r: httpx.Response, out: Path) -> None:
+    """Write a streamed sidecar response to `out` without buffering it in memory.
+
+    Raw PCM (declared via X-Audio-Format/X-Sample-Rate) is wrapped in a WAV
+    header; anything else (older sidecars) is written through as-is. Goes via
+    a temp file + rename so readers never see a partial file.
+    """
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.part")
+    fmt = (r.headers.get("x-audio-format") or "").lower()
+    try:
+        if fmt == "s16le":
+            with wave.open(str(tmp), "wb") as w:
+                w.setnchannels(int(r.headers.get("x-channels") or 1))
+                w.setsampwidth(2)
+                w.setframerate(int(r.headers.get("x-sample-rate") or 22050))
+                for chunk in r.iter_bytes():
+                    w.writeframes(chunk)
+        else:
+            with open(tmp, "wb") as f:
+                for chunk in r.iter_bytes():
+                    f.write(chunk)
+        if tmp.stat().st_size <= 44:
+            raise RuntimeError("piper sidecar returned no audio")
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
@@ -20,6 +20,7 @@ class PollyTTSProvider(TTSEngine):
     """
 
     name = "polly"
+    native_formats = ("mp3", "ogg")  # Polly OutputFormat mp3 / ogg_vorbis
 
     def __init__(self, cache_dir: Optional[Path] = None) -> None:  # noqa: D401
         self._cache_dir = cache_dir
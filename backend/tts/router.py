@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..config import SETTINGS
+from ..metrics import SYNTHESIS_SECONDS
+from ..redis_client import get_redis
+
+# Samples needed before a provider's latency estimate is trusted
+_MIN_SAMPLES = 3
+# Expected-time multiplier cap for providers that fail most of the time
+_MAX_ERROR_PENALTY = 10.0
+
+# Atomic EWMA update so concurrent workers don't clobber each other.
+# KEYS[1] = stats hash, KEYS[2] = recent-samples list
+# ARGV = alpha, ok(1/0), ms_per_char (or "" on failure), window
+_UPDATE_LUA = """
+local alpha = tonumber(ARGV[1])
+local ok = tonumber(ARGV[2])
+local err = redis.call('HGET', KEYS[1], 'error_rate')
+err = err and tonumber(err) or 0
+redis.call('HSET', KEYS[1], 'error_rate', tostring(alpha * (1 - ok) + (1 - alpha) * err))
+if ARGV[3] ~= '' then
+  local sample = tonumber(ARGV[3])
+  local n = tonumber(redis.call('HINCRBY', KEYS[1], 'samples', 1))
+  local mpc = redis.call('HGET', KEYS[1], 'ms_per_char')
+  if n == 1 or not mpc then
+    mpc = sample
+  else
+    mpc = alpha * sample + (1 - alpha) * tonumber(mpc)
+  end
+  redis.call('HSET', KEYS[1], 'ms_per_char', tostring(mpc))
+  redis.call('LPUSH', KEYS[2], ARGV[3])
+  redis.call('LTRIM', KEYS[2], 0, tonumber(ARGV[4]) - 1)
+end
+return 1
+"""
+
+
+@dataclass
+class ProviderStats:
+    name: str
+    ms_per_char: float = 0.0
+    error_rate: float = 0.0
+    samples: int = 0
+    recent: List[float] = field(default_factory=list)  # recent ms/char, newest first
+
+    def expected_seconds(self, chars: int) -> float:
+        """Expected time to a successful result, counting retries on failure."""
+        base = self.ms_per_char * max(1, chars) / 1000.0
+        penalty = min(_MAX_ERROR_PENALTY, 1.0 / max(1e-6, 1.0 - self.error_rate))
+        return base * penalty
+
+    def percentile_seconds(self, chars: int, pct: float) -> Optional[float]:
+        if len(self.recent) < _MIN_SAMPLES:
+            return None
+        ordered = sorted(self.recent)
+        idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+        return ordered[idx] * max(1, chars) / 1000.0
+
+
+class LatencyRouter:
+    """Ranks TTS providers by expected completion time for a chunk.
+
+    Keeps an EWMA of synthesis latency per character and of the error rate
+    for each provider. State lives in Redis so every worker shares it; if
+    Redis is unreachable the router falls back to process-local stats.
+    """
+
+    def __init__(self, *, alpha: float = 0.2, window: int = 200, prefix: str = "tts:router") -> None:
+        self._alpha = min(1.0, max(0.01, alpha))
+        self._window = max(_MIN_SAMPLES, window)
+        self._prefix = prefix
+        self._local: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+        self._script = None
+
+    def _keys(self, name: str) -> Tuple[str, str]:
+        return f"{self._prefix}:{name}", f"{self._prefix}:{name}:recent"
+
+    def record(self, name: str, *, chars: int, elapsed_s: float | None, ok: bool) -> None:
+        """Record one synthesis outcome. Pass elapsed_s=None to only update the error rate."""
+        sample = (elapsed_s * 1000.0 / max(1, chars)) if (ok and elapsed_s is not None) else None
+        r = get_redis()
+        if r is not None:
+            try:
+                if self._script is None:
+                    self._script = r.register_script(_UPDATE_LUA)
+                h, lst = self._keys(name)
+                self._script(keys=[h, lst], args=[self._alpha, 1 if ok else 0, "" if sample is None else repr(sample), self._window])
+                return
+            except Exception:
+                pass
+        with self._lock:
+            st = self._local.setdefault(name, ProviderStats(name))
+            st.error_rate = self._alpha * (0.0 if ok else 1.0) + (1 - self._alpha) * st.error_rate
+            if sample is not None:
+                st.samples += 1
+                st.ms_per_char = sample if st.samples == 1 else self._alpha * sample + (1 - self._alpha) * st.ms_per_char
+                st.recent.insert(0, sample)
+                del st.recent[self._window:]
+
+    def stats(self, name: str) -> ProviderStats:
+        r = get_redis()
+        if r is not None:
+            try:
+                h, lst = self._keys(name)
+                pipe = r.pipeline()
+                pipe.hgetall(h)
+                pipe.lrange(lst, 0, self._window - 1)
+                raw, recent = pipe.execute()
+                raw = {k.decode() if isinstance(k, bytes) else k: v for k, v in (raw or {}).items()}
+                return ProviderStats(
+                    name=name,
+                    ms_per_char=float(raw.get("ms_per_char", 0) or 0),
+                    error_rate=float(raw.get("error_rate", 0) or 0),
+                    samples=int(raw.get("samples", 0) or 0),
+                    recent=[float(x) for x in recent or []],
+                )
+            except Exception:
+                pass
+        with self._lock:
+            st = self._local.get(name) or ProviderStats(name)
+            return ProviderStats(st.name, st.ms_per_char, st.error_rate, st.samples, list(st.recent))
+
+    def rank(self, order: List[str], chars: int) -> List[str]:
+        """Sort providers by expected finish time; ties keep the configured order.
+
+        Providers without enough samples are scored at the median of the known
+        ones so they still get traffic and can earn an estimate.
+        """
+        all_stats = {n: self.stats(n) for n in order}
+        known = sorted(s.expected_seconds(chars) for s in all_stats.values() if s.samples >= _MIN_SAMPLES)
+        neutral = known[len(known) // 2] if known else 0.0
+
+        def score(n: str) -> float:
+            s = all_stats[n]
+            return s.expected_seconds(chars) if s.samples >= _MIN_SAMPLES else neutral
+
+        return sorted(order, key=lambda n: (score(n), order.index(n)))
+
+    def hedge_delay(self, name: str, chars: int, pct: float) -> Optional[float]:
+        """Seconds to wait on `name` before hedging, or None while there is no estimate."""
+        return self.stats(name).percentile_seconds(chars, pct)
+
+    def snapshot(self, names: List[str]) -> Dict[str, dict]:
+        out: Dict[str, dict] = {}
+        for n in names:
+            s = self.stats(n)
+            out[n] = {
+                "ms_per_char": round(s.ms_per_char, 3),
+                "error_rate": round(s.error_rate, 4),
+                "samples": s.samples,
+            }
+        return out
+
+
+_ROUTER: LatencyRouter | None = None
+_HEDGE_POOL: ThreadPoolExecutor | None = None
+
+
+def get_router() -> LatencyRouter:
+    global _ROUTER
+    if _ROUTER is None:
+        _ROUTER = LatencyRouter(
+            alpha=getattr(SETTINGS, "TTS_ROUTER_ALPHA", 0.2),
+            window=getattr(SETTINGS, "TTS_ROUTER_WINDOW", 200),
+        )
+    return _ROUTER
+
+
+def timed_synthesize(name: str, call: Callable[[], Path], chars: int, *, model: str = "") -> Path:
+    """Run one synthesis call and feed its latency into the router and metrics.
+
+    Results served from the provider's own cache (file older than the call)
+    are not counted as latency samples.
+    """
+    router = get_router()
+    t0 = time.time()
+    try:
+        path = call()
+    except Exception:
+        router.record(name, chars=chars, elapsed_s=None, ok=False)
+        raise
+    elapsed = time.time() - t0
+    try:
+        fresh = Path(path).stat().st_mtime >= t0 - 1.0
+    except OSError:
+        fresh = True
+    router.record(name, chars=chars, elapsed_s=elapsed if fresh else None, ok=True)
+    if fresh:
+        SYNTHESIS_SECONDS.labels(name, model).observe(elapsed)
+    return path
+
+
+class HedgeFailed(RuntimeError):
+    """Every provider `hedged_synthesize` actually called failed.
+
+    `failed` names them (the secondary only if it was started); the last
+    provider error is chained as `__cause__`.
+    """
+
+    def __init__(self, failed: List[str], last_error: Exception | None) -> None:
+        super().__init__(f"hedged synthesis failed via {', '.join(failed)}: {last_error}")
+        self.failed = failed
+
+
+def hedged_synthesize(
+    primary: str,
+    secondary: str,
+    calls: Dict[str, Callable[[], Path]],
+    *,
+    delay_s: float,
+) -> Tuple[str, Path]:
+    """Race `primary` against a delayed request to `secondary`.
+
+    The secondary is only started if the primary hasn't finished after
+    `delay_s`. The first successful result wins; the loser is cancelled if it
+    has not started, otherwise its result is discarded (it still fills that
+    provider's cache). Raises `HedgeFailed` if every started request failed.
+    """
+    global _HEDGE_POOL
+    if _HEDGE_POOL is None:
+        _HEDGE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tts-hedge")
+    futures: Dict[Future, str] = {_HEDGE_POOL.submit(calls[primary]): primary}
+    done, _ = wait(futures, timeout=max(0.0, delay_s))
+    if not done:
+        print(f"[INFO] Hedging: '{primary}' exceeded {delay_s:.2f}s, also asking '{secondary}'")
+        futures[_HEDGE_POOL.submit(calls[secondary])] = secondary
+    last_error: Exception | None = None
+    failed: List[str] = []
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            try:
+                path = fut.result()
+            except Exception as e:  # noqa: BLE001
+                last_error = e
+                failed.append(futures[fut])
+                continue
+            for other in pending:
+                other.cancel()
+            return futures[fut], path
+    raise HedgeFailed(failed, last_error) from last_error
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Tuple
+
+from ..cleaning import split_into_sentences
+from ..config import SETTINGS
+from ..redis_client import get_redis
+from .cache_index import get_cache_index
+from .concat import concat_wav
+from .types import TTSEngine
+
+# Per-article hit/miss counters are only read while the article is recent
+_STATS_TTL_SEC = 7 * 24 * 3600
+
+
+def _assembled_path(provider: TTSEngine, sentence_paths: list[Path], gap_ms: int) -> Path:
+    digest = hashlib.sha256()
+    for p in sentence_paths:
+        digest.update(p.name.encode("utf-8"))
+        digest.update(b"|")
+    digest.update(f"gap={gap_ms}".encode("ascii"))
+    base = Path(SETTINGS.AUDIO_OUT_DIR) / "_cache" / provider.name / "assembled"
+    base.mkdir(parents=True, exist_ok=True)
+    return base / f"{digest.hexdigest()}.wav"
+
+
+def synthesize_by_sentence(
+    provider: TTSEngine,
+    text: str,
+    *,
+    voice: str | None,
+    rate: int | None,
+    gap_ms: int,
+) -> Tuple[Path, dict]:
+    """Synthesize `text` one sentence at a time and assemble a chunk WAV master.
+
+    Each sentence is cached by the provider on its own, so re-chunking an
+    article or editing one sentence only sends the changed sentences to the
+    provider. Misses go out in one `synthesize_batch` call when the provider
+    has it (Piper); a sentence the batch failed is retried on its own.
+    Returns the assembled master and {"hits", "misses"} counts.
+    """
+    sentences = split_into_sentences(text) or [text]
+    lookup = getattr(provider, "lookup", None)
+    paths: list[Path | None] = [
+        lookup(s, voice=voice, rate=rate, fmt="wav") if lookup else None for s in sentences
+    ]
+    missing = [i for i, p in enumerate(paths) if p is None]
+    hits, misses = len(sentences) - len(missing), len(missing)
+    batch = getattr(provider, "synthesize_batch", None)
+    if batch is not None and len(missing) > 1:
+        results = batch([sentences[i] for i in missing], voice=voice, rate=rate, fmt="wav")
+        for i, res in zip(missing, results):
+            if isinstance(res, Path):
+                paths[i] = res
+    for i in missing:
+        if paths[i] is None:
+            paths[i] = provider.synthesize(sentences[i], voice=voice, rate=rate, fmt="wav")
+
+    if len(paths) == 1:
+        return paths[0], {"hits": hits, "misses": misses}
+    out = _assembled_path(provider, paths, gap_ms)
+    if out.exists():
+        get_cache_index().hit(provider.name, out)
+    else:
+        concat_wav(paths, out, gap_ms=gap_ms)
+        get_cache_index().put(provider.name, out)
+    return out, {"hits": hits, "misses": misses}
+
+
+def record_article_stats(article_key: str, stats: dict) -> None:
+    """Accumulate sentence-cache hits/misses per article in Redis (best effort)."""
+    r = get_redis()
+    if r is None or not article_key:
+        return
+    try:
+        key = f"tts:sentcache:{article_key}"
+        pipe = r.pipeline()
+        pipe.hincrby(key, "hits", int(stats.get("hits", 0)))
+        pipe.hincrby(key, "misses", int(stats.get("misses", 0)))
+        pipe.expire(key, _STATS_TTL_SEC)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def article_stats(article_key: str) -> dict:
+    r = get_redis()
+    hits = misses = 0
+    if r is not None:
+        try:
+            raw = r.hgetall(f"tts:sentcache:{article_key}") or {}
+            raw = {k.decode() if isinstance(k, bytes) else k: v for k, v in raw.items()}
+            hits = int(raw.get("hits", 0) or 0)
+            misses = int(raw.get("misses", 0) or 0)
+        except Exception:
+            pass
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_ratio": round(hits / total, 4) if total else None}
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+from .audio_utils import can_stream_encode, open_pcm_encoder
+from .cache_index import get_cache_index
+from .types import TTSEngine
+
+
+def delivery_cache_path(master: Path, delivery_ext: str) -> Path:
+    """Cache location of an encoded delivery file derived from a WAV master key."""
+    return master.parent / "delivery" / f"{master.stem}.{delivery_ext}"
+
+
+def can_stream(provider: TTSEngine) -> bool:
+    return callable(getattr(provider, "stream_pcm", None)) and callable(getattr(provider, "master_path", None))
+
+
+def synthesize_streaming(
+    provider: TTSEngine,
+    text: str,
+    *,
+    voice: str | None,
+    rate: int | None,
+    delivery_ext: str,
+    keep_master: bool,
+    tap=None,
+) -> Optional[Path]:
+    """Pipe the provider's PCM stream straight into the delivery encoder.
+
+    One pass over the audio: bytes go from the HTTP response into the encoder
+    (and, only if `keep_master`, into a WAV master in the provider cache).
+    The encoded file lands in `_cache/<provider>/delivery/` via temp + rename
+    and is returned; None means no streaming encoder is available and the
+    caller should use the master + transcode path instead. `tap` (e.g. an
+    HLS segment writer) receives the same PCM as it arrives.
+    """
+    master = provider.master_path(text, voice=voice, rate=rate)
+    out = delivery_cache_path(master, delivery_ext)
+    index = get_cache_index()
+    if out.exists():
+        index.hit(provider.name, out)
+        return out
+    if not can_stream_encode(delivery_ext):
+        return None
+
+    with provider.stream_pcm(text, voice=voice, rate=rate) as stream:
+        sink = open_pcm_encoder(out, format=delivery_ext, in_rate=stream.sample_rate, channels=stream.channels)
+        if sink is None:
+            return None
+        master_sink = (
+            open_pcm_encoder(master, format="wav", in_rate=stream.sample_rate, channels=stream.channels)
+            if keep_master and not master.exists()
+            else None
+        )
+        if tap is not None:
+            tap.start(stream.sample_rate, stream.channels)
+        wrote = 0
+        try:
+            for chunk in stream.chunks:
+                if not chunk:
+                    continue
+                sink.write(chunk)
+                if master_sink is not None:
+                    master_sink.write(chunk)
+                if tap is not None:
+                    tap.write(chunk)
+                wrote += len(chunk)
+        except BaseException:
+            sink.abort()
+            if master_sink is not None:
+                master_sink.abort()
+            if tap is not None:
+                tap.abort()
+            raise
+
+    if not wrote:
+        sink.abort()
+        if master_sink is not None:
+            master_sink.abort()
+        if tap is not None:
+            tap.abort()
+        raise RuntimeError(f"{provider.name} streamed no audio")
+    if master_sink is not None and master_sink.close():
+        index.put(provider.name, master)
+    if tap is not None:
+        tap.close()
+    if not sink.close():
+        raise RuntimeError(f"streaming encode to {delivery_ext} failed")
+    index.put(provider.name, out)
+    return out
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import wave
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from ..config import SETTINGS
+from .concat import mp3_audio_frames
+
+# Analysis resolution: 16 kHz mono, 10 ms hops
+_RATE = 16000
+_HOP = 160
+# Silences at least this long inside speech count as pauses
+_MIN_PAUSE_SEC = 0.12
+# Words whose end may line up with a pause
+_PHRASE_END = re.compile(r"[,.;:!?)\]—]$")
+
+
+def timing_path(audio: Path) -> Path:
+    return audio.with_name(f"{audio.stem}.timing.json")
+
+
+def tokenize(text: str) -> List[str]:
+    """Whitespace tokens, matching tokenizeParagraph on the frontend."""
+    return [w for w in re.split(r"\s+", text or "") if w]
+
+
+def audio_duration(audio: Path) -> Optional[float]:
+    """Exact duration from the container itself (no decode for WAV/MP3)."""
+    ext = audio.suffix.lower()
+    try:
+        if ext == ".wav":
+            with wave.open(str(audio), "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        if ext == ".mp3":
+            return sum(samples / rate for _, _, samples, rate in mp3_audio_frames(audio.read_bytes()))
+        from .concat import _probe_duration
+        return _probe_duration(audio)
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] Could not read duration of {audio.name}: {e}")
+        return None
+
+
+def _decode_pcm(audio: Path):
+    """Mono float32 samples at _RATE, or None when nothing can decode the file."""
+    import numpy as np
+
+    if audio.suffix.lower() == ".wav":
+        with wave.open(str(audio), "rb") as w:
+            if w.getsampwidth() == 2:
+                ch, rate = w.getnchannels(), w.getframerate()
+                x = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2").astype(np.float32) / 32768.0
+                if ch > 1:
+                    x = x.reshape(-1, ch).mean(axis=1)
+                if rate != _RATE and len(x):
+                    # Linear resampling is plenty for an energy envelope
+                    n = int(len(x) * _RATE / rate)
+                    x = np.interp(np.linspace(0, len(x) - 1, n), np.arange(len(x)), x).astype(np.float32)
+                return x
+    try:
+        import av
+
+        chunks = []
+        with av.open(str(audio)) as inp:
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=_RATE)
+            for frame in inp.decode(audio=0):
+                for rf in resampler.resample(frame):
+                    chunks.append(rf.to_ndarray().reshape(-1))
+        if chunks:
+            return np.concatenate(chunks).astype(np.float32) / 32768.0
+    except Exception:
+        pass
+    ffmpeg = getattr(SETTINGS, "FFMPEG_PATH", "ffmpeg")
+    try:
+        proc = subprocess.run(
+            [ffmpeg, "-v", "error", "-i", str(audio), "-f", "s16le", "-ac", "1", "-ar", str(_RATE), "pipe:1"],
+            capture_output=True, check=True,
+        )
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return None
+    return np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def _pauses(x) -> Tuple[float, float, List[Tuple[float, float]]]:
+    """(speech_start, speech_end, pauses) in seconds from the frame energy."""
+    import numpy as np
+
+    n = len(x) // _HOP
+    if n == 0:
+        return 0.0, 0.0, []
+    rms = np.sqrt((x[: n * _HOP].reshape(n, _HOP) ** 2).mean(axis=1))
+    db = 20 * np.log10(rms + 1e-9)
+    # Silent = 35 dB below the loud frames, but always above the noise floor
+    thr = max(np.percentile(db, 95) - 35.0, np.percentile(db, 5) + 6.0)
+    voiced = db > thr
+    idx = np.flatnonzero(voiced)
+    if idx.size == 0:
+        return 0.0, n * _HOP / _RATE, []
+    first, last = int(idx[0]), int(idx[-1]) + 1
+    pauses: List[Tuple[float, float]] = []
+    min_frames = int(_MIN_PAUSE_SEC * _RATE / _HOP)
+    run_start = None
+    for i in range(first, last):
+        if not voiced[i]:
+            if run_start is None:
+                run_start = i
+        elif run_start is not None:
+            if i - run_start >= min_frames:
+                pauses.append((run_start * _HOP / _RATE, i * _HOP / _RATE))
+            run_start = None
+    return first * _HOP / _RATE, last * _HOP / _RATE, pauses
+
+
+def align_words(words: List[str], x) -> List[Tuple[float, float]]:
+    """Energy/pause alignment of `words` against mono samples at _RATE.
+
+    Words are spread over the voiced time in proportion to their length,
+    then phrase-final words (punctuation) are snapped to the nearest
+    detected pause, and the words between two anchors are re-spread over
+    the audio between them. Deterministic and cheap: one RMS pass.
+    """
+    if not words:
+        return []
+    start, end, pauses = _pauses(x)
+    if end <= start:
+        end = start + max(len(x) / _RATE - start, 0.001)
+    weights = [len(w) + 1 for w in words]
+
+    def spread(ws: List[int], t0: float, t1: float, inner: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        # Map cumulative weight onto voiced time between t0 and t1, skipping pauses
+        inner = [(max(a, t0), min(b, t1)) for a, b in inner if b > t0 and a < t1]
+        voiced_total = (t1 - t0) - sum(b - a for a, b in inner) or (t1 - t0)
+        total = float(sum(ws)) or 1.0
+
+        def at(v: float) -> float:
+            t = t0
+            for a, b in inner:
+                if t + v <= a:
+                    break
+                v -= a - t
+                t = b
+            return min(t + v, t1)
+
+        out: List[Tuple[float, float]] = []
+        acc = 0.0
+        for w in ws:
+            s = at(acc / total * voiced_total)
+            acc += w
+            e = at(acc / total * voiced_total)
+            out.append((s, e))
+        return out
+
+    first_pass = spread(weights, start, end, pauses)
+    tolerance = max(0.4, 0.08 * (end - start))
+    anchors: List[Tuple[int, float, float]] = []  # (word index, pause start, pause end)
+    used = set()
+    for i, w in enumerate(words[:-1]):
+        if not _PHRASE_END.search(w):
+            continue
+        guess = first_pass[i][1]
+        best = None
+        for j, (a, b) in enumerate(pauses):
+            if j in used or (anchors and a <= anchors[-1][2]):
+                continue
+            d = abs(a - guess)
+            if d <= tolerance and (best is None or d < best[0]):
+                best = (d, j)
+        if best is not None:
+            used.add(best[1])
+            anchors.append((i, *pauses[best[1]]))
+
+    result: List[Tuple[float, float]] = []
+    lo_word, lo_t = 0, start
+    for i, a, b in anchors + [(len(words) - 1, end, end)]:
+        inner = [p for p in pauses if p[0] >= lo_t and p[1] <= a]
+        result.extend(spread(weights[lo_word: i + 1], lo_t, a, inner))
+        lo_word, lo_t = i + 1, b
+    return result
+
+
+def encode_timing(duration: float, spans: List[Tuple[float, float]], method: str) -> dict:
+    """Compact form: ms word starts as deltas from the previous start, ms lengths."""
+    starts = [int(round(s * 1000)) for s, _ in spans]
+    return {
+        "duration_ms": int(round(duration * 1000)),
+        "method": method,
+        "start_delta_ms": [s - p for s, p in zip(starts, [0] + starts[:-1])],
+        "length_ms": [max(0, int(round((e - s) * 1000))) for s, e in spans],
+    }
+
+
+def compute_timing(text: str, audio: Path, *, source: Optional[Path] = None) -> Optional[dict]:
+    """Duration plus word timings for a delivered paragraph file.
+
+    `source` may point at a WAV master of the same audio to skip decoding
+    the delivery file.
+    """
+    duration = audio_duration(audio)
+    if duration is None:
+        return None
+    timing = {"duration_ms": int(round(duration * 1000))}
+    words = tokenize(text)
+    try:
+        x = _decode_pcm(source if source is not None and source.suffix.lower() == ".wav" else audio)
+    except ImportError:
+        x = None
+    if x is not None and len(x) and words:
+        spans = align_words(words, x)
+        # Encoder priming can make the decoded length differ slightly
+        scale = duration / (len(x) / _RATE) if len(x) else 1.0
+        spans = [(s * scale, e * scale) for s, e in spans]
+        timing = encode_timing(duration, spans, "energy")
+    return timing
+
+
+def write_timing(audio: Path, timing: dict) -> Path:
+    out = timing_path(audio)
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.part")
+    tmp.write_text(json.dumps(timing, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, out)
+    return out
+
+
+def load_timing(audio: Path) -> Optional[dict]:
+    p = timing_path(audio)
+    if not p.exists():
+        return None
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return None
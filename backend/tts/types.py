@@ -1,7 +1,17 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Protocol
+from typing import Iterator, Protocol
+
+
+@dataclass
+class PcmStream:
+    """Raw interleaved s16le audio as it arrives from a provider."""
+
+    sample_rate: int
+    chunks: Iterator[bytes]
+    channels: int = 1
 
 
 class TTSEngine(Protocol):
@@ -9,9 +19,14 @@ class TTSEngine(Protocol):
 
     Implementations should synthesize audio for the given text and return
     a Path to a local audio file. Implementations may apply internal caching.
+
+    `native_formats` lists the `fmt` values the engine can produce without a
+    transcode; for anything else callers request "wav" and encode themselves.
+    The returned file's suffix always reflects the format actually written.
     """
 
     name: str  # provider name identifier
+    native_formats: tuple[str, ...]
 
     def synthesize(
         self,
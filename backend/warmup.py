@@ -0,0 +1,125 @@
+"""Per-process worker setup, done once instead of on the first task.
+
+`warm_worker` is the Celery `worker_process_init` handler: it registers the
+TTS providers, builds the pooled HTTP clients, resolves the configured voices
+and, with PIPER_PREWARM, asks the sidecar to load their models. Tasks still
+call `ensure_providers()` so the solo/threads pools (no process-init signal)
+set up lazily on first use.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, List
+
+from .config import SETTINGS
+from .metrics import FIRST_TASK_SECONDS, WORKER_WARMUP_SECONDS
+from .tts.registry import get_provider, register_provider
+from .tts.voices import Voice, resolve_voice
+
+_lock = threading.Lock()
+_providers_ready = False
+_warmed = False
+_first_task_done = False
+
+
+def ensure_providers() -> None:
+    """Register the OpenAI and Piper providers once per process."""
+    global _providers_ready
+    if _providers_ready:
+        return
+    with _lock:
+        if _providers_ready:
+            return
+        from .tts.openai_provider import OpenAITTSProvider
+        from .tts.piper_provider import PiperTTSProvider
+
+        if get_provider("openai") is None:
+            register_provider("openai", OpenAITTSProvider())
+        if get_provider("piper") is None:
+            try:
+                register_provider("piper", PiperTTSProvider())
+            except Exception as e:
+                print(f"[WARN] Could not register Piper provider: {e}")
+        _providers_ready = True
+
+
+def _configured_voices() -> List[str]:
+    hints = [SETTINGS.TTS_VOICE, SETTINGS.TTS_VOICE_EN, SETTINGS.TTS_VOICE_SV, SETTINGS.PIPER_DEFAULT_VOICE]
+    return [h for h in dict.fromkeys(hints) if h]
+
+
+def _prewarm_piper(models: List[str]) -> None:
+    """One tiny synthesis per model so the sidecar's voice pool loads it now."""
+    from .tts.http_client import get_http_client
+
+    url = SETTINGS.PIPER_URL.rstrip("/") + "/synthesize"
+    client = get_http_client()
+    for model in models:
+        t0 = time.perf_counter()
+        try:
+            with client.stream("POST", url, json={"text": "Ready.", "model_path": model, "format": "pcm"},
+                               timeout=max(5, SETTINGS.PIPER_TIMEOUT_SEC)) as r:
+                r.raise_for_status()
+                for _ in r.iter_bytes():
+                    pass
+            print(f"[INFO] Piper sidecar warmed {os.path.basename(model)} in {time.perf_counter() - t0:.2f}s")
+        except Exception as e:  # noqa: BLE001
+            print(f"[WARN] Piper pre-warm failed for {os.path.basename(model)}: {e}")
+
+
+def warm_worker(**_kwargs) -> None:
+    """Celery `worker_process_init` handler; failures only cost the warm-up."""
+    global _warmed
+    if not getattr(SETTINGS, "WORKER_WARMUP", True):
+        return
+    t0 = time.perf_counter()
+    voices: Dict[str, Voice] = {}
+    try:
+        ensure_providers()
+        if get_provider("openai") is not None and os.getenv("OPENAI_API_KEY"):
+            from .tts.openai_client import get_openai_client
+
+            get_openai_client()
+        piper_models: List[str] = []
+        if get_provider("piper") is not None and (SETTINGS.PIPER_MODE or "HTTP").upper() == "HTTP":
+            from .tts.http_client import get_http_client
+
+            get_http_client()
+            for hint in _configured_voices():
+                v = resolve_voice(lang="en", preferred_id=hint)
+                voices[hint] = v
+                if v.model_path not in piper_models:
+                    piper_models.append(v.model_path)
+        if getattr(SETTINGS, "PIPER_PREWARM", False) and piper_models:
+            _prewarm_piper(piper_models)
+        _warmed = True
+    except Exception as e:  # noqa: BLE001
+        print(f"[WARN] Worker warm-up failed: {e}")
+    elapsed = time.perf_counter() - t0
+    WORKER_WARMUP_SECONDS.observe(elapsed)
+    print(f"[INFO] Worker {os.getpid()} warmed up in {elapsed:.2f}s (voices: {', '.join(sorted({v.id for v in voices.values()})) or 'none'})")
+
+
+def record_task(seconds: float) -> None:
+    """Observe the first task of this process (later calls are no-ops)."""
+    global _first_task_done
+    if _first_task_done:
+        return
+    _first_task_done = True
+    FIRST_TASK_SECONDS.labels("true" if _warmed else "false").observe(seconds)
+    from .tts.http_client import connection_reuse
+
+    print(f"[INFO] First task in worker {os.getpid()} took {seconds:.2f}s (warmed={_warmed}); connection reuse so far: {connection_reuse()}")
+
+
+def report(**_kwargs) -> None:
+    """Log steady-state connection reuse (Celery `worker_process_shutdown` handler)."""
+    from .tts.http_client import connection_reuse, stats
+
+    for name, c in stats.items():
+        reuse = connection_reuse().get(name)
+        if reuse is not None:
+            print(f"[INFO] HTTP client '{name}': {c['requests']} requests over {c['connections']} connections ({reuse:.0%} reused)")
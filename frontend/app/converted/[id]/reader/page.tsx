@@ -7,7 +7,9 @@ import WordHighlighter from "@/app/components/WordHighlighter";
 import {
   tokenizeParagraph,
   mergeTimings,
+  decodeTimings,
   findActiveWordIndex,
+  type ServerTiming,
 } from "@/app/lib/textTiming";
 
 type Paragraph = {
@@ -15,6 +17,19 @@ type Paragraph = {
   text: string;
   audio_url: string;
   task_id?: string;
+  timing?: ServerTiming;
+  // Set instead of `timing` when audio lives in object storage
+  timing_url?: string;
+  renditions?: Rendition[];
+};
+
+// Delivered encodings of a paragraph, smallest first (see get_article)
+type Rendition = {
+  format: string;
+  bitrate?: string | null;
+  mime: string;
+  url: string;
+  bytes: number;
 };
 
 type Article = { id: string; title: string; paragraphs: Paragraph[] };
@@ -53,9 +68,17 @@ function clipPreview(text: string, max = 140) {
   return `${t.slice(0, max).trim()}…`;
 }
 
+function preferredAudioUrl(p: Paragraph) {
+  if (!p.renditions?.length || typeof document === "undefined") return p.audio_url;
+  const probe = document.createElement("audio");
+  const playable = p.renditions.find((r) => probe.canPlayType(r.mime) !== "");
+  return playable?.url ?? p.audio_url;
+}
+
 function isAudioUrlReady(audioUrl?: string | null) {
   const u = (audioUrl ?? "").trim();
-  return u.startsWith("/static/");
+  // /static/ from the API, or a direct/presigned object-storage URL
+  return u.startsWith("/static/") || /^https?:\/\//.test(u);
 }
 
 function isReadyFromStatus(status: TaskStatus | undefined) {
@@ -135,6 +158,8 @@ export default function ReaderPage() {
     ReturnType<typeof mergeTimings> | null
   >(null);
 
+  const [fetchedTimings, setFetchedTimings] = useState<Record<string, ServerTiming>>({});
+
   const [showReader, setShowReader] = useState(true);
   const [isScrubbing, setIsScrubbing] = useState(false);
 
@@ -182,7 +207,10 @@ export default function ReaderPage() {
           (p) => (p.text ?? "").trim().length > 0
         );
 
-        load(tracks as any, 0);
+        load(
+          tracks.map((p) => ({ ...p, audio_url: preferredAudioUrl(p) })) as any,
+          0
+        );
 
         const init: Record<string, TaskStatus> = {};
         for (const p of tracks) {
@@ -273,7 +301,7 @@ export default function ReaderPage() {
               const filename = outPath.split(/[/\\]+/).pop();
               if (!filename) continue;
 
-              const newUrl = `/static/${filename}`;
+              const newUrl: string = s.result.url ?? `/static/${filename}`;
               const idx = updated.paragraphs.findIndex((x) => x.id === s.pid);
               if (idx >= 0) updated.paragraphs[idx].audio_url = newUrl;
             }
@@ -289,7 +317,10 @@ export default function ReaderPage() {
               (p) => (p.text ?? "").trim().length > 0
             );
 
-            load(tracks as any, activeIndex);
+            load(
+              tracks.map((p) => ({ ...p, audio_url: preferredAudioUrl(p) })) as any,
+              activeIndex
+            );
           }, 0);
         }
 
@@ -323,15 +354,39 @@ export default function ReaderPage() {
     return map;
   }, [list]);
 
+  // Object storage: fetch the active paragraph's timing file on demand
   useEffect(() => {
     const track = list[activeIndex];
-    if (!track || !hasMetadata) {
+    if (!track || track.timing || !track.timing_url || fetchedTimings[track.id]) return;
+    let alive = true;
+    fetch(track.timing_url)
+      .then((res) => (res.ok ? res.json() : null))
+      .then((t: ServerTiming | null) => {
+        if (alive && t) setFetchedTimings((prev) => ({ ...prev, [track.id]: t }));
+      })
+      .catch(() => {});
+    return () => {
+      alive = false;
+    };
+  }, [list, activeIndex, fetchedTimings]);
+
+  useEffect(() => {
+    const track = list[activeIndex];
+    if (!track) {
       setCurrentTimings(null);
       return;
     }
     const toks = tokenMap.get(track.id) ?? [];
-    setCurrentTimings(mergeTimings(toks, undefined, duration));
-  }, [list, activeIndex, hasMetadata, duration, tokenMap]);
+    const timing = track.timing ?? fetchedTimings[track.id];
+    // Server timings need no audio metadata; the heuristic needs the duration
+    const real = decodeTimings(toks, timing);
+    if (!real && !hasMetadata) {
+      setCurrentTimings(null);
+      return;
+    }
+    const serverDuration = (timing?.duration_ms ?? 0) / 1000;
+    setCurrentTimings(mergeTimings(toks, real, duration || serverDuration));
+  }, [list, activeIndex, hasMetadata, duration, tokenMap, fetchedTimings]);
 
   useEffect(() => {
     if (!currentTimings) {
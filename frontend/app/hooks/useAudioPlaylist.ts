@@ -1,12 +1,15 @@
 // app/hooks/useAudioPlaylist.ts
 "use client";
 import { useCallback, useEffect, useMemo, useRef, useState } from "react";
+import type { ServerTiming } from "@/app/lib/textTiming";
 
 export type Track = {
   id: string;
   text: string;
   audio_url: string;
   task_id?: string; // <-- added so ReaderPage can show status badges safely
+  timing?: ServerTiming; // worker-computed duration + word timings
+  timing_url?: string; // fetched on demand when audio is in object storage
 };
 
 export function useAudioPlaylist() {
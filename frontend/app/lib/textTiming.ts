@@ -1,6 +1,13 @@
 // app/lib/textTiming.ts
 export type Token = { word: string; startChar: number; endChar: number };
 export type WordTiming = { word: string; start: number; end: number };
+// Worker-computed timing: word starts as ms deltas from the previous start, plus ms lengths
+export type ServerTiming = {
+  duration_ms: number;
+  method?: string;
+  start_delta_ms?: number[];
+  length_ms?: number[];
+};
 
 export function tokenizeParagraph(text: string): Token[] {
   const tokens: Token[] = [];
@@ -31,6 +38,19 @@ export function heuristicTimings(tokens: Token[], durationSec: number): WordTimi
   });
 }
 
+export function decodeTimings(tokens: Token[], timing?: ServerTiming): WordTiming[] | undefined {
+  const deltas = timing?.start_delta_ms;
+  const lengths = timing?.length_ms;
+  if (!deltas || !lengths || deltas.length !== tokens.length || lengths.length !== tokens.length) {
+    return undefined;
+  }
+  let ms = 0;
+  return tokens.map((t, i) => {
+    ms += deltas[i];
+    return { word: t.word, start: ms / 1000, end: (ms + lengths[i]) / 1000 };
+  });
+}
+
 export function mergeTimings(tokens: Token[], real?: WordTiming[], durationSec?: number): WordTiming[] {
   if (real && real.length === tokens.length) return real;
   return heuristicTimings(tokens, durationSec ?? 0);
@@ -38,10 +58,16 @@ export function mergeTimings(tokens: Token[], real?: WordTiming[], durationSec?:
 
 export function findActiveWordIndex(timings: WordTiming[], currentTime: number): number | null {
   if (!timings || timings.length === 0) return null;
-  for (let i = 0; i < timings.length; i++) {
-    const { start, end } = timings[i];
-    if (currentTime >= start && currentTime < end) return i;
+  // Binary search for the last word starting at or before currentTime
+  // (during a pause the previous word stays active)
+  if (currentTime < timings[0].start) return 0;
+  let lo = 0;
+  let hi = timings.length - 1;
+  while (lo < hi) {
+    const mid = (lo + hi + 1) >> 1;
+    if (timings[mid].start <= currentTime) lo = mid;
+    else hi = mid - 1;
   }
-  return timings.length - 1;
+  return lo;
 }
 
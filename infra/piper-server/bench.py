@@ -0,0 +1,86 @@
+"""
+Throughput benchmark for the Piper sidecar.
+
+Fires N /synthesize requests at a fixed concurrency and reports
+requests/second plus latency percentiles. Run it against the old
+(spawn-per-request) and new (warm pool) sidecar to compare.
+
+Usage:
+  python infra/piper-server/bench.py --url http://localhost:5000 \
+      --model /opt/piper/models/en/en_US/lessac/en_US-lessac-medium.onnx \
+      --requests 200 --concurrency 8
+
+Pass --format pcm to exercise the streaming path; time-to-first-byte is
+reported separately from total latency.
+
+Only the standard library is used so it runs from any host.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SHORT_TEXT = "The results suggest that warm models remove most of the per-request overhead."
+
+
+def one_request(url: str, model: str, text: str, fmt: str = "wav") -> tuple[float, float, int]:
+    body = json.dumps({"text": text, "model_path": model, "format": fmt}).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    ttfb = float("nan")
+    try:
+        with urllib.request.urlopen(req, timeout=120) as r:
+            r.read(1)
+            ttfb = time.perf_counter() - t0
+            while r.read(65536):
+                pass
+            status = r.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return time.perf_counter() - t0, ttfb, status
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://localhost:5000")
+    ap.add_argument("--model", required=True)
+    ap.add_argument("--requests", type=int, default=100)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--text", default=SHORT_TEXT)
+    ap.add_argument("--format", default="wav", choices=["wav", "pcm"])
+    args = ap.parse_args()
+
+    url = args.url.rstrip("/") + "/synthesize"
+    # One warm-up call so model load is not attributed to the first sample
+    one_request(url, args.model, args.text, args.format)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: one_request(url, args.model, args.text, args.format), range(args.requests)))
+    wall = time.perf_counter() - t0
+
+    ok = sorted(lat for lat, _, status in results if status == 200)
+    first = sorted(ttfb for _, ttfb, status in results if status == 200)
+    statuses: dict[int, int] = {}
+    for _, _, status in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    def pct(values: list[float], p: float) -> float:
+        return values[min(len(values) - 1, int(p / 100 * (len(values) - 1)))] * 1000 if values else float("nan")
+
+    print(f"requests={args.requests} concurrency={args.concurrency} format={args.format} wall={wall:.2f}s")
+    print(f"throughput={len(ok) / wall:.2f} req/s (successful)")
+    print(f"latency ms p50={pct(ok, 50):.0f} p90={pct(ok, 90):.0f} p99={pct(ok, 99):.0f}")
+    print(f"first byte ms p50={pct(first, 50):.0f} p90={pct(first, 90):.0f} p99={pct(first, 99):.0f}")
+    print(f"status counts={statuses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,42 @@
 from __future__ import annotations
 
+import io
+import json
 import os
 import subprocess
+import threading
+import time
+import uuid
+import wave
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Any, List, Optional
 
+import anyio
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+try:  # In-process synthesis (piper-tts); falls back to the piper CLI per request
+    from piper import PiperVoice
+except Exception:  # pragma: no cover - depends on image
+    PiperVoice = None
+
 
 MODELS_DIR = Path(os.getenv("MODELS_DIR", "/opt/piper/models")).resolve()
 TIMEOUT = int(os.getenv("PIPER_TIMEOUT_SEC", "60"))
+# Warm pool: max voices kept loaded, and how long an unused voice may stay resident
+POOL_MAX_MODELS = max(1, int(os.getenv("PIPER_POOL_MAX_MODELS", "4")))
+POOL_IDLE_TTL = int(os.getenv("PIPER_POOL_IDLE_TTL_SEC", "900"))
+# Concurrent syntheses per process. Keep at 1 for in-process voices: the
+# espeak-ng phonemizer is not thread-safe. Scale with uvicorn --workers.
+CONCURRENCY = max(1, int(os.getenv("PIPER_CONCURRENCY", "1")))
+# Requests allowed to wait for a slot before we shed load with 429
+QUEUE_MAX = max(0, int(os.getenv("PIPER_QUEUE_MAX", "16")))
+# Upper bound on texts accepted by /synthesize_batch
+BATCH_MAX = max(1, int(os.getenv("PIPER_BATCH_MAX", "64")))
 
-app = FastAPI(title="Piper Sidecar", version="0.1.0")
+app = FastAPI(title="Piper Sidecar", version="0.2.0")
 
 
 class SynthRequest(BaseModel):
@@ -21,22 +45,111 @@ class SynthRequest(BaseModel):
     speaker_id: Optional[int] = None
     sample_rate: Optional[int] = None
     loudness_norm: Optional[bool] = None
+    # "wav" returns a complete WAV file; "pcm" streams raw s16le mono as it is
+    # synthesized, with the format declared in X-Audio-Format/X-Sample-Rate/X-Channels
+    format: Optional[str] = None
 
 
-@app.get("/healthz")
-def healthz():
-    try:
-        proc = subprocess.run(["piper", "--help"], capture_output=True, check=False, timeout=10)
-        ok = proc.returncode == 0
-        return {"status": "ok" if ok else "fail"}
-    except Exception:
-        return {"status": "fail"}
+class BatchRequest(BaseModel):
+    texts: List[str]
+    model_path: str
+    speaker_id: Optional[int] = None
 
 
-@app.post("/synthesize")
-def synth(req: SynthRequest):
+class _Entry:
+    __slots__ = ("voice", "lock", "last_used", "in_use", "loaded_at")
+
+    def __init__(self, voice: Any) -> None:
+        self.voice = voice
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.loaded_at = time.time()
+
+
+class VoicePool:
+    """Bounded LRU of loaded Piper voices keyed by model path.
+
+    Loading a voice (ONNX session + config) is the expensive part of a cold
+    request; keeping it resident makes short paragraphs cost only inference.
+    Idle voices past the TTL or beyond the size bound are evicted, least
+    recently used first. Voices in use are never evicted.
+    """
+
+    def __init__(self, max_models: int, idle_ttl: int) -> None:
+        self._max = max_models
+        self._ttl = idle_ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def _evict_locked(self, reserve: int) -> None:
+        now = time.monotonic()
+        for key in list(self._entries):
+            e = self._entries[key]
+            if e.in_use == 0 and self._ttl > 0 and now - e.last_used > self._ttl:
+                del self._entries[key]
+                self.evictions += 1
+        for key in list(self._entries):
+            if len(self._entries) + reserve <= self._max:
+                break
+            if self._entries[key].in_use == 0:
+                del self._entries[key]
+                self.evictions += 1
+
+    def acquire(self, model: Path, config: Path) -> _Entry:
+        key = str(model)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.in_use += 1
+                return entry
+            self._evict_locked(reserve=1)
+            if len(self._entries) >= self._max:
+                raise HTTPException(status_code=503, detail="voice pool full", headers={"Retry-After": "1"})
+        # Load outside the pool lock so other voices keep serving
+        voice = PiperVoice.load(str(model), config_path=str(config))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(voice)
+                self._entries[key] = entry
+                self.loads += 1
+            self._entries.move_to_end(key)
+            entry.in_use += 1
+            return entry
+
+    def release(self, entry: _Entry) -> None:
+        with self._lock:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+
+    def occupancy(self) -> dict:
+        with self._lock:
+            self._evict_locked(reserve=0)
+            return {
+                "models_loaded": len(self._entries),
+                "max_models": self._max,
+                "in_use": sum(1 for e in self._entries.values() if e.in_use),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "models": [
+                    {"model_path": k, "in_use": e.in_use, "idle_sec": round(time.monotonic() - e.last_used, 1)}
+                    for k, e in self._entries.items()
+                ],
+            }
+
+
+POOL = VoicePool(POOL_MAX_MODELS, POOL_IDLE_TTL)
+_limiter = anyio.CapacityLimiter(CONCURRENCY)
+_admitted = 0  # requests running or waiting for a slot (event loop only, no lock needed)
+
+
+def _resolve_model(model_path: str) -> tuple[Path, Path]:
     # Validate model path inside models dir
-    model = Path(req.model_path).resolve()
+    model = Path(model_path).resolve()
     try:
         model.relative_to(MODELS_DIR)
     except Exception:
@@ -49,15 +162,249 @@ def synth(req: SynthRequest):
         json_path = alt if alt.exists() else json_path
     if not model.exists() or not json_path.exists():
         raise HTTPException(status_code=400, detail="model .onnx and .onnx.json must exist")
+    return model, json_path
+
+
+def _synthesize_warm(model: Path, json_path: Path, text: str, speaker_id: Optional[int]) -> bytes:
+    entry = POOL.acquire(model, json_path)
+    try:
+        buf = io.BytesIO()
+        with entry.lock, wave.open(buf, "wb") as wav:
+            entry.voice.synthesize(text, wav, speaker_id=speaker_id)
+        return buf.getvalue()
+    finally:
+        POOL.release(entry)
+
 
+def _synthesize_cli(model: Path, json_path: Path, text: str, speaker_id: Optional[int]) -> bytes:
     cmd = ["piper", "--model", str(model), "--output_raw", "false", "--output_file", "-", "--json_config", str(json_path)]
-    if req.speaker_id is not None:
-        cmd += ["--speaker", str(req.speaker_id)]
+    if speaker_id is not None:
+        cmd += ["--speaker", str(speaker_id)]
     try:
-        proc = subprocess.run(cmd, input=req.text.encode("utf-8"), capture_output=True, check=False, timeout=TIMEOUT)
+        proc = subprocess.run(cmd, input=text.encode("utf-8"), capture_output=True, check=False, timeout=TIMEOUT)
     except subprocess.TimeoutExpired:
         raise HTTPException(status_code=504, detail="piper timeout")
     if proc.returncode != 0 or not proc.stdout:
         raise HTTPException(status_code=500, detail="piper failed")
-    return app.response_class(content=proc.stdout, media_type="audio/wav")
+    return proc.stdout
+
+
+class _Admission:
+    """Admit a request to the synthesis queue or shed it with 429."""
+
+    def __init__(self) -> None:
+        self._open = False
+
+    def __enter__(self) -> "_Admission":
+        global _admitted
+        if _admitted >= CONCURRENCY + QUEUE_MAX:
+            raise HTTPException(status_code=429, detail="synthesis queue full", headers={"Retry-After": "1"})
+        _admitted += 1
+        self._open = True
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        global _admitted
+        if self._open:
+            self._open = False
+            _admitted -= 1
+
+
+def _config_sample_rate(json_path: Path) -> int:
+    try:
+        return int(json.loads(json_path.read_text(encoding="utf-8"))["audio"]["sample_rate"])
+    except Exception:
+        return 22050
+
+
+async def _stream_pcm(model: Path, json_path: Path, req: SynthRequest) -> StreamingResponse:
+    """Stream raw PCM sentence by sentence while holding one synthesis slot.
+
+    The slot and admission are released when the body finishes or the client
+    disconnects, so a streaming request counts against backpressure exactly
+    like a buffered one.
+    """
+    admission = _Admission().__enter__()
+    borrower = object()
+    try:
+        with anyio.fail_after(TIMEOUT):
+            await _limiter.acquire_on_behalf_of(borrower)
+    except TimeoutError:
+        admission.close()
+        raise HTTPException(status_code=504, detail="piper timeout")
+    except BaseException:
+        admission.close()
+        raise
+
+    entry = None
+    locked = False
+    proc = None
+    try:
+        if PiperVoice is not None:
+            entry = await anyio.to_thread.run_sync(POOL.acquire, model, json_path)
+            await anyio.to_thread.run_sync(entry.lock.acquire)
+            locked = True
+            sample_rate = int(entry.voice.config.sample_rate)
+            source = entry.voice.synthesize_stream_raw(req.text, speaker_id=req.speaker_id)
+        else:
+            cmd = ["piper", "--model", str(model), "--output_raw", "--json_config", str(json_path)]
+            if req.speaker_id is not None:
+                cmd += ["--speaker", str(req.speaker_id)]
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            proc.stdin.write(req.text.encode("utf-8"))
+            proc.stdin.close()
+            sample_rate = _config_sample_rate(json_path)
+            source = iter(lambda: proc.stdout.read(16384), b"")
+    except BaseException:
+        if entry is not None:
+            if locked:
+                entry.lock.release()
+            POOL.release(entry)
+        _limiter.release_on_behalf_of(borrower)
+        admission.close()
+        raise
+
+    # Set while no worker thread is inside `source`; a cancelled pull keeps
+    # running in its abandoned thread, so the voice and its lock are only
+    # handed back once it has returned.
+    idle = threading.Event()
+    idle.set()
+
+    def pull():
+        try:
+            return next(source, None)
+        finally:
+            idle.set()
+
+    async def body():
+        try:
+            with anyio.fail_after(TIMEOUT):
+                while True:
+                    idle.clear()
+                    chunk = await anyio.to_thread.run_sync(pull, abandon_on_cancel=True)
+                    if chunk is None:
+                        break
+                    if chunk:
+                        yield chunk
+        finally:
+            if proc is not None:
+                proc.kill()  # unblocks a pending stdout read
+            if not idle.is_set():
+                with anyio.CancelScope(shield=True):
+                    await anyio.to_thread.run_sync(idle.wait)
+            if proc is not None:
+                proc.wait()
+            if entry is not None:
+                entry.lock.release()
+                POOL.release(entry)
+            _limiter.release_on_behalf_of(borrower)
+            admission.close()
+
+    headers = {"X-Audio-Format": "s16le", "X-Sample-Rate": str(sample_rate), "X-Channels": "1"}
+    return StreamingResponse(body(), media_type="application/octet-stream", headers=headers)
+
+
+@app.get("/healthz")
+def healthz():
+    pool = POOL.occupancy()
+    queue = {
+        "concurrency": CONCURRENCY,
+        "queue_max": QUEUE_MAX,
+        "running": CONCURRENCY - int(_limiter.available_tokens),
+        "waiting": max(0, _admitted - (CONCURRENCY - int(_limiter.available_tokens))),
+    }
+    if PiperVoice is not None:
+        return {"status": "ok", "mode": "warm", "pool": pool, "queue": queue}
+    try:
+        proc = subprocess.run(["piper", "--help"], capture_output=True, check=False, timeout=10)
+        ok = proc.returncode == 0
+        return {"status": "ok" if ok else "fail", "mode": "cli", "queue": queue}
+    except Exception:
+        return {"status": "fail", "mode": "cli", "queue": queue}
+
+
+@app.post("/synthesize")
+async def synth(req: SynthRequest):
+    model, json_path = _resolve_model(req.model_path)
+    if (req.format or "wav").lower() == "pcm":
+        return await _stream_pcm(model, json_path, req)
+    fn = _synthesize_warm if PiperVoice is not None else _synthesize_cli
+    with _Admission():
+        try:
+            with anyio.fail_after(TIMEOUT):
+                audio = await anyio.to_thread.run_sync(
+                    fn, model, json_path, req.text, req.speaker_id, limiter=_limiter, abandon_on_cancel=True
+                )
+        except TimeoutError:
+            raise HTTPException(status_code=504, detail="piper timeout")
+    if not audio:
+        raise HTTPException(status_code=500, detail="piper failed")
+    return app.response_class(content=audio, media_type="audio/wav")
+
+
+def _part(boundary: str, index: int, body: bytes, *, ok: bool) -> bytes:
+    ctype = "audio/wav" if ok else "application/json"
+    head = (
+        f"--{boundary}\r\n"
+        f"Content-Type: {ctype}\r\n"
+        f"X-Item-Index: {index}\r\n"
+        f"X-Item-Status: {'ok' if ok else 'error'}\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    )
+    return head.encode("ascii") + body + b"\r\n"
+
+
+@app.post("/synthesize_batch")
+async def synth_batch(req: BatchRequest):
+    """Synthesize many texts for one voice in a single warm session.
+
+    Responds with a multipart/mixed stream, one part per input in order, each
+    carrying X-Item-Index, X-Item-Status (ok|error) and Content-Length. Parts
+    are emitted as soon as each item is done; a failed item yields a JSON
+    error part and does not abort the batch. The whole batch holds a single
+    synthesis slot.
+    """
+    if not req.texts:
+        raise HTTPException(status_code=400, detail="texts must not be empty")
+    if len(req.texts) > BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"at most {BATCH_MAX} texts per batch")
+    model, json_path = _resolve_model(req.model_path)
+    fn = _synthesize_warm if PiperVoice is not None else _synthesize_cli
+
+    admission = _Admission().__enter__()
+    borrower = object()
+    try:
+        with anyio.fail_after(TIMEOUT):
+            await _limiter.acquire_on_behalf_of(borrower)
+    except TimeoutError:
+        admission.close()
+        raise HTTPException(status_code=504, detail="piper timeout")
+    except BaseException:
+        admission.close()
+        raise
+
+    boundary = uuid.uuid4().hex
+
+    async def body():
+        try:
+            for i, text in enumerate(req.texts):
+                try:
+                    with anyio.fail_after(TIMEOUT):
+                        audio = await anyio.to_thread.run_sync(
+                            fn, model, json_path, text, req.speaker_id, abandon_on_cancel=True
+                        )
+                    if not audio:
+                        raise RuntimeError("piper produced no audio")
+                    yield _part(boundary, i, audio, ok=True)
+                except Exception as e:  # noqa: BLE001
+                    detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+                    yield _part(boundary, i, json.dumps({"error": detail}).encode("utf-8"), ok=False)
+            yield f"--{boundary}--\r\n".encode("ascii")
+        finally:
+            _limiter.release_on_behalf_of(borrower)
+            admission.close()
 
+    return StreamingResponse(body(), media_type=f"multipart/mixed; boundary={boundary}")